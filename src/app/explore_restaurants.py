@@ -3,7 +3,7 @@ import pandas as pd
 from st_aggrid import AgGrid, GridOptionsBuilder, DataReturnMode
 import plotly.express as px
 import sqlite3
-import dateparser
+from processing.processing_utils import SEASONS, parse_review_date
 
 def explore_restaurants_interface(connection):
     """
@@ -51,7 +51,7 @@ def explore_restaurants_interface(connection):
 
         # Charger les dates des avis
         query_review_dates = """
-        SELECT MIN(review_date) AS min_date, MAX(review_date) AS max_date
+        SELECT MIN(review_date_iso) AS min_date, MAX(review_date_iso) AS max_date
         FROM reviews
         """
         review_dates = pd.read_sql_query(query_review_dates, connection)
@@ -85,19 +85,21 @@ def explore_restaurants_interface(connection):
             r.id_restaurant, 
             r.name AS restaurant_name, 
             rv.rating, 
-            rv.review_date
+            rv.review_date,
+            rv.review_date_iso,
+            rv.review_season
         FROM reviews rv
         JOIN restaurants r ON r.id_restaurant = rv.id_restaurant;
         """
         data = pd.read_sql_query(query, connection)
 
-        # Conversion des dates
-        def convert_dates(date_str):
-            if pd.isna(date_str):
-                return None
-            return dateparser.parse(date_str, languages=['fr'])
-
-        data['review_date_converted'] = data['review_date'].apply(convert_dates)
+        # Dates analysées à l'ingestion ; les avis sans date ISO sont convertis à la volée
+        data['review_date_converted'] = pd.to_datetime(data['review_date_iso'], errors='coerce')
+        missing_dates = data['review_date_converted'].isna() & data['review_date'].notna()
+        if missing_dates.any():
+            data.loc[missing_dates, 'review_date_converted'] = pd.to_datetime(
+                data.loc[missing_dates, 'review_date'].map(parse_review_date), errors='coerce'
+            )
         data['period'] = data['review_date_converted'].dt.to_period("1Y")  # Groupement par période de 1 an
 
         # Calcul des notes moyennes globales par période
@@ -152,20 +154,8 @@ def explore_restaurants_interface(connection):
         # Analyse des notes par saison
         st.title("Analyse des notes par saison")
 
-        # Ajout d'une colonne pour identifier la saison
-        def determine_season(date):
-            if pd.isna(date):
-                return None
-            month = date.month
-            if month in [12, 1, 2]:
-                return "Hiver"
-            elif month in [3, 4, 5]:
-                return "Printemps"
-            elif month in [6, 7, 8]:
-                return "Été"
-            elif month in [9, 10, 11]:
-                return "Automne"
-        data['season'] = data['review_date_converted'].apply(determine_season)
+        # Saison calculée à l'ingestion, ou déduite de la date convertie pour les anciens avis
+        data['season'] = data['review_season'].fillna(data['review_date_converted'].dt.month.map(SEASONS))
 
         # Liste déroulante pour sélectionner un restaurant
         season_restaurant = st.selectbox(
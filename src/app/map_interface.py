@@ -14,7 +14,7 @@ def map_interface(connection):
     query = """
     WITH recent_reviews AS (
         SELECT re.id_restaurant, re.review_text, re.review_date, re.rating,
-               ROW_NUMBER() OVER (PARTITION BY re.id_restaurant ORDER BY re.review_date DESC) AS row_num
+               ROW_NUMBER() OVER (PARTITION BY re.id_restaurant ORDER BY re.review_date_iso DESC) AS row_num
         FROM reviews re
     )
     SELECT r.name, r.street, r.latitude, r.longitude, AVG(rr.rating) AS average_rating, 
@@ -3,12 +3,14 @@ import subprocess
 import sys
 from pathlib import Path
 
+from processing.processing_utils import find_existing_file, RAW_RESTAURANTS_FILES
+
 def check_existing_data():
     """
     Vérifie si les fichiers de données existent déjà.
     """
     urls_file = Path("data/raw/top_restaurants_urls.json")
-    data_file = Path("data/raw/top_restaurants.json")
+    data_file = Path(find_existing_file(RAW_RESTAURANTS_FILES))
     return urls_file.exists(), data_file.exists()
 
 def run_scraper():
@@ -0,0 +1,141 @@
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+from processing import clean_data
+from processing.geocoding import GEOCODING_CONFIG
+from processing.processing_utils import write_jsonl
+
+ADDRESSES = [
+    "Rue Mercière, 69002 Lyon France",
+    "Cours Émile Zola, 69100 Villeurbanne France",
+    "Rue Inconnue, 69007 Lyon France",
+]
+MONTHS = ["janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août", "septembre", "octobre",
+          "novembre", "décembre"]
+
+
+def peak_rss_mb():
+    """Mémoire résidente maximale du processus, en Mo (ru_maxrss est en Ko sous Linux, en octets sous macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def raw_restaurant(index, reviews):
+    """
+    Construit un restaurant brut au format du scraper.
+    :param index: Numéro du restaurant.
+    :param reviews: Nombre d'avis.
+    :return: Dictionnaire brut du restaurant.
+    """
+    rng = random.Random(index)
+    return {
+        "name": f"Restaurant {index}",
+        "address": f"{index} {ADDRESSES[index % len(ADDRESSES)]}",
+        "reviews_count": str(reviews),
+        "rating": "4,5",
+        "ranking": str(index + 1),
+        "total_restaurants": "3000",
+        "Cuisine": "4.5",
+        "Service": "4.0",
+        "FOURCHETTE DE PRIX": "20,00 € - 35,00 €",
+        "CUISINES": "Française, Européenne",
+        "Régimes spéciaux": "Végétarien",
+        "url": f"https://www.tripadvisor.fr/Restaurant_Review-{index}.html",
+        "reviews": [
+            {
+                "author": f"auteur{j}",
+                "contributions": str(rng.randint(1, 500)),
+                "rating": rng.randint(1, 5),
+                "title": "Très bon moment",
+                "review_text": "Accueil chaleureux et cuisine généreuse. " * 8,
+                "manager_response": "Aucune réponse",
+                "review_date": f"Rédigé le {rng.randint(1, 28)} {rng.choice(MONTHS)} {rng.randint(2015, 2024)}",
+            }
+            for j in range(reviews)
+        ],
+    }
+
+
+def measure_cleaning(raw_filepath, processed_filepath, workers):
+    """
+    Mesure un nettoyage complet (sans manifeste) avec un nombre de processus donné.
+    :param raw_filepath: Données brutes.
+    :param processed_filepath: Fichier des données nettoyées.
+    :param workers: Nombre de processus de nettoyage.
+    :return: Dictionnaire des mesures.
+    """
+    start = time.perf_counter()
+    count = clean_data.main(raw_filepath, processed_filepath, full=True, workers=workers)
+    elapsed = time.perf_counter() - start
+    return {
+        "workers": workers,
+        "restaurants": count,
+        "seconds": round(elapsed, 3),
+        "restaurants_per_second": round(count / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def main(restaurants=300, reviews=300, workers=(1, 2, 4), output=None):
+    """
+    Compare le nettoyage séquentiel et le nettoyage parallèle sur des données synthétiques, géocodées
+    avec la seule table de référence (sans appel réseau), et vérifie que les résultats sont identiques.
+    :param restaurants: Nombre de restaurants.
+    :param reviews: Nombre d'avis par restaurant.
+    :param workers: Nombres de processus à mesurer (1 : nettoyage séquentiel, toujours mesuré en premier).
+    :param output: Fichier JSON où enregistrer les mesures (facultatif).
+    :return: Dictionnaire des mesures.
+    """
+    workers = sorted({1, *workers})
+    with tempfile.TemporaryDirectory() as directory:
+        GEOCODING_CONFIG["remote"] = False
+        GEOCODING_CONFIG["cache_file"] = os.path.join(directory, "geocoding.db")
+        raw_filepath = os.path.join(directory, "raw.jsonl")
+        write_jsonl((raw_restaurant(i, reviews) for i in range(restaurants)), raw_filepath)
+
+        runs, reference = [], None
+        for count in workers:
+            processed_filepath = os.path.join(directory, f"processed_{count}.jsonl")
+            runs.append(measure_cleaning(raw_filepath, processed_filepath, count))
+            with open(processed_filepath, "rb") as f:
+                content = f.read()
+            reference = content if reference is None else reference
+            runs[-1]["identical"] = content == reference
+
+    sequential = runs[0]["seconds"]
+    for run in runs:
+        run["speedup"] = round(sequential / run["seconds"], 2) if run["seconds"] else 0.0
+    results = {"cpu_count": os.cpu_count(), "runs": runs, "peak_rss_mb": round(peak_rss_mb(), 1)}
+
+    print(f"\n{'Processus':<11}{'Restaurants':>12}{'Secondes':>10}{'Restaurants/s':>15}{'Accélération':>14}"
+          f"{'Identique':>11}")
+    for run in runs:
+        print(f"{run['workers']:<11}{run['restaurants']:>12}{run['seconds']:>10}{run['restaurants_per_second']:>15}"
+              f"{run['speedup']:>14}{'oui' if run['identical'] else 'NON':>11}")
+    print(f"\nCœurs disponibles : {results['cpu_count']}, mémoire résidente maximale : {results['peak_rss_mb']} Mo")
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mesure l'accélération du nettoyage parallèle des restaurants.")
+    parser.add_argument("--restaurants", type=int, default=300, help="Nombre de restaurants.")
+    parser.add_argument("--reviews", type=int, default=300, help="Nombre d'avis par restaurant.")
+    parser.add_argument("--workers", default=f"1,2,4,{os.cpu_count() or 1}",
+                        help="Nombres de processus à comparer, séparés par des virgules.")
+    parser.add_argument("--output", help="Fichier JSON où enregistrer les mesures.")
+    args = parser.parse_args()
+
+    # Les journaux du géocodage ralentiraient la mesure
+    logging.getLogger().setLevel(logging.WARNING)
+    main(restaurants=args.restaurants, reviews=args.reviews,
+         workers=[int(count) for count in args.workers.split(",")], output=args.output)
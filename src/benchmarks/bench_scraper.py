@@ -0,0 +1,163 @@
+import argparse
+import json
+import logging
+import resource
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from benchmarks.stub_server import StubTripAdvisor, listing_page, listing_path, restaurant_page
+from scraping import scraper_utils
+from scraping.concurrent_scraper import iter_scraped_restaurants
+from scraping.http_client import configure_session
+from scraping.parsers import configure_base_url, parse_listing_html, parse_restaurant_html, parse_reviews_html
+from scraping.rate_control import rate_controller
+
+
+def peak_rss_mb():
+    """Mémoire résidente maximale du processus, en Mo (ru_maxrss est en Ko sous Linux, en octets sous macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure_crawl(stub, name, run):
+    """
+    Mesure une étape du scraper contre le serveur local.
+    :param stub: Le serveur StubTripAdvisor.
+    :param name: Nom de l'étape.
+    :param run: Fonction sans argument qui exécute l'étape et retourne le nombre d'éléments obtenus.
+    :return: Dictionnaire des mesures de l'étape.
+    """
+    pages_before, errors_before = stub.counts["pages"], stub.counts["403"]
+    start = time.perf_counter()
+    items = run()
+    elapsed = time.perf_counter() - start
+    pages = stub.counts["pages"] - pages_before
+    return {
+        "step": name,
+        "items": items,
+        "pages": pages,
+        "403": stub.counts["403"] - errors_before,
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(pages / elapsed, 1) if elapsed else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def measure_parsers(repeat):
+    """
+    Mesure le coût d'analyse par page des parseurs lxml et des fonctions BeautifulSoup de référence.
+    :param repeat: Nombre d'analyses de chaque page.
+    :return: Liste de dictionnaires (type de page, parseur, ms/page).
+    """
+    pages = {
+        "liste": (listing_page(0, 2, 900), parse_listing_html, scraper_utils.parse_listing_page),
+        "restaurant": (restaurant_page(0, 0, 150), parse_restaurant_html, scraper_utils.parse_restaurant_page),
+        "avis": (restaurant_page(0, 15, 150), parse_reviews_html, scraper_utils.parse_reviews_page),
+    }
+    results = []
+    for kind, (html, fast_parser, reference_parser) in pages.items():
+        for parser_name, parse in (
+            ("lxml", fast_parser),
+            ("bs4", lambda page, parse=reference_parser: parse(BeautifulSoup(page, "lxml"))),
+        ):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                parse(html)
+            elapsed = time.perf_counter() - start
+            results.append({"page": kind, "parser": parser_name, "ms_per_page": round(elapsed * 1000 / repeat, 2)})
+    return results
+
+
+def main(restaurants=10, reviews=150, workers=4, latency=0.0, error_rate=0.0, repeat=20, saved_dir=None,
+         output=None):
+    """
+    Lance le banc de mesure : liste, découverte parallèle, avis seuls, restaurant seul, restaurants en
+    parallèle et coût d'analyse.
+    :param restaurants: Nombre de restaurants à scraper.
+    :param reviews: Nombre d'avis de chaque restaurant.
+    :param workers: Nombre de restaurants scrapés en parallèle.
+    :param latency: Latence ajoutée par le serveur à chaque réponse, en secondes.
+    :param error_rate: Proportion de réponses 403 injectées par le serveur.
+    :param repeat: Nombre d'analyses de chaque page pour la mesure des parseurs.
+    :param saved_dir: Dossier de pages enregistrées servies à la place des pages synthétiques.
+    :param output: Fichier JSON où enregistrer les mesures (facultatif).
+    :return: Dictionnaire des mesures.
+    """
+    listing_pages = restaurants // 30 + 1
+    stub = StubTripAdvisor(listing_pages=listing_pages, reviews_per_restaurant=reviews, latency=latency,
+                           error_rate=error_rate, saved_dir=saved_dir).start()
+    # Les liens des pages pointent vers le serveur local, sans limite de débit
+    configure_base_url(stub.base_url)
+    configure_session(pool_size=max(workers, 10))
+    rate_controller.configure(initial_rate=1000, min_rate=100, max_rate=1000)
+
+    try:
+        urls = []
+
+        def run_listing():
+            urls.extend(scraper_utils.scrape_restaurant_list(stub.base_url + listing_path(0),
+                                                             max_restaurants=restaurants, min_reviews=0))
+            return len(urls)
+
+        def run_discovery():
+            return sum(1 for _ in scraper_utils.iter_restaurant_list(stub.base_url + listing_path(0), min_reviews=0,
+                                                                     max_workers=workers))
+
+        def run_reviews():
+            return len(scraper_utils.scrape_reviews(urls[0]))
+
+        def run_restaurant():
+            data = scraper_utils.scrape_restaurant(urls[0])
+            return len(data["reviews"]) if data else 0
+
+        def run_concurrent():
+            return sum(1 for _, data in iter_scraped_restaurants(urls, max_workers=workers,
+                                                                 per_host_limit=workers) if data)
+
+        crawl = [measure_crawl(stub, "liste", run_listing)]
+        crawl.append(measure_crawl(stub, f"découverte x{workers}", run_discovery))
+        crawl.append(measure_crawl(stub, "avis", run_reviews))
+        crawl.append(measure_crawl(stub, "restaurant", run_restaurant))
+        crawl.append(measure_crawl(stub, f"restaurants x{workers}", run_concurrent))
+    finally:
+        stub.stop()
+
+    results = {
+        "crawl": crawl,
+        "parse": measure_parsers(repeat),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+    print(f"{'Étape':<18}{'Éléments':>10}{'Pages':>8}{'403':>6}{'Secondes':>10}{'Pages/s':>10}{'RSS Mo':>9}")
+    for row in crawl:
+        print(f"{row['step']:<18}{row['items']:>10}{row['pages']:>8}{row['403']:>6}{row['seconds']:>10}"
+              f"{row['pages_per_second']:>10}{row['peak_rss_mb']:>9}")
+    print(f"\n{'Page':<14}{'Parseur':<10}{'ms/page':>10}")
+    for row in results["parse"]:
+        print(f"{row['page']:<14}{row['parser']:<10}{row['ms_per_page']:>10}")
+    print(f"\nMémoire résidente maximale : {results['peak_rss_mb']} Mo")
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mesure le débit du scraper contre un serveur TripAdvisor local.")
+    parser.add_argument("--restaurants", type=int, default=10, help="Nombre de restaurants à scraper.")
+    parser.add_argument("--reviews", type=int, default=150, help="Nombre d'avis par restaurant.")
+    parser.add_argument("--workers", type=int, default=4, help="Restaurants scrapés en parallèle.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latence du serveur par réponse, en secondes.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proportion de réponses 403 injectées.")
+    parser.add_argument("--repeat", type=int, default=20, help="Analyses de chaque page pour mesurer les parseurs.")
+    parser.add_argument("--saved-dir", help="Dossier de pages enregistrées servies par le serveur (chemin de l'URL).")
+    parser.add_argument("--output", help="Fichier JSON où enregistrer les mesures.")
+    args = parser.parse_args()
+
+    # Les journaux du scraper ralentiraient la mesure
+    logging.getLogger().setLevel(logging.WARNING)
+    main(restaurants=args.restaurants, reviews=args.reviews, workers=args.workers, latency=args.latency,
+         error_rate=args.error_rate, repeat=args.repeat, saved_dir=args.saved_dir, output=args.output)
@@ -0,0 +1,207 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import random
+import re
+import threading
+import time
+
+# Nombre d'avis par page et de restaurants par page de liste, comme sur TripAdvisor
+REVIEWS_PER_PAGE = 15
+RESTAURANTS_PER_PAGE = 30
+
+LISTING_PATTERN = re.compile(r"^/Restaurants-g187265-oa(\d+)-Lyon\.html$")
+RESTAURANT_PATTERN = re.compile(r"^/Restaurant_Review-g187265-d(\d+)-Reviews-(?:or(\d+)-)?Resto_\d+-Lyon\.html$")
+
+
+def listing_path(offset):
+    """Chemin d'une page de la liste des restaurants."""
+    return f"/Restaurants-g187265-oa{offset}-Lyon.html"
+
+
+def restaurant_path(restaurant_id, offset=0):
+    """Chemin de la page d'un restaurant ou d'une de ses pages d'avis."""
+    page = f"or{offset}-" if offset else ""
+    return f"/Restaurant_Review-g187265-d{restaurant_id}-Reviews-{page}Resto_{restaurant_id}-Lyon.html"
+
+
+def _review_card(index):
+    response = (
+        f'<div class="csNQI PJ"><span class="JguWG">Merci pour votre visite n°{index} !</span></div>'
+        if index % 3 == 0 else ""
+    )
+    return (
+        '<div class="_c" data-automation="reviewCard">'
+        f'<a class="BMQDV _F Gv wSSLS SwZTJ FGwzt ukgoS" href="/Profile/u{index}">Auteur {index}</a>'
+        f'<span class="b">{index % 50}</span>'
+        f'<svg class="UctUV d H0" viewBox="0 0 88 16"><title>{index % 5 + 1},0 sur 5 bulles</title></svg>'
+        f'<div class="biGQs _P fiohW qWPrE ncFvv fOtGX"><span>Avis numéro {index}</span></div>'
+        f'<div class="_T FKffI"><span class="JguWG"><span class="yCeTE">'
+        f'{"Très bon repas, service attentionné et cadre agréable. " * (index % 4 + 1)}</span></span></div>'
+        f'{response}'
+        f'<div class="neAPm"><div class="biGQs _P pZUbB ncFvv osNWb">Rédigé le {index % 28 + 1} décembre 2023</div></div>'
+        '</div>'
+    )
+
+
+def _next_link(path):
+    return f'<a aria-label="Page suivante" href="{path}">Suivant</a>' if path else ""
+
+
+def _page(body):
+    # Le remplissage imite le poids des scripts et styles des vraies pages (~400 Ko)
+    padding = "<script>/*" + "x" * 2000 + "*/</script>"
+    return f"<html><head><title>TripAdvisor</title>{padding * 150}</head><body>{body}</body></html>"
+
+
+def listing_page(offset, listing_pages, min_reviews):
+    """
+    Page de la liste des restaurants : RESTAURANTS_PER_PAGE cartes avec leur nombre d'avis
+    (aucune carte au-delà de la dernière page).
+    :param offset: Offset de la page (motif 'oaNN').
+    :param listing_pages: Nombre total de pages de liste.
+    :param min_reviews: Nombre d'avis des restaurants générés.
+    """
+    cards = []
+    last_restaurant = min(offset + RESTAURANTS_PER_PAGE, listing_pages * RESTAURANTS_PER_PAGE)
+    for restaurant_id in range(offset, last_restaurant):
+        cards.append(
+            '<div class="tbrcR _T DxHsn TwZIp rrkMt nSZNd DALUy Re">'
+            f'<a class="BMQDV _F Gv wSSLS SwZTJ FGwzt ukgoS" href="{restaurant_path(restaurant_id)}">'
+            f'{restaurant_id + 1}. Resto {restaurant_id}</a>'
+            f'<span class="biGQs _P pZUbB osNWb"><span class="yyzcQ">{min_reviews + restaurant_id}</span></span>'
+            '<svg class="UctUV d H0"><title>4,5 sur 5 bulles</title></svg>'
+            '</div>'
+        )
+    next_offset = offset + RESTAURANTS_PER_PAGE
+    next_path = listing_path(next_offset) if next_offset < listing_pages * RESTAURANTS_PER_PAGE else None
+    return _page("".join(cards) + _next_link(next_path))
+
+
+def restaurant_page(restaurant_id, offset, reviews_count):
+    """
+    Page d'un restaurant (en-tête et détails sur la première page) ou page d'avis suivante.
+    :param restaurant_id: Identifiant du restaurant.
+    :param offset: Offset de la page d'avis (motif 'orNN').
+    :param reviews_count: Nombre total d'avis du restaurant.
+    """
+    header = ""
+    if offset == 0:
+        header = (
+            f'<h1 class="biGQs _P hzzSG rRtyp">Resto {restaurant_id}</h1>'
+            f'<span data-automation="restaurantsMapLinkOnName">{restaurant_id} Rue Mercière, 69002 Lyon France</span>'
+            f'<span class="OFtgC">{reviews_count:,} avis</span>'.replace(",", " ")
+            + '<svg class="UctUV d H0" aria-labelledby="r1"><title id="r1">4,5 sur 5 bulles</title></svg>'
+            f'<span class="ffHqI">Nº {restaurant_id + 1} sur 3 456 restaurants à Lyon</span>'
+            '<div class="YwaWb u f"><span class="biGQs _P pZUbB biKBZ hmDzD">Cuisine</span>'
+            '<div class="JSTna"><svg><title>4,5 sur 5 bulles</title></svg></div></div>'
+            '<div class="YwaWb u f"><span class="biGQs _P pZUbB biKBZ hmDzD">Service</span>'
+            '<div class="JSTna"><svg><title>4,0 sur 5 bulles</title></svg></div></div>'
+            '<div><div class="Wf"><div>CUISINES</div></div><div>Française, Lyonnaise</div></div>'
+            '<div><div class="Wf"><div>FOURCHETTE DE PRIX</div></div><div>20 € - 45 €</div></div>'
+        )
+    count = min(REVIEWS_PER_PAGE, reviews_count - offset)
+    cards = "".join(_review_card(index) for index in range(offset, offset + count))
+    next_offset = offset + REVIEWS_PER_PAGE
+    next_path = restaurant_path(restaurant_id, next_offset) if next_offset < reviews_count else None
+    return _page(header + cards + _next_link(next_path))
+
+
+class StubTripAdvisor:
+    """
+    Serveur HTTP local imitant TripAdvisor pour mesurer le scraper sans réseau.
+    Les pages sont synthétiques (balisage actuel du site) ou lues depuis un dossier de pages enregistrées.
+    """
+
+    def __init__(self, listing_pages=2, reviews_per_restaurant=150, min_reviews=900,
+                 latency=0.0, error_rate=0.0, saved_dir=None):
+        """
+        :param listing_pages: Nombre de pages de la liste des restaurants.
+        :param reviews_per_restaurant: Nombre d'avis de chaque restaurant.
+        :param min_reviews: Nombre d'avis affiché sur les cartes de la liste (le premier restaurant).
+        :param latency: Latence ajoutée à chaque réponse, en secondes.
+        :param error_rate: Proportion de réponses 403 injectées.
+        :param saved_dir: Dossier de pages enregistrées, servies en priorité (chemin de l'URL).
+        """
+        self.listing_pages = listing_pages
+        self.reviews_per_restaurant = reviews_per_restaurant
+        self.min_reviews = min_reviews
+        self.latency = latency
+        self.error_rate = error_rate
+        self.saved_dir = Path(saved_dir) if saved_dir else None
+        self.counts = {"pages": 0, "403": 0, "bytes": 0}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def render(self, path):
+        """
+        Construit la page demandée.
+        :param path: Chemin de l'URL.
+        :return: Le HTML de la page, ou None si la page n'existe pas.
+        """
+        if self.saved_dir:
+            saved = self.saved_dir / path.lstrip("/")
+            if saved.is_file():
+                return saved.read_text(encoding="utf-8")
+
+        match = LISTING_PATTERN.match(path)
+        if match:
+            return listing_page(int(match.group(1)), self.listing_pages, self.min_reviews)
+        match = RESTAURANT_PATTERN.match(path)
+        if match:
+            offset = int(match.group(2) or 0)
+            if offset < self.reviews_per_restaurant:
+                return restaurant_page(int(match.group(1)), offset, self.reviews_per_restaurant)
+        return None
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if stub.error_rate and random.random() < stub.error_rate:
+                    with stub._lock:
+                        stub.counts["403"] += 1
+                    self._send(403, b"Forbidden")
+                    return
+                html = stub.render(self.path)
+                if html is None:
+                    self._send(404, b"Not found")
+                    return
+                body = html.encode("utf-8")
+                with stub._lock:
+                    stub.counts["pages"] += 1
+                    stub.counts["bytes"] += len(body)
+                self._send(200, body)
+
+            def _send(self, status, body):
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """Démarre le serveur sur un port libre de la machine locale, dans un thread."""
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        """Arrête le serveur."""
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,105 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Niveaux par défaut des modules bavards ; modifiables avec LOG_LEVELS="module=NIVEAU,..."
+DEFAULT_MODULE_LEVELS = {
+    "urllib3": logging.WARNING,
+    "geopy": logging.WARNING,
+}
+
+_lock = threading.Lock()
+_listener = None
+_debug_payloads = os.environ.get("LOG_PAYLOADS", "") not in ("", "0")
+
+
+def _parse_module_levels(text):
+    """Lit une liste 'module=NIVEAU,module=NIVEAU' (variable d'environnement LOG_LEVELS)."""
+    levels = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _start_listener(handlers):
+    """Installe une nouvelle file sur le logger racine et démarre le thread qui la vide."""
+    global _listener
+    log_queue = queue.SimpleQueue()
+    logging.getLogger().handlers = [logging.handlers.QueueHandler(log_queue)]
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    """Écrit les messages encore en file avant la fin du processus."""
+    if _listener is not None:
+        _listener.stop()
+
+
+def _restart_after_fork():
+    """
+    Un processus créé par fork (ProcessPoolExecutor du pipeline) hérite de la file mais pas du thread
+    qui la vide : on lui en démarre un nouveau avec les mêmes destinations.
+    """
+    if _listener is not None:
+        _start_listener(_listener.handlers)
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def configure_logging(log_file=None, level=None, module_levels=None, debug_payloads=None):
+    """
+    Configure la journalisation partagée du projet. Les modules n'écrivent que dans une file en mémoire
+    (QueueHandler) ; un thread d'arrière-plan (QueueListener) formate les messages et les écrit dans le
+    fichier et la console, ce qui évite les écritures bloquantes sur le chemin critique du scraping.
+    Le premier appel installe la file et choisit le fichier ; les appels suivants ne modifient que les niveaux.
+    :param log_file: Fichier de log (par défaut, la console seule).
+    :param level: Niveau global (par défaut, variable d'environnement LOG_LEVEL ou INFO).
+    :param module_levels: Niveaux par module, par exemple {"scraping.parsers": "WARNING"}.
+    :param debug_payloads: Active l'écriture des données complètes (voir log_payload).
+    """
+    global _listener, _debug_payloads
+    root = logging.getLogger()
+
+    with _lock:
+        if _listener is None:
+            handlers = [logging.StreamHandler()]
+            if log_file:
+                handlers.append(logging.FileHandler(log_file, mode="a", encoding="utf-8"))
+            formatter = logging.Formatter(LOG_FORMAT)
+            for handler in handlers:
+                handler.setFormatter(formatter)
+
+            _start_listener(handlers)
+            atexit.register(_stop_listener)
+
+            root.setLevel(level or os.environ.get("LOG_LEVEL", "INFO").upper())
+            levels = {**DEFAULT_MODULE_LEVELS, **_parse_module_levels(os.environ.get("LOG_LEVELS", ""))}
+            for name, module_level in levels.items():
+                logging.getLogger(name).setLevel(module_level)
+        elif level:
+            root.setLevel(level.upper() if isinstance(level, str) else level)
+
+        for name, module_level in (module_levels or {}).items():
+            logging.getLogger(name).setLevel(module_level.upper() if isinstance(module_level, str) else module_level)
+        if debug_payloads is not None:
+            _debug_payloads = debug_payloads
+
+
+def log_payload(logger, message, payload):
+    """
+    Écrit des données volumineuses (un restaurant et tous ses avis, par exemple) uniquement si l'option
+    debug_payloads (ou LOG_PAYLOADS=1) est active. Sinon, rien n'est formaté.
+    :param logger: Logger du module appelant.
+    :param message: Message avec un '%s' pour les données.
+    :param payload: Données à écrire.
+    """
+    if _debug_payloads:
+        logger.info(message, payload)
@@ -1,10 +1,11 @@
-from database.create_warehouse import insert_many_to_many_data
+from database.create_warehouse import DimensionCache, insert_many_to_many_data, insert_reviews, update_restaurant_snapshot
 
-def add_restaurant_to_wr(cursor, restaurant: dict):
+def add_restaurant_to_wr(cursor, restaurant: dict, dimensions=None):
     """
     Ajoute un restaurant individuel à la base de données SQLite.
     :param cursor: Curseur SQLite.
     :param restaurant: Dictionnaire contenant les données du restaurant.
+    :param dimensions: DimensionCache à réutiliser entre plusieurs ajouts (facultatif).
     """
     # Insérer les données principales du restaurant
     restaurant_data = (
@@ -35,36 +36,24 @@ def add_restaurant_to_wr(cursor, restaurant: dict):
 
     # Obtenir l'ID du restaurant inséré
     id_restaurant = cursor.lastrowid
-    if not id_restaurant:
+    existing = cursor.rowcount == 0
+    if existing:
         cursor.execute("SELECT id_restaurant FROM restaurants WHERE name = ? AND street = ? AND city = ?", 
                        (restaurant.get('name'), restaurant.get('street'), restaurant.get('city')))
         id_restaurant = cursor.fetchone()[0]
+        update_restaurant_snapshot(cursor, id_restaurant, restaurant)
 
     # Insérer les relations many-to-many pour cuisines, régimes, fonctionnalités et repas
+    if dimensions is None:
+        dimensions = DimensionCache(cursor)
     insert_many_to_many_data(cursor, id_restaurant, restaurant.get('cuisines', "").split(", "), 
-                             "restaurant_cuisines", "id_cuisine", "cuisines")
+                             "restaurant_cuisines", "id_cuisine", "cuisines", dimensions)
     insert_many_to_many_data(cursor, id_restaurant, restaurant.get('special_diets', "").split(", "), 
-                             "restaurant_special_diets", "id_special_diet", "special_diets")
+                             "restaurant_special_diets", "id_special_diet", "special_diets", dimensions)
     insert_many_to_many_data(cursor, id_restaurant, restaurant.get('features', "").split(", "), 
-                             "restaurant_features", "id_feature", "features")
+                             "restaurant_features", "id_feature", "features", dimensions)
     insert_many_to_many_data(cursor, id_restaurant, restaurant.get('meals', "").split(", "), 
-                             "restaurant_meals", "id_meal", "meals")
+                             "restaurant_meals", "id_meal", "meals", dimensions)
 
-    # Insérer les avis associés au restaurant
-    for review in restaurant.get('reviews', []):
-        review_data = (
-            review.get('author'),
-            review.get('contributions'),
-            review.get('rating'),
-            review.get('title'),
-            review.get('review_text'),
-            review.get('manager_response'),
-            review.get('review_date'),
-            id_restaurant,
-        )
-        cursor.execute('''
-        INSERT OR IGNORE INTO reviews (
-            author, contributions, rating, title, review_text,
-            manager_response, review_date, id_restaurant
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?);
-        ''', review_data)
+    # Insérer les avis associés au restaurant en une seule requête
+    insert_reviews(cursor, id_restaurant, restaurant.get('reviews', []), existing)
@@ -1,15 +1,11 @@
-import json
 import sqlite3
+import time
+from contextlib import contextmanager
+from itertools import chain, islice
 
-
-def load_json(filepath):
-    """
-    Charge un fichier JSON et retourne son contenu.
-    :param filepath: Chemin du fichier JSON.
-    :return: Contenu du fichier JSON sous forme de dictionnaire ou liste.
-    """
-    with open(filepath, 'r', encoding='utf-8') as file:
-        return json.load(file)
+from processing.fingerprint import find_near_duplicates, review_fingerprint, review_simhash
+from processing.processing_utils import (review_date_columns, iter_restaurants, find_existing_file,
+                                         PROCESSED_RESTAURANTS_FILES)
 
 
 def create_tables(cursor):
@@ -79,14 +75,234 @@ def create_tables(cursor):
         review_text TEXT,
         manager_response TEXT,
         review_date TEXT,
+        review_date_iso TEXT,
+        review_year INTEGER,
+        review_month INTEGER,
+        review_season TEXT,
+        fingerprint INTEGER,
+        simhash INTEGER,
         id_restaurant INTEGER,
-        FOREIGN KEY (id_restaurant) REFERENCES restaurants (id_restaurant),
-        UNIQUE(author, review_text, id_restaurant)
+        FOREIGN KEY (id_restaurant) REFERENCES restaurants (id_restaurant)
     );
     ''')
 
+    migrate_reviews_table(cursor)
+
+
+# Colonnes de date des avis ajoutées après la première version du schéma
+REVIEW_DATE_COLUMNS = {
+    "review_date_iso": "TEXT",
+    "review_year": "INTEGER",
+    "review_month": "INTEGER",
+    "review_season": "TEXT",
+}
+
+
+# Colonnes de la table reviews, dans l'ordre du schéma (hors id_review)
+REVIEW_COLUMNS = [
+    "author", "contributions", "rating", "title", "review_text", "manager_response", "review_date",
+    "review_date_iso", "review_year", "review_month", "review_season", "fingerprint", "simhash", "id_restaurant",
+]
+
+
+# Index de la table reviews. L'index d'unicité sert au dédoublonnage pendant les insertions ; les index
+# de date ne servent qu'aux lectures et sont créés après un chargement en masse
+REVIEW_INDEXES = {
+    "idx_reviews_fingerprint": "CREATE UNIQUE INDEX IF NOT EXISTS idx_reviews_fingerprint ON reviews (id_restaurant, fingerprint)",
+    "idx_reviews_date": "CREATE INDEX IF NOT EXISTS idx_reviews_date ON reviews (review_date_iso)",
+    "idx_reviews_restaurant_date": "CREATE INDEX IF NOT EXISTS idx_reviews_restaurant_date ON reviews (id_restaurant, review_date_iso)",
+}
+DEFERRED_REVIEW_INDEXES = ["idx_reviews_date", "idx_reviews_restaurant_date"]
+
+
+def create_review_indexes(cursor):
+    """Crée les index de la table reviews qui n'existent pas encore."""
+    for statement in REVIEW_INDEXES.values():
+        cursor.execute(statement)
+
+
+def drop_review_indexes(cursor, names):
+    """
+    Supprime des index de la table reviews (avant un chargement en masse ou une reconstruction).
+    :param cursor: Curseur SQLite.
+    :param names: Noms des index à supprimer.
+    """
+    for name in names:
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def rebuild_reviews_with_fingerprint(cursor):
+    """
+    Remplace l'ancienne contrainte UNIQUE(author, review_text, id_restaurant), qui indexait le texte complet
+    des avis, par l'empreinte des avis. SQLite ne sait pas supprimer une contrainte : la table est recopiée
+    (identifiants conservés) avec l'empreinte de chaque avis, les doublons d'empreinte étant écartés.
+    :param cursor: Curseur SQLite.
+    """
+    columns = [column for column in REVIEW_COLUMNS if column != "fingerprint"]
+    # Les index suivent la table renommée : ils sont supprimés pour être recréés sur la nouvelle table
+    drop_review_indexes(cursor, DEFERRED_REVIEW_INDEXES)
+    cursor.execute("ALTER TABLE reviews RENAME TO reviews_old")
+    create_tables(cursor)
+
+    source = cursor.connection.cursor()
+    source.execute(f"SELECT id_review, {', '.join(columns)} FROM reviews_old ORDER BY id_review")
+    author, review_text = columns.index("author") + 1, columns.index("review_text") + 1
+    rows = ((*row, review_fingerprint(row[author], row[review_text])) for row in source)
+    cursor.executemany(
+        f"INSERT OR IGNORE INTO reviews (id_review, {', '.join(columns)}, fingerprint) "
+        f"VALUES ({', '.join('?' * (len(columns) + 2))})",
+        rows,
+    )
+    cursor.execute("DROP TABLE reviews_old")
+
+
+def migrate_reviews_table(cursor):
+    """
+    Met à niveau une table reviews existante : ajoute les colonnes de date analysée et les remplit à partir
+    de review_date pour les avis déjà stockés, remplace la contrainte d'unicité sur le texte par l'empreinte
+    des avis, ajoute le SimHash des avis déjà stockés, puis crée les index utilisés pour le dédoublonnage
+    et les tris et filtres par date.
+    :param cursor: Curseur SQLite.
+    """
+    cursor.execute("PRAGMA table_info(reviews)")
+    existing = {row[1] for row in cursor.fetchall()}
+    missing = [column for column in REVIEW_DATE_COLUMNS if column not in existing]
+    for column in missing:
+        cursor.execute(f"ALTER TABLE reviews ADD COLUMN {column} {REVIEW_DATE_COLUMNS[column]}")
+
+    if missing:
+        cursor.execute("SELECT id_review, review_date FROM reviews WHERE review_date_iso IS NULL")
+        updates = []
+        for id_review, review_date in cursor.fetchall():
+            columns = review_date_columns(review_date)
+            if columns["review_date_iso"] is not None:
+                updates.append((*columns.values(), id_review))
+        cursor.executemany('''
+        UPDATE reviews SET review_date_iso = ?, review_year = ?, review_month = ?, review_season = ?
+        WHERE id_review = ?;
+        ''', updates)
+
+    if "simhash" not in existing:
+        cursor.execute("ALTER TABLE reviews ADD COLUMN simhash INTEGER")
+
+    if "fingerprint" not in existing:
+        rebuild_reviews_with_fingerprint(cursor)
+
+    if "simhash" not in existing:
+        # Lecture terminée avant les mises à jour : seuls les entiers sont gardés en mémoire, pas les textes
+        cursor.execute("SELECT id_review, review_text FROM reviews WHERE review_text IS NOT NULL AND review_text != ''")
+        updates = [(review_simhash({"review_text": review_text}), id_review) for id_review, review_text in cursor]
+        cursor.executemany("UPDATE reviews SET simhash = ? WHERE id_review = ?", updates)
+
+    create_review_indexes(cursor)
+
+
+def review_row(review, id_restaurant):
+    """
+    Prépare la ligne d'un avis pour REVIEW_INSERT. Les colonnes de date, l'empreinte et le SimHash sont
+    repris du fichier traité, ou calculés si le fichier a été produit avant leur ajout.
+    :param review: Dictionnaire de l'avis.
+    :param id_restaurant: ID du restaurant.
+    :return: Tuple des valeurs.
+    """
+    if "review_date_iso" not in review:
+        review = {**review, **review_date_columns(review.get('review_date'))}
+    return (
+        review.get('author'),
+        review.get('contributions'),
+        review.get('rating'),
+        review.get('title'),
+        review.get('review_text'),
+        review.get('manager_response'),
+        review.get('review_date'),
+        review.get('review_date_iso'),
+        review.get('review_year'),
+        review.get('review_month'),
+        review.get('review_season'),
+        review.get('fingerprint') or review_fingerprint(review.get('author'), review.get('review_text')),
+        review['simhash'] if 'simhash' in review else review_simhash(review),
+        id_restaurant,
+    )
+
 
-def insert_many_to_many_data(cursor, restaurant_id, items, table_name, id_column_name, reference_table):
+REVIEW_INSERT = '''
+INSERT OR IGNORE INTO reviews (
+    author, contributions, rating, title, review_text, manager_response, review_date,
+    review_date_iso, review_year, review_month, review_season, fingerprint, simhash, id_restaurant
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+'''
+
+
+def insert_reviews(cursor, id_restaurant, reviews, existing=False):
+    """
+    Insère les avis d'un restaurant en une seule requête. Les avis exactement identiques à un avis stocké
+    sont ignorés par l'index d'unicité ; pour un restaurant déjà présent, les avis quasi identiques à un avis
+    stocké du même auteur (avis retouché puis rescrapé) sont aussi écartés : l'avis stocké est conservé.
+    :param cursor: Curseur SQLite.
+    :param id_restaurant: ID du restaurant.
+    :param reviews: Avis du restaurant.
+    :param existing: Le restaurant était déjà dans la base (sinon, il n'a encore aucun avis stocké).
+    """
+    rows = [review_row(review, id_restaurant) for review in reviews]
+    if existing and rows:
+        cursor.execute("SELECT author, simhash FROM reviews WHERE id_restaurant = ? AND simhash IS NOT NULL",
+                       (id_restaurant,))
+        author, signature = REVIEW_COLUMNS.index("author"), REVIEW_COLUMNS.index("simhash")
+        duplicates = find_near_duplicates([(row[author], row[signature]) for row in rows], cursor.fetchall())
+        rows = [row for index, row in enumerate(rows) if index not in duplicates]
+    cursor.executemany(REVIEW_INSERT, rows)
+
+
+# Tables de référence des données catégoriques et leur colonne ID
+DIMENSION_TABLES = {
+    "cuisines": "id_cuisine",
+    "special_diets": "id_special_diet",
+    "features": "id_feature",
+    "meals": "id_meal",
+}
+
+
+class DimensionCache:
+    """
+    Correspondance nom → ID des tables de référence (cuisines, régimes, fonctionnalités, repas), lue en
+    entier à la création du cache puis tenue à jour en mémoire : les items déjà connus ne coûtent plus
+    aucune requête. À utiliser avec un seul curseur ; un cache n'est plus valable après l'annulation
+    d'une transaction qui a ajouté des items.
+    """
+
+    def __init__(self, cursor):
+        """
+        :param cursor: Curseur SQLite (tables déjà créées).
+        """
+        self.cursor = cursor
+        self._ids = {}  # {table de référence: {nom: ID}}
+        for reference_table, id_column_name in DIMENSION_TABLES.items():
+            cursor.execute(f"SELECT name, {id_column_name} FROM {reference_table}")
+            self._ids[reference_table] = dict(cursor.fetchall())
+
+    def get_ids(self, items, id_column_name, reference_table):
+        """
+        Retourne les IDs des items, en ajoutant en une seule fois ceux absents de la table de référence.
+        :param items: Noms nettoyés et non vides.
+        :param id_column_name: Nom de la colonne ID dans la table de référence.
+        :param reference_table: Table de référence contenant les items.
+        :return: Liste des IDs, dans l'ordre des items.
+        """
+        ids = self._ids[reference_table]
+        new_items = list(dict.fromkeys(item for item in items if item not in ids))
+        if new_items:
+            self.cursor.executemany(f"INSERT OR IGNORE INTO {reference_table} (name) VALUES (?)",
+                                    [(item,) for item in new_items])
+            self.cursor.execute(f'''
+            SELECT name, {id_column_name} FROM {reference_table}
+            WHERE name IN ({', '.join('?' * len(new_items))});
+            ''', new_items)
+            ids.update(self.cursor.fetchall())
+        return [ids[item] for item in items]
+
+
+def insert_many_to_many_data(cursor, restaurant_id, items, table_name, id_column_name, reference_table,
+                             dimensions=None):
     """
     Insère les relations many-to-many entre les restaurants et leurs catégories associées.
     :param cursor: Curseur SQLite.
@@ -95,36 +311,49 @@ def insert_many_to_many_data(cursor, restaurant_id, items, table_name, id_column
     :param table_name: Nom de la table de jointure.
     :param id_column_name: Nom de la colonne ID dans la table de référence.
     :param reference_table: Table de référence contenant les items.
+    :param dimensions: DimensionCache partagé entre les restaurants d'un chargement (facultatif).
     """
-    for item in items:
-        item = item.strip() if isinstance(item, str) else None
-        if not item:
-            continue
+    items = [item.strip() for item in items if isinstance(item, str) and item.strip()]
+    if not items:
+        return
 
-        # Vérifie si l'item existe déjà dans la table de référence
-        cursor.execute(f"SELECT {id_column_name} FROM {reference_table} WHERE name = ?", (item,))
-        row = cursor.fetchone()
+    if dimensions is None:
+        dimensions = DimensionCache(cursor)
+    reference_ids = dimensions.get_ids(items, id_column_name, reference_table)
 
-        if row is None:
-            # Ajoute l'item à la table de référence
-            cursor.execute(f"INSERT INTO {reference_table} (name) VALUES (?)", (item,))
-            reference_id = cursor.lastrowid
-        else:
-            reference_id = row[0]
+    # Insère les relations dans la table de jointure en une seule requête
+    cursor.executemany(f'''
+    INSERT OR IGNORE INTO {table_name} (id_restaurant, {id_column_name})
+    VALUES (?, ?);
+    ''', [(restaurant_id, reference_id) for reference_id in reference_ids])
 
-        # Insère la relation dans la table de jointure
-        cursor.execute(f'''
-        INSERT OR IGNORE INTO {table_name} (id_restaurant, {id_column_name})
-        VALUES (?, ?);
-        ''', (restaurant_id, reference_id))
+
+def update_restaurant_snapshot(cursor, id_restaurant, restaurant):
+    """
+    Met à jour le nombre d'avis, la note et le classement d'un restaurant déjà présent, pour que le
+    prochain rafraîchissement compare la liste avec les valeurs du dernier crawl.
+    :param cursor: Curseur SQLite.
+    :param id_restaurant: ID du restaurant existant.
+    :param restaurant: Dictionnaire contenant les nouvelles données du restaurant.
+    """
+    cursor.execute('''
+    UPDATE restaurants
+    SET reviews_count = COALESCE(?, reviews_count),
+        overall_rating = COALESCE(?, overall_rating),
+        ranking = COALESCE(?, ranking)
+    WHERE id_restaurant = ?;
+    ''', (restaurant.get('reviews_count'), restaurant.get('overall_rating'), restaurant.get('ranking'), id_restaurant))
 
 
-def insert_data(cursor, data):
+def insert_data(cursor, data, dimensions=None):
     """
     Insère les données JSON dans les tables SQLite, en gérant les relations many-to-many.
     :param cursor: Curseur SQLite.
-    :param data: Données des restaurants sous forme de liste de dictionnaires.
+    :param data: Données des restaurants (liste ou générateur de dictionnaires).
+    :param dimensions: DimensionCache à réutiliser d'un appel à l'autre (par défaut, un cache pour cet appel).
     """
+    if dimensions is None:
+        dimensions = DimensionCache(cursor)
     for restaurant in data:
         # Prépare les données principales des restaurants
         restaurant_data = (
@@ -155,61 +384,115 @@ def insert_data(cursor, data):
 
         # Récupère l'ID du restaurant nouvellement inséré
         id_restaurant = cursor.lastrowid
-        if not id_restaurant:
+        existing = cursor.rowcount == 0
+        if existing:
             # Recherche l'ID existant si le restaurant est déjà présent
             cursor.execute("SELECT id_restaurant FROM restaurants WHERE name = ? AND street = ? AND city = ?", 
                            (restaurant.get('name'), restaurant.get('street'), restaurant.get('city')))
             id_restaurant = cursor.fetchone()[0]
+            update_restaurant_snapshot(cursor, id_restaurant, restaurant)
 
         # Insère les relations many-to-many
         insert_many_to_many_data(cursor, id_restaurant, restaurant.get('cuisines', "").split(", "), 
-                                 "restaurant_cuisines", "id_cuisine", "cuisines")
+                                 "restaurant_cuisines", "id_cuisine", "cuisines", dimensions)
         insert_many_to_many_data(cursor, id_restaurant, restaurant.get('special_diets', "").split(", "), 
-                                 "restaurant_special_diets", "id_special_diet", "special_diets")
+                                 "restaurant_special_diets", "id_special_diet", "special_diets", dimensions)
         insert_many_to_many_data(cursor, id_restaurant, restaurant.get('features', "").split(", "), 
-                                 "restaurant_features", "id_feature", "features")
+                                 "restaurant_features", "id_feature", "features", dimensions)
         insert_many_to_many_data(cursor, id_restaurant, restaurant.get('meals', "").split(", "), 
-                                 "restaurant_meals", "id_meal", "meals")
-
-        # Insère les avis
-        for review in restaurant.get('reviews', []):
-            review_data = (
-                review.get('author'),
-                review.get('contributions'),
-                review.get('rating'),
-                review.get('title'),
-                review.get('review_text'),
-                review.get('manager_response'),
-                review.get('review_date'),
-                id_restaurant,
-            )
-            cursor.execute('''
-            INSERT OR IGNORE INTO reviews (
-                author, contributions, rating, title, review_text,
-                manager_response, review_date, id_restaurant
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?);
-            ''', review_data)
+                                 "restaurant_meals", "id_meal", "meals", dimensions)
+
+        # Insère les avis en une seule requête
+        insert_reviews(cursor, id_restaurant, restaurant.get('reviews', []), existing)
+
+
+# Réglages appliqués pendant un chargement en masse : journal WAL, synchronisation allégée (les données
+# restent cohérentes en cas d'arrêt brutal, seule la dernière transaction peut être perdue) et cache de 64 Mo
+LOAD_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,
+}
+
+# Nombre de restaurants insérés par transaction
+LOAD_BATCH_SIZE = 100
+
+
+@contextmanager
+def load_settings(connection):
+    """
+    Applique LOAD_PRAGMAS le temps d'un chargement, puis rétablit les réglages précédents.
+    :param connection: Connexion SQLite (hors transaction).
+    """
+    previous = {name: connection.execute(f"PRAGMA {name}").fetchone()[0] for name in LOAD_PRAGMAS}
+    for name, value in LOAD_PRAGMAS.items():
+        connection.execute(f"PRAGMA {name} = {value}")
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            connection.execute(f"PRAGMA {name} = {value}")
+
+
+def bulk_load(connection, data, batch_size=LOAD_BATCH_SIZE):
+    """
+    Charge les restaurants en masse : réglages de chargement, une transaction explicite par lot de
+    restaurants, index de date supprimés pendant les insertions puis recréés une fois les données chargées,
+    et un seul DimensionCache pour tout le chargement.
+    :param connection: Connexion SQLite.
+    :param data: Données des restaurants (liste ou générateur de dictionnaires).
+    :param batch_size: Nombre de restaurants par transaction.
+    :return: Tuple (nombre d'avis ajoutés, durée du chargement en secondes).
+    """
+    cursor = connection.cursor()
+    create_tables(cursor)
+    connection.commit()
+    reviews_before = cursor.execute("SELECT COUNT(*) FROM reviews").fetchone()[0]
+
+    start = time.perf_counter()
+    dimensions = DimensionCache(cursor)
+    with load_settings(connection):
+        drop_review_indexes(cursor, DEFERRED_REVIEW_INDEXES)
+        try:
+            data = iter(data)
+            for first in data:
+                cursor.execute("BEGIN")
+                insert_data(cursor, chain([first], islice(data, batch_size - 1)), dimensions)
+                connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            create_review_indexes(cursor)
+            connection.commit()
+    elapsed = time.perf_counter() - start
+
+    inserted = cursor.execute("SELECT COUNT(*) FROM reviews").fetchone()[0] - reviews_before
+    return inserted, elapsed
 
 
 def main(json_filepath, sqlite_db_filepath):
     """
-    Point d'entrée principal pour créer les tables SQLite et insérer les données depuis un fichier JSON.
-    :param json_filepath: Chemin du fichier JSON contenant les données des restaurants.
+    Point d'entrée principal pour créer les tables SQLite et charger en masse les données depuis un fichier
+    JSONL (ou JSON), lu restaurant par restaurant.
+    :param json_filepath: Chemin du fichier des données nettoyées des restaurants.
     :param sqlite_db_filepath: Chemin de la base de données SQLite.
+    :return: Nombre d'avis ajoutés.
     """
-    data = load_json(json_filepath)
+    data = iter_restaurants(json_filepath)
 
     conn = sqlite3.connect(sqlite_db_filepath)
-    cursor = conn.cursor()
-
-    create_tables(cursor)
-    insert_data(cursor, data)
+    try:
+        inserted, elapsed = bulk_load(conn, data)
+    finally:
+        conn.close()
 
-    conn.commit()
-    conn.close()
+    rate = inserted / elapsed if elapsed else 0.0
+    print(f"{inserted} avis chargés dans {sqlite_db_filepath} en {elapsed:.1f} s ({rate:.0f} avis/s).")
+    return inserted
 
 
 if __name__ == "__main__":
-    json_filepath = "data/processed/top_restaurants_processed.json"
+    json_filepath = find_existing_file(PROCESSED_RESTAURANTS_FILES)
     sqlite_db_filepath = "src/database/restaurants.db"
     main(json_filepath, sqlite_db_filepath)
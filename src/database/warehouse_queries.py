@@ -0,0 +1,50 @@
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+def load_known_reviews(db_path, restaurant_url):
+    """
+    Charge les avis déjà présents dans l'entrepôt pour un restaurant, identifiés comme dans l'index
+    d'unicité de la table reviews par leur empreinte (auteur et texte).
+    :param db_path: Chemin de la base de données SQLite.
+    :param restaurant_url: URL TripAdvisor du restaurant.
+    :return: Ensemble des empreintes, vide si le restaurant est inconnu.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+        SELECT re.fingerprint
+        FROM reviews re
+        JOIN restaurants r ON r.id_restaurant = re.id_restaurant
+        WHERE r.url = ?
+        ''', (restaurant_url,))
+        return {fingerprint for (fingerprint,) in cursor.fetchall()}
+    except sqlite3.OperationalError as e:
+        # Entrepôt absent ou pas encore migré : le scraping ne pourra pas s'arrêter aux avis déjà stockés
+        logger.warning("Avis connus illisibles dans %s (%s) : scraping complet de %s.", db_path, e, restaurant_url)
+        return set()
+    finally:
+        conn.close()
+
+
+def load_restaurant_snapshots(db_path):
+    """
+    Charge le nombre d'avis et la note de chaque restaurant de l'entrepôt, tels qu'enregistrés au dernier crawl.
+    :param db_path: Chemin de la base de données SQLite.
+    :return: Dictionnaire {url: {"reviews_count", "rating"}}, vide si l'entrepôt n'existe pas encore.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT url, reviews_count, overall_rating FROM restaurants WHERE url IS NOT NULL")
+        return {url: {"reviews_count": reviews_count, "rating": rating}
+                for url, reviews_count, rating in cursor.fetchall()}
+    except sqlite3.OperationalError as e:
+        # Entrepôt absent ou pas encore migré : tous les restaurants seront considérés comme nouveaux
+        logger.warning("États des restaurants illisibles dans %s (%s) : aucun restaurant ne sera ignoré.", db_path, e)
+        return {}
+    finally:
+        conn.close()
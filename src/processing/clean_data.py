@@ -1,136 +1,63 @@
-from typing import List, Dict
-from geopy.geocoders import Nominatim
-from geopy.exc import GeopyError
-import time
-
-from processing.processing_utils import load_json , save_json
-
-# Initialisation du géolocalisateur Nominatim avec un identifiant utilisateur
-geolocator = Nominatim(user_agent="restaurant_locator")
-
-def get_coordinates(address: str, name: str) -> Dict[str, float]:
+import argparse
+import json
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Dict, Iterable, Iterator, List
+
+from processing.processing_utils import (iter_restaurants, find_existing_file, write_jsonl,
+                                         RAW_RESTAURANTS_FILES, PROCESSED_RESTAURANTS_FILE)
+from processing.geocoding import get_geocoder
+from processing.normalisation import normalize_restaurants
+from processing.manifest import restaurant_key, content_hash, manifest_path_for, load_manifest, save_manifest
+
+# Nombre de restaurants en attente de géocodage avant que le premier ne soit écrit
+GEOCODING_WINDOW = 100
+
+# Nettoyage parallèle : restaurants envoyés ensemble à un processus, et lots en cours par processus
+CLEANING_CHUNK_SIZE = 10
+CHUNKS_PER_WORKER = 2
+
+def preprocess_restaurant_data(data: Iterable[Dict]) -> Iterator[Dict]:
     """
-    Obtenir les coordonnées GPS d'une adresse. Si l'adresse échoue, tenter avec le nom du restaurant.
-    :param address: Adresse complète du restaurant.
-    :param name: Nom du restaurant.
-    :return: Dictionnaire contenant latitude et longitude.
+    Prétraite les données des restaurants pour normaliser les noms des attributs et leurs types.
+    :param data: Restaurants bruts (liste ou générateur).
+    :return: Générateur des restaurants normalisés.
     """
-    retries = 3  # Nombre de tentatives autorisées
-    delay = 2  # Délai initial entre les tentatives en secondes
-
-    for attempt in range(retries):
-        try:
-            # Essayer de récupérer les coordonnées via l'adresse
-            location = geolocator.geocode(address, timeout=10)
-            if location:
-                return {"latitude": location.latitude, "longitude": location.longitude}
-
-            # Si échec, tenter avec le nom du restaurant
-            print(f"Échec avec l'adresse. Tentative avec le nom du restaurant : {name}")
-            location = geolocator.geocode(name, timeout=10)
-            if location:
-                return {"latitude": location.latitude, "longitude": location.longitude}
-
-        except GeopyError as e:
-            print(f"Tentative {attempt + 1}/{retries} échouée : {e}")
-            time.sleep(delay)  # Attendre avant une nouvelle tentative
-            delay *= 2  # Doubler le délai entre les tentatives
+    return normalize_restaurants(data)
 
-    # Retourner des coordonnées nulles si toutes les tentatives échouent
-    print(f"Impossible d'obtenir les coordonnées pour : {address} ou {name}.")
-    return {"latitude": None, "longitude": None}
-
-def preprocess_restaurant_data(data: List[Dict]) -> List[Dict]:
+def add_coordinates_to_restaurants(restaurants: Iterable[Dict], window: int = GEOCODING_WINDOW) -> Iterator[Dict]:
     """
-    Prétraite les données des restaurants pour normaliser les noms des attributs et leurs types.
-    :param data: Liste des dictionnaires représentant les restaurants.
-    :return: Liste des dictionnaires normalisés.
-    """
-    def convert_price_range(price_range: str) -> str:
-        """
-        Convertit une fourchette de prix brute en une chaîne normalisée.
-        :param price_range: Texte brut de la fourchette de prix.
-        :return: Texte normalisé.
-        """
-        try:
-            return price_range.replace("\u202f", "").replace(",", ".").replace("€", "").strip()
-        except Exception:
-            return price_range
-
-    def convert_reviews(reviews: List[Dict]) -> List[Dict]:
-        """
-        Convertit les données brutes des avis en formats normalisés.
-        :param reviews: Liste d'avis bruts.
-        :return: Liste d'avis normalisés.
-        """
-        for review in reviews:
-            review["contributions"] = int(review.get("contributions", 0))
-            review["rating"] = float(review.get("rating", 0))
-            review["review_date"] = review.get("review_date", "").replace("Rédigé le ", "").strip()
-        return reviews
-
-    # Mapping pour normaliser les noms des attributs
-    attribute_mapping = {
-        "name": "name",
-        "address": "address",
-        "reviews_count": "reviews_count",
-        "rating": "overall_rating",
-        "ranking": "ranking",
-        "total_restaurants": "total_restaurants",
-        "Cuisine": "cuisine_rating",
-        "Service": "service_rating",
-        "Rapport qualité-prix": "qualite_prix_rating",
-        "Ambiance": "ambiance_rating",
-        "FOURCHETTE DE PRIX": "price_range",
-        "CUISINES": "cuisines",
-        "Régimes spéciaux": "special_diets",
-        "Repas": "meals",
-        "FONCTIONNALITÉS": "features",
-        "reviews": "reviews"
-    }
-
-    processed_data = []
-    for restaurant in data:
-        processed_restaurant = {}
-        for key, value in restaurant.items():
-            new_key = attribute_mapping.get(key, key)
-            if new_key == "price_range" and isinstance(value, str):
-                processed_restaurant[new_key] = convert_price_range(value)
-            elif new_key == "overall_rating" and isinstance(value, str):
-                processed_restaurant[new_key] = float(value.replace(",", "."))
-            elif new_key in ["cuisine_rating", "service_rating", "qualite_prix_rating", "ambiance_rating"]:
-                processed_restaurant[new_key] = float(value) if value is not None else None
-            elif new_key in ["reviews_count", "ranking", "total_restaurants"]:
-                processed_restaurant[new_key] = int(value) if value is not None else None
-            elif new_key == "reviews":
-                processed_restaurant[new_key] = convert_reviews(value)
-            else:
-                processed_restaurant[new_key] = value
-        processed_data.append(processed_restaurant)
-
-    return processed_data
-
-def add_coordinates_to_restaurants(restaurants: List[Dict]) -> List[Dict]:
-    """
-    Ajoute les coordonnées GPS à chaque restaurant.
-    :param restaurants: Liste des restaurants.
-    :return: Liste mise à jour avec les coordonnées.
+    Ajoute les coordonnées GPS à chaque restaurant. Les adresses connues (cache, table de référence) sont
+    résolues immédiatement ; les autres sont géocodées par lots en arrière-plan pendant que la lecture continue.
+    Au plus 'window' restaurants sont gardés en mémoire, et l'ordre d'entrée est conservé.
+    :param restaurants: Restaurants (liste ou générateur).
+    :param window: Nombre maximal de restaurants en attente de leurs coordonnées.
+    :return: Générateur des restaurants avec leurs coordonnées.
     """
-    for restaurant in restaurants:
-        address = restaurant.get("address", "")
-        name = restaurant.get("name", "")
-        coordinates = get_coordinates(address, name)
+    geocoder = get_geocoder()
+    pending = deque()
 
+    def complete(restaurant, future):
+        coordinates = future.result()
         restaurant["latitude"] = coordinates["latitude"]
         restaurant["longitude"] = coordinates["longitude"]
+        return restaurant
 
-    return restaurants
+    for restaurant in restaurants:
+        pending.append((restaurant, geocoder.submit(restaurant.get("address", ""), restaurant.get("name", ""))))
+        if len(pending) > window:
+            yield complete(*pending.popleft())
+    while pending:
+        yield complete(*pending.popleft())
 
-def split_address(data: List[Dict]) -> List[Dict]:
+def split_address(data: Iterable[Dict]) -> Iterator[Dict]:
     """
     Divise le champ 'address' en sous-champs : 'street', 'postal_code', 'city', et 'country'.
-    :param data: Liste des restaurants.
-    :return: Liste mise à jour avec des champs d'adresse séparés.
+    :param data: Restaurants (liste ou générateur).
+    :return: Générateur des restaurants avec des champs d'adresse séparés.
     """
     for item in data:
         try:
@@ -141,28 +68,178 @@ def split_address(data: List[Dict]) -> List[Dict]:
             item['postal_code'] = postal_code.strip()
             item['city'] = city.strip()
             item['country'] = country.strip()
-        except ValueError:
+        except (AttributeError, ValueError):
             item['street'] = item.get('address')
             item['postal_code'] = None
             item['city'] = None
             item['country'] = None
         item.pop('address', None)  # Supprimer le champ d'adresse original
-    return data
-
-# Lecture des données brutes depuis le fichier JSON
-
-raw_data = load_json("data/raw/top_restaurants.json")
-
-# Prétraitement des données
-processed_data = preprocess_restaurant_data(raw_data)
-
-# Ajout des coordonnées GPS
-restaurants_with_coordinates = add_coordinates_to_restaurants(processed_data)
-
-#Séparation des adresses
-restaurants_final = split_address(restaurants_with_coordinates)
-
-# Sauvegarde des données prétraitées dans un fichier JSON
-
-save_json(restaurants_final, "data/processed/top_restaurants_processed.json")
+        yield item
 
+def clean_chunk(chunk: List[Dict], coordinates: List[Dict]) -> List[str]:
+    """
+    Nettoie un lot de restaurants dans un processus du pool : normalisation, ajout des coordonnées déjà
+    géocodées et séparation des adresses. Le résultat est sérialisé dans le processus, pour que le processus
+    principal n'ait plus qu'à l'écrire.
+    :param chunk: Restaurants bruts.
+    :param coordinates: Coordonnées de chaque restaurant, dans le même ordre.
+    :return: Lignes JSON des restaurants nettoyés, dans l'ordre du lot.
+    """
+    restaurants = []
+    for restaurant, point in zip(preprocess_restaurant_data(chunk), coordinates):
+        restaurant["latitude"] = point["latitude"]
+        restaurant["longitude"] = point["longitude"]
+        restaurants.append(restaurant)
+    return [json.dumps(restaurant, ensure_ascii=False) for restaurant in split_address(restaurants)]
+
+def clean_in_parallel(raw_data: Iterable[Dict], workers: int, chunk_size: int = CLEANING_CHUNK_SIZE,
+                      window: int = GEOCODING_WINDOW) -> Iterator[str]:
+    """
+    Nettoie les restaurants sur plusieurs cœurs. Le processus principal lit les données et confie le
+    géocodage au thread d'arrière-plan du géocodeur ; chaque lot dont les coordonnées sont connues part
+    dans un ProcessPoolExecutor pour la partie calcul (normalisation, adresses, sérialisation). Les lots
+    sont rendus dans l'ordre de lecture, quel que soit le processus qui finit en premier : le résultat est
+    identique à celui du nettoyage séquentiel.
+    :param raw_data: Restaurants bruts (liste ou générateur).
+    :param workers: Nombre de processus.
+    :param chunk_size: Nombre de restaurants par lot.
+    :param window: Nombre maximal de restaurants en attente de leurs coordonnées.
+    :return: Générateur des lignes JSON des restaurants nettoyés.
+    """
+    geocoder = get_geocoder()
+    raw_data = iter(raw_data)
+    geocoding = deque()  # (lot, futures du géocodage), dans l'ordre de lecture
+    cleaning = deque()  # futures du pool, dans l'ordre de lecture
+    max_geocoding = max(1, window // chunk_size)
+    max_cleaning = workers * CHUNKS_PER_WORKER
+
+    # « spawn » : les processus ne copient pas l'état du thread de géocodage ni du journal
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        def dispatch():
+            chunk, futures = geocoding.popleft()
+            cleaning.append(pool.submit(clean_chunk, chunk, [future.result() for future in futures]))
+
+        while chunk := list(islice(raw_data, chunk_size)):
+            geocoding.append((chunk, [geocoder.submit(restaurant.get("address", ""), restaurant.get("name", ""))
+                                      for restaurant in chunk]))
+            # Un lot part au calcul dès que ses coordonnées sont connues, ou quand trop de lots attendent
+            while geocoding and (len(geocoding) > max_geocoding or all(f.done() for f in geocoding[0][1])):
+                dispatch()
+            while len(cleaning) > max_cleaning or (cleaning and cleaning[0].done()):
+                yield from cleaning.popleft().result()
+        while geocoding:
+            dispatch()
+        while cleaning:
+            yield from cleaning.popleft().result()
+
+def plan_incremental(raw_filepath, previous_hashes):
+    """
+    Compare les données brutes avec le manifeste du dernier nettoyage. Une version plus récente d'un
+    restaurant remplace la précédente, sauf si elle vient d'un scraping incrémental ('incremental') :
+    elle la complète alors, et le restaurant est reconstitué à partir de toutes ces versions.
+    :param raw_filepath: Données brutes.
+    :param previous_hashes: Empreintes du dernier nettoyage {clé: empreinte}.
+    :return: Tuple (empreintes actuelles {clé: empreinte}, positions dans le fichier brut des versions de
+             chaque restaurant à retraiter [[position, ...], ...]).
+    """
+    latest = {}  # {clé: (empreinte, positions)} : en cas de doublon, la dernière version l'emporte
+    for index, restaurant in enumerate(iter_restaurants(raw_filepath)):
+        key = restaurant_key(restaurant)
+        digest = content_hash(restaurant)
+        if restaurant.get("incremental") and key in latest:
+            previous_digest, indexes = latest[key]
+            latest[key] = (content_hash([previous_digest, digest]), indexes + [index])
+        else:
+            latest[key] = (digest, [index])
+    hashes = {key: digest for key, (digest, _) in latest.items()}
+    to_process = [indexes for key, (digest, indexes) in latest.items() if previous_hashes.get(key) != digest]
+    return hashes, to_process
+
+def iter_to_process(raw_filepath, to_process):
+    """
+    Relit les restaurants bruts à retraiter. Les avis d'une version incrémentale sont placés avant ceux
+    de la version qu'elle complète (les doublons sont supprimés par la normalisation) ; les autres champs
+    sont ceux de la version la plus récente. Seules les versions en attente de leur complément sont
+    gardées en mémoire.
+    :param raw_filepath: Données brutes.
+    :param to_process: Positions des versions de chaque restaurant (voir plan_incremental).
+    :return: Générateur des restaurants bruts reconstitués, dans l'ordre de leur dernière version.
+    """
+    last_index = {index: indexes[-1] for indexes in to_process for index in indexes}
+    pending = {}  # {position de la dernière version: restaurant reconstitué jusqu'ici}
+    for index, restaurant in enumerate(iter_restaurants(raw_filepath)):
+        last = last_index.get(index)
+        if last is None:
+            continue
+        previous = pending.pop(last, None)
+        if previous is not None:
+            restaurant = {**restaurant, "reviews": restaurant.get("reviews", []) + previous.get("reviews", [])}
+        if index == last:
+            restaurant.pop("incremental", None)
+            yield restaurant
+        else:
+            pending[last] = restaurant
+
+def iter_unchanged(processed_filepath, keys):
+    """
+    Relit les restaurants déjà nettoyés à conserver tels quels.
+    :param processed_filepath: Données nettoyées du dernier passage.
+    :param keys: Clés des restaurants inchangés.
+    :return: Générateur des restaurants nettoyés inchangés (sans doublon).
+    """
+    emitted = set()
+    for restaurant in iter_restaurants(processed_filepath):
+        key = restaurant_key(restaurant)
+        if key in keys and key not in emitted:
+            emitted.add(key)
+            yield restaurant
+
+def main(raw_filepath=None, processed_filepath=None, full=False, workers=1):
+    """
+    Nettoie les données brutes restaurant par restaurant : normalisation, géocodage puis séparation des adresses.
+    Chaque étape est un générateur et le résultat est écrit au fil de l'eau : la mémoire utilisée ne dépend
+    pas du nombre de restaurants ni d'avis. Un manifeste des empreintes du contenu brut permet de ne retraiter
+    que les restaurants nouveaux ou modifiés ; les autres sont repris du fichier nettoyé précédent. Les
+    restaurants ajoutés par un rafraîchissement (scraper --refresh) sont fusionnés avec leur version précédente.
+    :param raw_filepath: Données brutes (JSONL, JSONL gzip ou JSON), par défaut le fichier du scraper.
+    :param processed_filepath: Fichier JSONL des données nettoyées.
+    :param full: Retraite tous les restaurants, sans tenir compte du manifeste.
+    :param workers: Nombre de processus de nettoyage (1 : dans le processus courant, None : un par cœur).
+    :return: Nombre de restaurants nettoyés.
+    """
+    raw_filepath = raw_filepath or find_existing_file(RAW_RESTAURANTS_FILES)
+    processed_filepath = processed_filepath or PROCESSED_RESTAURANTS_FILE
+    manifest_path = manifest_path_for(processed_filepath)
+
+    previous_hashes = {} if full or not os.path.exists(processed_filepath) else load_manifest(manifest_path)
+    hashes, to_process = plan_incremental(raw_filepath, previous_hashes)
+    unchanged_keys = {key for key, digest in hashes.items() if previous_hashes.get(key) == digest}
+
+    # Lecture des données brutes (JSONL produit par le scraper, ou ancien fichier JSON), restaurant par restaurant
+    raw_data = iter_to_process(raw_filepath, to_process)
+
+    # Prétraitement, ajout des coordonnées GPS et séparation des adresses
+    workers = workers or os.cpu_count() or 1
+    if workers > 1:
+        restaurants = clean_in_parallel(raw_data, workers)
+    else:
+        restaurants = split_address(add_coordinates_to_restaurants(preprocess_restaurant_data(raw_data)))
+
+    # Sauvegarde : restaurants inchangés repris du dernier passage, puis restaurants retraités
+    unchanged = iter_unchanged(processed_filepath, unchanged_keys) if unchanged_keys else ()
+    count = write_jsonl(chain(unchanged, restaurants), processed_filepath)
+    save_manifest(manifest_path, hashes)
+    print(f"{count} restaurants nettoyés ({len(to_process)} retraités, {len(unchanged_keys)} inchangés), "
+          f"enregistrés dans {processed_filepath}.")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nettoyage des données des restaurants.")
+    parser.add_argument("raw_filepath", nargs="?", help="Données brutes (par défaut : data/raw/top_restaurants.jsonl[.gz]).")
+    parser.add_argument("processed_filepath", nargs="?", help=f"Données nettoyées (par défaut : {PROCESSED_RESTAURANTS_FILE}).")
+    parser.add_argument("--full", action="store_true", help="Retraite tous les restaurants, même inchangés.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processus de nettoyage (par défaut 1 ; 0 : un par cœur).")
+    args = parser.parse_args()
+    main(args.raw_filepath, args.processed_filepath, full=args.full, workers=args.workers)
@@ -0,0 +1,112 @@
+import hashlib
+import re
+import struct
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set, Tuple
+
+# Deux avis d'un même auteur dont les SimHash diffèrent d'au plus ce nombre de bits sont considérés
+# comme deux versions du même avis (texte retouché entre deux scrapings)
+SIMHASH_MAX_DISTANCE = 10
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# SimHash : chaque bit du hachage d'un mot occupe une tranche de SIMHASH_LANE bits d'un grand entier, pour
+# compter en une addition les bits à 1 de tous les mots (jusqu'à 2 ** SIMHASH_LANE - 1 mots par texte)
+SIMHASH_LANE = 32
+SIMHASH_LANES = struct.Struct("<64I")  # Les 64 tranches de 32 bits, dans l'ordre des bits
+UINT64_MASK = (1 << 64) - 1
+
+
+def _normalize_text(text):
+    """Texte en minuscules, espaces multiples réduits : une différence de casse ou d'espacement ne compte pas."""
+    return " ".join(text.casefold().split()) if isinstance(text, str) else ""
+
+
+def _to_int64(value):
+    """Entier non signé sur 64 bits converti en entier signé (type INTEGER de SQLite)."""
+    return value - (1 << 64) if value >> 63 else value
+
+
+def review_fingerprint(author, review_text):
+    """
+    Empreinte exacte d'un avis : hachage 64 bits de l'auteur et du texte normalisés. Elle remplace la
+    contrainte d'unicité sur le texte complet ; seul cet entier est indexé dans la base.
+    :param author: Auteur de l'avis.
+    :param review_text: Texte de l'avis.
+    :return: Entier signé sur 64 bits (type INTEGER de SQLite).
+    """
+    payload = f"{_normalize_text(author)}\x1f{_normalize_text(review_text)}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(payload, digest_size=8).digest(), "big", signed=True)
+
+
+@lru_cache(maxsize=65536)
+def _token_lanes(token):
+    """Hachage 64 bits d'un mot, chaque bit étant placé dans sa tranche de SIMHASH_LANE bits."""
+    token_hash = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+    return sum(1 << bit * SIMHASH_LANE for bit in range(64) if token_hash >> bit & 1)
+
+
+def simhash(text):
+    """
+    SimHash 64 bits des mots d'un texte : deux textes proches ont des empreintes qui ne diffèrent que
+    de quelques bits. Un bit vaut 1 s'il est à 1 dans le hachage de plus de la moitié des mots.
+    :param text: Texte de l'avis.
+    :return: Entier signé sur 64 bits (type INTEGER de SQLite), 0 pour un texte vide.
+    """
+    tokens = TOKEN_PATTERN.findall(_normalize_text(text))
+    counts = SIMHASH_LANES.unpack(sum(map(_token_lanes, tokens)).to_bytes(SIMHASH_LANES.size, "little"))
+    return _to_int64(sum(1 << bit for bit, count in enumerate(counts) if 2 * count > len(tokens)))
+
+
+def hamming_distance(first, second):
+    """Nombre de bits différents entre deux empreintes sur 64 bits (signées ou non)."""
+    return bin((first ^ second) & UINT64_MASK).count("1")
+
+
+def review_simhash(review):
+    """SimHash du texte d'un avis, ou None si l'avis n'a pas de texte (rien à comparer)."""
+    return simhash(review.get("review_text")) if review.get("review_text") else None
+
+
+def collapse_duplicate_reviews(reviews: List[Dict]) -> List[Dict]:
+    """
+    Ajoute l'empreinte exacte ('fingerprint') et le SimHash ('simhash') à chaque avis et supprime les
+    doublons d'un restaurant : avis identiques, et avis quasi identiques d'un même auteur (SimHash proches).
+    La première occurrence est conservée, c'est-à-dire la plus récente dans l'ordre du scraper.
+    :param reviews: Liste d'avis normalisés d'un restaurant.
+    :return: Liste des avis sans doublons, dans l'ordre d'origine.
+    """
+    kept, fingerprints, signatures = [], set(), {}
+    for review in reviews:
+        fingerprint = review_fingerprint(review.get("author"), review.get("review_text"))
+        if fingerprint in fingerprints:
+            continue
+        fingerprints.add(fingerprint)
+        review["fingerprint"] = fingerprint
+        review["simhash"] = signature = review_simhash(review)
+        if signature is not None:
+            author_signatures = signatures.setdefault(_normalize_text(review.get("author")), [])
+            if any(hamming_distance(signature, other) <= SIMHASH_MAX_DISTANCE for other in author_signatures):
+                continue
+            author_signatures.append(signature)
+        kept.append(review)
+    return kept
+
+
+def find_near_duplicates(candidates: Iterable[Tuple], stored: Iterable[Tuple]) -> Set[int]:
+    """
+    Repère les avis quasi identiques à un avis déjà stocké du même auteur, par exemple un avis retouché
+    sur TripAdvisor puis rescrapé : son empreinte exacte a changé, mais pas son SimHash.
+    :param candidates: Couples (auteur, SimHash) des avis à ajouter.
+    :param stored: Couples (auteur, SimHash) des avis déjà stockés pour le même restaurant.
+    :return: Positions des candidats à écarter.
+    """
+    by_author = {}
+    for author, signature in stored:
+        if signature is not None:
+            by_author.setdefault(_normalize_text(author), []).append(signature)
+    return {
+        index for index, (author, signature) in enumerate(candidates)
+        if signature is not None and any(hamming_distance(signature, other) <= SIMHASH_MAX_DISTANCE
+                                         for other in by_author.get(_normalize_text(author), ()))
+    }
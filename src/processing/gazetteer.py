@@ -0,0 +1,76 @@
+import csv
+import logging
+import re
+from typing import Dict, Optional
+
+from processing.processing_utils import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Table livrée avec le projet : centroïdes des codes postaux et coordonnées approximatives de rues de Lyon/Villeurbanne
+GAZETTEER_FILE = "data/reference/gazetteer_lyon.csv"
+
+POSTAL_CODE_PATTERN = re.compile(r"\b(\d{5})\b")
+HOUSE_NUMBER_PATTERN = re.compile(r"^\d+\s*(?:bis|ter|b)?\b[\s,-]*", re.IGNORECASE)
+
+
+def parse_address(address: Optional[str]):
+    """
+    Extrait la rue (sans le numéro) et le code postal d'une adresse TripAdvisor,
+    par exemple '12 Rue Mercière, 69002 Lyon France'.
+    :param address: Adresse complète.
+    :return: Tuple (rue normalisée, code postal), chaque élément pouvant être None.
+    """
+    if not address:
+        return None, None
+    postal_match = POSTAL_CODE_PATTERN.search(address)
+    street = HOUSE_NUMBER_PATTERN.sub("", address.split(",", 1)[0].strip())
+    return normalize_query(street) or None, postal_match.group(1) if postal_match else None
+
+
+class Gazetteer:
+    """
+    Index en mémoire des rues et des codes postaux de la table de référence, pour géocoder
+    hors ligne les adresses connues (coordonnées approchées, sans appel réseau).
+    """
+
+    def __init__(self, path=GAZETTEER_FILE):
+        self.streets = {}  # {(rue normalisée, code postal): coordonnées}
+        self.streets_by_name = {}  # {rue normalisée: [coordonnées]}
+        self.postal_codes = {}  # {code postal: coordonnées du centroïde}
+        try:
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    coordinates = {"latitude": float(row["latitude"]), "longitude": float(row["longitude"])}
+                    if row["kind"] == "postal":
+                        self.postal_codes[row["postal_code"]] = coordinates
+                    else:
+                        street = normalize_query(row["name"])
+                        self.streets[(street, row["postal_code"])] = coordinates
+                        self.streets_by_name.setdefault(street, []).append(coordinates)
+        except FileNotFoundError:
+            logger.warning("Table de référence introuvable : %s. Géocodage hors ligne désactivé.", path)
+
+    def match_street(self, address: Optional[str]) -> Optional[Dict[str, float]]:
+        """
+        Cherche la rue d'une adresse dans la table (avec son code postal, ou seule si elle est unique).
+        :param address: Adresse complète.
+        :return: Coordonnées approchées de la rue, sinon None.
+        """
+        street, postal_code = parse_address(address)
+        if street is None:
+            return None
+        coordinates = self.streets.get((street, postal_code))
+        if coordinates is None and len(self.streets_by_name.get(street, ())) == 1:
+            coordinates = self.streets_by_name[street][0]
+        return dict(coordinates) if coordinates else None
+
+    def postal_centroid(self, address: Optional[str]) -> Optional[Dict[str, float]]:
+        """
+        Coordonnées du centroïde du code postal d'une adresse (dernier recours).
+        :param address: Adresse complète.
+        :return: Coordonnées du centroïde, sinon None.
+        """
+        _, postal_code = parse_address(address)
+        coordinates = self.postal_codes.get(postal_code)
+        return dict(coordinates) if coordinates else None
@@ -0,0 +1,312 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Optional
+
+from geopy.exc import GeopyError
+from geopy.geocoders import Nominatim
+
+from processing.gazetteer import GAZETTEER_FILE, Gazetteer
+from processing.processing_utils import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Configuration du service de géocodage
+GEOCODING_CONFIG = {
+    "cache_file": "data/cache/geocoding.db",
+    "user_agent": "restaurant_locator",
+    "negative_ttl": 30 * 24 * 3600,  # Durée pendant laquelle un échec n'est pas retenté, en secondes
+    "min_delay": 1.0,  # Délai minimal entre deux appels à Nominatim (politique d'usage : 1 requête/s)
+    "retries": 3,
+    "timeout": 10,
+    "batch_size": 20,  # Recherches distantes traitées par lot (une transaction de cache par lot)
+    "remote": os.environ.get("GEOCODING_OFFLINE", "") in ("", "0"),  # False : table de référence uniquement
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    query TEXT PRIMARY KEY,
+    latitude REAL,
+    longitude REAL,
+    updated_at REAL NOT NULL
+)
+"""
+
+EMPTY_COORDINATES = {"latitude": None, "longitude": None}
+
+
+class GeocodingCache:
+    """
+    Cache SQLite persistant des résultats de géocodage, partagé entre les exécutions.
+    Les résultats négatifs (adresse introuvable) sont conservés avec une durée de validité limitée.
+    """
+
+    def __init__(self, db_path, negative_ttl):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+    def get(self, key):
+        """
+        Cherche une clé dans le cache.
+        :param key: Clé normalisée (préfixée par le type de recherche).
+        :return: Coordonnées (éventuellement nulles pour un échec connu), ou None si la clé est absente ou expirée.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT latitude, longitude, updated_at FROM geocodes WHERE query = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        latitude, longitude, updated_at = row
+        if latitude is None and time.time() - updated_at > self.negative_ttl:
+            return None
+        return {"latitude": latitude, "longitude": longitude}
+
+    def set_many(self, results):
+        """
+        Enregistre des résultats en une seule transaction (les coordonnées nulles marquent un échec).
+        :param results: Dictionnaire {clé normalisée: {"latitude", "longitude"}}.
+        """
+        if not results:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO geocodes (query, latitude, longitude, updated_at) VALUES (?, ?, ?, ?)",
+                [(key, c["latitude"], c["longitude"], now) for key, c in results.items()],
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class Geocoder:
+    """
+    Service de géocodage, dans l'ordre : cache persistant, rue de la table de référence (hors ligne),
+    Nominatim (débit limité, nouvelles tentatives en cas d'erreur réseau), puis centroïde du code postal.
+    Les recherches distantes peuvent être confiées à un thread d'arrière-plan qui les traite par lots (voir submit).
+    """
+
+    def __init__(self, cache_file=None, negative_ttl=None, user_agent=None, gazetteer_file=None):
+        self.cache = GeocodingCache(cache_file or GEOCODING_CONFIG["cache_file"],
+                                    GEOCODING_CONFIG["negative_ttl"] if negative_ttl is None else negative_ttl)
+        self.gazetteer = Gazetteer(gazetteer_file or GAZETTEER_FILE)
+        self._user_agent = user_agent or GEOCODING_CONFIG["user_agent"]
+        self._geolocator = None
+        self._remote_lock = threading.Lock()
+        self._last_call = 0.0
+        self._stats_lock = threading.Lock()
+        self._pending = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()  # Distinct de _remote_lock, tenu pendant les appels à Nominatim
+        self.stats = {"hits": 0, "misses": 0, "gazetteer": 0, "postal": 0, "remote_calls": 0}
+
+    def _count(self, stat):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def _remote_geocode(self, query):
+        """
+        Interroge Nominatim en respectant le délai minimal entre deux appels.
+        :param query: Adresse ou nom à géocoder.
+        :return: Coordonnées (nulles si introuvable), ou None si toutes les tentatives ont échoué.
+        """
+        if not GEOCODING_CONFIG["remote"]:
+            return None
+
+        delay = 2
+        for attempt in range(GEOCODING_CONFIG["retries"]):
+            with self._remote_lock:
+                if self._geolocator is None:
+                    self._geolocator = Nominatim(user_agent=self._user_agent)
+                wait = self._last_call + GEOCODING_CONFIG["min_delay"] - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                try:
+                    self._count("remote_calls")
+                    location = self._geolocator.geocode(query, timeout=GEOCODING_CONFIG["timeout"])
+                    if location:
+                        return {"latitude": location.latitude, "longitude": location.longitude}
+                    return dict(EMPTY_COORDINATES)
+                except GeopyError as e:
+                    logger.warning("Tentative %s/%s échouée pour %s : %s", attempt + 1, GEOCODING_CONFIG["retries"], query, e)
+                finally:
+                    self._last_call = time.monotonic()
+            time.sleep(delay)  # Attendre avant une nouvelle tentative
+            delay *= 2
+        return None
+
+    def _resolve_locally(self, address, name):
+        """
+        Cherche un restaurant sans appel réseau : cache de l'adresse, rue de la table de référence, cache du nom.
+        :return: Tuple (coordonnées ou None, liste des recherches (clé, texte) à faire à distance).
+        """
+        remote = []
+        for kind, query in (("address", address), ("name", name)):
+            normalized = normalize_query(query)
+            if not normalized:
+                continue
+            key = f"{kind}:{normalized}"
+            cached = self.cache.get(key)
+            if cached is not None and cached["latitude"] is not None:
+                self._count("hits")
+                return cached, []
+            if cached is None:
+                remote.append((key, query))
+            if kind == "address":
+                street = self.gazetteer.match_street(address)
+                if street is not None:
+                    self._count("gazetteer")
+                    return street, []
+        return None, remote
+
+    def _fallback(self, address, name):
+        """Dernier recours : centroïde du code postal, sinon coordonnées nulles."""
+        centroid = self.gazetteer.postal_centroid(address)
+        if centroid is not None:
+            self._count("postal")
+            logger.info("Coordonnées approchées (code postal) pour : %s", address)
+            return centroid
+        logger.warning("Impossible d'obtenir les coordonnées pour : %s ou %s.", address, name)
+        return dict(EMPTY_COORDINATES)
+
+    def _resolve_remotely(self, remote, results):
+        """
+        Interroge Nominatim pour les recherches d'un restaurant, dans l'ordre, jusqu'au premier succès.
+        :param remote: Liste des recherches (clé, texte).
+        :param results: Dictionnaire complété avec les résultats à mettre en cache {clé: coordonnées}.
+        :return: Coordonnées trouvées, sinon None.
+        """
+        for key, query in remote:
+            self._count("misses")
+            coordinates = self._remote_geocode(query)
+            if coordinates is None:
+                # Erreur réseau persistante : rien n'est mis en cache, la recherche sera retentée au prochain passage
+                continue
+            results[key] = coordinates
+            if coordinates["latitude"] is not None:
+                return coordinates
+        return None
+
+    def lookup(self, query, kind="address"):
+        """
+        Géocode une adresse ou un nom, en passant par le cache.
+        :param query: Adresse ou nom à géocoder.
+        :param kind: Type de recherche ("address" ou "name"), qui fait partie de la clé de cache.
+        :return: Coordonnées, nulles si introuvable.
+        """
+        normalized = normalize_query(query)
+        if not normalized:
+            return dict(EMPTY_COORDINATES)
+
+        key = f"{kind}:{normalized}"
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._count("hits")
+            return cached
+
+        results = {}
+        coordinates = self._resolve_remotely([(key, query)], results)
+        self.cache.set_many(results)
+        return coordinates or dict(EMPTY_COORDINATES)
+
+    def geocode(self, address: Optional[str], name: Optional[str] = None) -> Dict[str, float]:
+        """
+        Obtenir les coordonnées GPS d'une adresse. Si l'adresse échoue, tenter avec le nom du restaurant.
+        :param address: Adresse complète du restaurant.
+        :param name: Nom du restaurant (facultatif).
+        :return: Dictionnaire contenant latitude et longitude (nulles si introuvable).
+        """
+        coordinates, remote = self._resolve_locally(address, name)
+        if coordinates is not None:
+            return coordinates
+        results = {}
+        coordinates = self._resolve_remotely(remote, results)
+        self.cache.set_many(results)
+        return coordinates or self._fallback(address, name)
+
+    def submit(self, address: Optional[str], name: Optional[str] = None) -> Future:
+        """
+        Version non bloquante de geocode : les restaurants résolus sans réseau sont renvoyés immédiatement,
+        les autres sont confiés au thread d'arrière-plan qui interroge Nominatim par lots.
+        :param address: Adresse complète du restaurant.
+        :param name: Nom du restaurant (facultatif).
+        :return: Future dont le résultat est le dictionnaire des coordonnées.
+        """
+        future = Future()
+        coordinates, remote = self._resolve_locally(address, name)
+        if coordinates is not None or not remote or not GEOCODING_CONFIG["remote"]:
+            future.set_result(coordinates or self._fallback(address, name))
+            return future
+
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run_worker, name="geocoding", daemon=True)
+                self._worker.start()
+        self._pending.put((future, address, name, remote))
+        return future
+
+    def _run_worker(self):
+        """
+        Thread d'arrière-plan : regroupe les recherches en attente par lots, interroge Nominatim
+        au débit autorisé et enregistre les résultats de chaque lot en une seule transaction.
+        """
+        while True:
+            batch = [self._pending.get()]
+            while len(batch) < GEOCODING_CONFIG["batch_size"]:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            results = {}
+            resolved = []
+            for future, address, name, remote in batch:
+                try:
+                    coordinates = self._resolve_remotely(remote, results)
+                    resolved.append((future, coordinates or self._fallback(address, name)))
+                except Exception as e:
+                    future.set_exception(e)
+            try:
+                self.cache.set_many(results)
+            except Exception as e:
+                # Le thread doit survivre : sinon les futures de ce lot et des suivants ne seraient jamais résolus
+                logger.error("Échec de l'enregistrement de %s résultats de géocodage : %s", len(results), e)
+                for future, _ in resolved:
+                    future.set_exception(e)
+                continue
+            for future, coordinates in resolved:
+                future.set_result(coordinates)
+
+
+_default_geocoder = None
+_default_lock = threading.Lock()
+
+
+def get_geocoder() -> Geocoder:
+    """Retourne le service de géocodage partagé du processus (créé au premier appel)."""
+    global _default_geocoder
+    with _default_lock:
+        if _default_geocoder is None:
+            _default_geocoder = Geocoder()
+        return _default_geocoder
+
+
+def get_coordinates(address: str, name: str) -> Dict[str, float]:
+    """
+    Obtenir les coordonnées GPS d'une adresse, ou à défaut du nom du restaurant, via le cache partagé.
+    :param address: Adresse complète du restaurant.
+    :param name: Nom du restaurant.
+    :return: Dictionnaire contenant latitude et longitude.
+    """
+    return get_geocoder().geocode(address, name)
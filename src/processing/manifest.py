@@ -0,0 +1,58 @@
+import hashlib
+import json
+import os
+
+# À incrémenter quand le nettoyage change : tous les restaurants seront alors retraités
+PROCESSING_VERSION = 2
+
+
+def restaurant_key(restaurant):
+    """
+    Identifiant stable d'un restaurant, commun aux données brutes et nettoyées : son URL, sinon son nom.
+    :param restaurant: Dictionnaire brut ou nettoyé.
+    :return: La clé du restaurant.
+    """
+    return restaurant.get("url") or restaurant.get("name")
+
+
+def content_hash(restaurant):
+    """
+    Empreinte SHA-256 du contenu brut d'un restaurant (indépendante de l'ordre des clés).
+    :param restaurant: Dictionnaire brut du restaurant.
+    :return: Empreinte hexadécimale.
+    """
+    payload = json.dumps(restaurant, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def manifest_path_for(processed_filepath):
+    """Chemin du manifeste associé à un fichier de données nettoyées."""
+    return f"{processed_filepath}.manifest.json"
+
+
+def load_manifest(path):
+    """
+    Charge les empreintes des restaurants déjà nettoyés.
+    :param path: Chemin du manifeste.
+    :return: Dictionnaire {clé: empreinte}, vide si le manifeste est absent ou d'une autre version du nettoyage.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if manifest.get("version") != PROCESSING_VERSION:
+        return {}
+    return manifest.get("restaurants", {})
+
+
+def save_manifest(path, hashes):
+    """
+    Enregistre les empreintes des restaurants nettoyés (écriture atomique).
+    :param path: Chemin du manifeste.
+    :param hashes: Dictionnaire {clé: empreinte}.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": PROCESSING_VERSION, "restaurants": hashes}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
@@ -0,0 +1,122 @@
+import logging
+from typing import Dict, Iterable, Iterator, List
+
+from processing.fingerprint import collapse_duplicate_reviews
+from processing.processing_utils import review_date_columns
+
+logger = logging.getLogger(__name__)
+
+# Mapping pour normaliser les noms des attributs
+ATTRIBUTE_MAPPING = {
+    "name": "name",
+    "address": "address",
+    "reviews_count": "reviews_count",
+    "rating": "overall_rating",
+    "ranking": "ranking",
+    "total_restaurants": "total_restaurants",
+    "Cuisine": "cuisine_rating",
+    "Service": "service_rating",
+    "Rapport qualité-prix": "qualite_prix_rating",
+    "Ambiance": "ambiance_rating",
+    "FOURCHETTE DE PRIX": "price_range",
+    "CUISINES": "cuisines",
+    "Régimes spéciaux": "special_diets",
+    "Repas": "meals",
+    "FONCTIONNALITÉS": "features",
+    "reviews": "reviews"
+}
+
+DATE_PREFIX = "Rédigé le "
+
+
+def convert_price_range(price_range):
+    """
+    Convertit une fourchette de prix brute en une chaîne normalisée.
+    :param price_range: Texte brut de la fourchette de prix (les autres types sont conservés).
+    :return: Texte normalisé.
+    """
+    if not isinstance(price_range, str):
+        return price_range
+    return price_range.replace("\u202f", "").replace(",", ".").replace("€", "").strip()
+
+
+def _overall_rating(value):
+    return float(value.replace(",", ".")) if isinstance(value, str) else value
+
+
+def _optional_float(value):
+    return float(value) if value is not None else None
+
+
+def _optional_int(value):
+    return int(value) if value is not None else None
+
+
+def normalize_reviews(reviews: List[Dict]) -> List[Dict]:
+    """
+    Convertit les données brutes des avis en formats normalisés (modifiés sur place).
+    Une note absente (None) est conservée telle quelle. La date est aussi convertie une fois pour toutes
+    en colonnes review_date_iso, review_year, review_month et review_season. Chaque avis reçoit son
+    empreinte ('fingerprint') et les doublons, exacts ou quasi identiques, sont supprimés.
+    :param reviews: Liste d'avis bruts.
+    :return: Liste d'avis normalisés, sans doublons.
+    """
+    for review in reviews:
+        try:
+            review["contributions"] = int(review.get("contributions", 0))
+            rating = review.get("rating", 0)
+            review["rating"] = float(rating) if rating is not None else None
+            review["review_date"] = review.get("review_date", "").replace(DATE_PREFIX, "").strip()
+            review.update(review_date_columns(review["review_date"]))
+        except (AttributeError, TypeError, ValueError) as e:
+            logger.error("Erreur lors du traitement d'un avis : %s", e)
+    kept = collapse_duplicate_reviews(reviews)
+    if len(kept) < len(reviews):
+        logger.debug("%s avis en double supprimés", len(reviews) - len(kept))
+    return kept
+
+
+# Conversion appliquée à chaque attribut (après renommage) ; les attributs absents sont recopiés tels quels
+CONVERTERS = {
+    "price_range": convert_price_range,
+    "overall_rating": _overall_rating,
+    "cuisine_rating": _optional_float,
+    "service_rating": _optional_float,
+    "qualite_prix_rating": _optional_float,
+    "ambiance_rating": _optional_float,
+    "reviews_count": _optional_int,
+    "ranking": _optional_int,
+    "total_restaurants": _optional_int,
+    "reviews": normalize_reviews,
+}
+
+
+def normalize_restaurant(restaurant: Dict) -> Dict:
+    """
+    Prétraite les données d'un restaurant pour normaliser les noms des attributs et leurs types.
+    Un attribut dont la valeur ne peut pas être convertie est ignoré (avec un avertissement).
+    :param restaurant: Dictionnaire brut du restaurant.
+    :return: Dictionnaire normalisé.
+    """
+    processed_restaurant = {}
+    for key, value in restaurant.items():
+        new_key = ATTRIBUTE_MAPPING.get(key, key)
+        converter = CONVERTERS.get(new_key)
+        if converter is None:
+            processed_restaurant[new_key] = value
+            continue
+        try:
+            processed_restaurant[new_key] = converter(value)
+        except (AttributeError, TypeError, ValueError) as e:
+            logger.warning("Erreur lors du traitement de la clé %s avec la valeur %s : %s", key, value, e)
+    return processed_restaurant
+
+
+def normalize_restaurants(restaurants: Iterable[Dict]) -> Iterator[Dict]:
+    """
+    Normalise les restaurants un par un (générateur, pour ne pas garder toutes les données en mémoire).
+    :param restaurants: Restaurants bruts (liste ou générateur).
+    :return: Générateur des restaurants normalisés.
+    """
+    for restaurant in restaurants:
+        yield normalize_restaurant(restaurant)
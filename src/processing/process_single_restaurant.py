@@ -1,102 +1,25 @@
 import sqlite3
-from geopy.geocoders import Nominatim
 import logging
-from processing.clean_data import get_coordinates
-from database.add_restaurant_to_db import add_restaurant_to_wr  
-from typing import List, Dict
+from common.logging_setup import configure_logging, log_payload
+from processing.geocoding import get_coordinates
+from processing.normalisation import normalize_restaurant
+from database.add_restaurant_to_db import add_restaurant_to_wr
+from database.create_warehouse import create_tables
 
 
-# Initialisation du géolocalisateur
-geolocator = Nominatim(user_agent="restaurant_locator")
-
 # Configuration du logger
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-     handlers=[
-        logging.FileHandler("preprocessing.log", mode="a", encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
+configure_logging(log_file="preprocessing.log")
 logger = logging.getLogger(__name__)
 
 
-def convert_reviews(reviews: List[Dict]) -> List[Dict]:
-    """
-    Convertir les types des données des avis et standardiser les formats.
-    :param reviews: Liste des avis bruts.
-    :return: Liste des avis traités.
-    """
-    for review in reviews:
-        try:
-            review["contributions"] = int(review.get("contributions", 0))
-            review["rating"] = float(review.get("rating", 0))
-
-            # Gestion et formatage de la date de l'avis
-            raw_date = review.get("review_date", "")
-            review["review_date"] = (
-                raw_date.replace("Rédigé le ", "").strip()
-                if "Rédigé le" in raw_date
-                else raw_date.strip()
-            )
-        except Exception as e:
-            logger.error(f"Erreur lors du traitement d'un avis : {e}")
-    return reviews
-
 def preprocess_single_restaurant(restaurant: dict) -> dict:
     """
     Prétraite les données d'un seul restaurant.
     :param restaurant: Dictionnaire brut du restaurant.
     :return: Dictionnaire nettoyé et structuré.
     """
-    logger.info(f"Prétraitement des données pour {restaurant.get('name', 'Nom inconnu')}.")
-
-    def convert_price_range(price_range: str) -> str:
-        try:
-            return price_range.replace("\u202f", "").replace(",", ".").replace("€", "").strip()
-        except Exception as e:
-            logger.warning(f"Erreur lors de la conversion de la fourchette de prix : {e}")
-            return price_range
-
-    attribute_mapping = {
-        "name": "name",
-        "address": "address",
-        "reviews_count": "reviews_count",
-        "rating": "overall_rating",
-        "ranking": "ranking",
-        "total_restaurants": "total_restaurants",
-        "Cuisine": "cuisine_rating",
-        "Service": "service_rating",
-        "Rapport qualité-prix": "qualite_prix_rating",
-        "Ambiance": "ambiance_rating",
-        "FOURCHETTE DE PRIX": "price_range",
-        "CUISINES": "cuisines",
-        "Régimes spéciaux": "special_diets",
-        "Repas": "meals",
-        "FONCTIONNALITÉS": "features",
-        "reviews": "reviews"
-    }
-
-    processed_restaurant = {}
-    for key, value in restaurant.items():
-        try:
-            new_key = attribute_mapping.get(key, key)
-            if new_key == "price_range" and isinstance(value, str):
-                processed_restaurant[new_key] = convert_price_range(value)
-            elif new_key == "overall_rating" and isinstance(value, str):
-                processed_restaurant[new_key] = float(value.replace(",", "."))
-            elif new_key in ["cuisine_rating", "service_rating", "qualite_prix_rating", "ambiance_rating"]:
-                processed_restaurant[new_key] = float(value) if value is not None else None
-            elif new_key in ["reviews_count", "ranking", "total_restaurants"]:
-                processed_restaurant[new_key] = int(value) if value is not None else None
-            elif new_key == "reviews":
-                processed_restaurant[new_key] = convert_reviews(value)  # Appel à la fonction
-            else:
-                processed_restaurant[new_key] = value
-        except Exception as e:
-            logger.warning(f"Erreur lors du traitement de la clé {key} avec la valeur {value} : {e}")
-
-    return processed_restaurant
+    logger.info("Prétraitement des données pour %s.", restaurant.get('name', 'Nom inconnu'))
+    return normalize_restaurant(restaurant)
 
 
 def split_address(restaurant: dict) -> dict:
@@ -113,9 +36,9 @@ def split_address(restaurant: dict) -> dict:
         restaurant['postal_code'] = postal_code.strip()
         restaurant['city'] = city.strip()
         restaurant['country'] = country.strip()
-        logger.info(f"Adresse divisée avec succès pour {restaurant.get('name', 'Nom inconnu')}.")
+        logger.info("Adresse divisée avec succès pour %s.", restaurant.get('name', 'Nom inconnu'))
     except Exception as e:
-        logger.error(f"Erreur lors de la division de l'adresse : {e}. Valeur de l'adresse : {restaurant.get('address', 'Non disponible')}")
+        logger.error("Erreur lors de la division de l'adresse : %s. Valeur de l'adresse : %s", e, restaurant.get('address', 'Non disponible'))
         restaurant['street'] = restaurant.get('address', None)
         restaurant['postal_code'] = None
         restaurant['city'] = None
@@ -129,13 +52,13 @@ def process_and_save_single_restaurant(restaurant: dict):
     Traite un restaurant (nettoyage, géolocalisation, et ajout à la base de données).
     :param restaurant: Dictionnaire brut du restaurant.
     """
-    logger.info(f"Traitement du restaurant : {restaurant.get('name', 'Nom inconnu')}")
-    print(restaurant)
+    logger.info("Traitement du restaurant : %s", restaurant.get('name', 'Nom inconnu'))
+    log_payload(logger, "Données brutes du restaurant : %s", restaurant)
 
     try:
         # Étape 1 : Nettoyage des données
         cleaned_restaurant = preprocess_single_restaurant(restaurant)
-        logger.info(f"Données nettoyées pour {cleaned_restaurant.get('name', 'Nom inconnu')}.")
+        logger.info("Données nettoyées pour %s.", cleaned_restaurant.get('name', 'Nom inconnu'))
 
         # Étape 2 : Ajout des coordonnées GPS
         coordinates = get_coordinates(
@@ -143,30 +66,36 @@ def process_and_save_single_restaurant(restaurant: dict):
             cleaned_restaurant.get("name", "")
         )
         cleaned_restaurant.update(coordinates)
-        logger.info(f"Coordonnées ajoutées : {coordinates}")
+        logger.info("Coordonnées ajoutées : %s", coordinates)
 
         # Étape 3 : Division de l'adresse
         cleaned_restaurant = split_address(cleaned_restaurant)
-        logger.info(f"Adresse divisée : {cleaned_restaurant.get('street', 'Adresse inconnue')}")
+        logger.info("Adresse divisée : %s", cleaned_restaurant.get('street', 'Adresse inconnue'))
 
         # Retourner les données nettoyées
         return cleaned_restaurant
 
     except Exception as e:
-        logger.error(f"Erreur lors du traitement du restaurant {restaurant.get('name', 'Nom inconnu')} : {e}", exc_info=True)
+        logger.error("Erreur lors du traitement du restaurant %s : %s", restaurant.get('name', 'Nom inconnu'), e, exc_info=True)
         return None
 
 
 from scraping.scraper_utils import scrape_restaurant
+from database.warehouse_queries import load_known_reviews
 
-def process_and_add_restaurant(restaurant_url, db_path="src/database/restaurants.db"):
+def process_and_add_restaurant(restaurant_url, db_path="src/database/restaurants.db", since=None):
     """
     Pipeline complet : scrape, nettoie et ajoute un restaurant à la base de données.
+    Si le restaurant est déjà dans l'entrepôt, seuls les nouveaux avis sont récupérés.
     :param restaurant_url: URL du restaurant à scraper.
     :param db_path: Chemin de la base de données SQLite.
+    :param since: Date limite (datetime.date) des avis à récupérer, facultative.
     """
-    # Étape 1 : Scraper les données du restaurant
-    scraped_data = scrape_restaurant(restaurant_url)
+    # Étape 1 : Scraper les données du restaurant (incrémental si des avis sont déjà stockés)
+    known_reviews = load_known_reviews(db_path, restaurant_url)
+    if known_reviews:
+        logger.info("%s avis déjà stockés : scraping incrémental.", len(known_reviews))
+    scraped_data = scrape_restaurant(restaurant_url, known_reviews=known_reviews, since=since)
     if not scraped_data:
         print("Erreur : Impossible de scraper les données du restaurant.")
         return
@@ -181,6 +110,7 @@ def process_and_add_restaurant(restaurant_url, db_path="src/database/restaurants
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
+    create_tables(cursor)  # Met à niveau un entrepôt créé avant l'ajout de colonnes
     add_restaurant_to_wr(cursor, cleaned_data)
 
     conn.commit()
@@ -1,4 +1,13 @@
+import functools
+import gzip
 import json
+import logging
+import os
+import re
+import unicodedata
+from datetime import date
+
+logger = logging.getLogger(__name__)
 
 def load_json(filepath):
     """Charge un fichier JSON."""
@@ -11,3 +20,226 @@ def save_json(data, filepath):
     with open(filepath, 'w', encoding='utf-8') as file:
         json.dump(data, file, ensure_ascii=False, indent=4)
 
+
+def open_text(filepath, mode='r'):
+    """Ouvre un fichier texte en UTF-8, compressé en gzip si son nom se termine par '.gz'."""
+    if str(filepath).endswith('.gz'):
+        return gzip.open(filepath, mode + 't', encoding='utf-8')
+    return open(filepath, mode, encoding='utf-8')
+
+
+def append_jsonl(record, filepath):
+    """
+    Ajoute un enregistrement à la fin d'un fichier JSONL (une ligne JSON par enregistrement)
+    et force l'écriture sur le disque, pour ne rien perdre en cas d'interruption.
+    """
+    with open_text(filepath, 'a') as file:
+        file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        file.flush()
+        if hasattr(file, 'fileno'):
+            os.fsync(file.fileno())
+
+
+def iter_jsonl(filepath):
+    """
+    Lit un fichier JSONL enregistrement par enregistrement, sans le charger en mémoire.
+    Une dernière ligne tronquée (écriture interrompue) est ignorée.
+    """
+    try:
+        with open_text(filepath) as file:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Ligne %d illisible ignorée dans %s", line_number, filepath)
+    except EOFError:
+        logger.warning("Fin de fichier tronquée ignorée dans %s", filepath)
+
+
+def iter_json_array(filepath, chunk_size=1 << 20):
+    """
+    Lit les éléments d'un fichier JSON contenant une liste, un par un, sans charger tout le fichier :
+    le texte est lu par blocs et chaque élément est décodé dès qu'il est complet.
+    """
+    decoder = json.JSONDecoder()
+    with open_text(filepath) as file:
+        buffer = file.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{filepath} ne contient pas une liste JSON")
+        position = 1
+        while True:
+            # Sauter les espaces et séparateurs, en lisant la suite du fichier si nécessaire
+            while True:
+                while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                    position += 1
+                if position < len(buffer):
+                    break
+                more = file.read(chunk_size)
+                if not more:
+                    raise ValueError(f"{filepath} : liste JSON non terminée")
+                buffer, position = more, 0
+
+            if buffer[position] == ']':
+                return
+            try:
+                element, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                more = file.read(chunk_size)
+                if not more:
+                    raise
+                buffer, position = buffer[position:] + more, 0
+                continue
+            yield element
+
+
+def _starts_with_object(filepath):
+    """Vrai si le fichier commence par un objet JSON (format JSONL, quel que soit son nom)."""
+    with open_text(filepath) as file:
+        return file.read(64).lstrip().startswith('{')
+
+
+def iter_restaurants(filepath):
+    """Parcourt les restaurants d'un fichier JSONL (éventuellement gzip) ou d'un fichier JSON classique."""
+    if '.jsonl' in str(filepath) or _starts_with_object(filepath):
+        yield from iter_jsonl(filepath)
+    else:
+        yield from iter_json_array(filepath)
+
+
+def write_jsonl(records, filepath):
+    """
+    Écrit des enregistrements dans un fichier JSONL (gzip si le nom se termine par '.gz') au fur et à mesure.
+    Le fichier est d'abord écrit à côté puis renommé : une exécution interrompue ne laisse pas de fichier partiel.
+    :param records: Enregistrements (liste ou générateur) ; une chaîne est une ligne JSON déjà sérialisée.
+    :param filepath: Chemin du fichier de sortie.
+    :return: Nombre d'enregistrements écrits.
+    """
+    os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+    tmp_path = f"{filepath}.tmp"
+    count = 0
+    with open_text(tmp_path, 'w') as file:
+        for record in records:
+            line = record if isinstance(record, str) else json.dumps(record, ensure_ascii=False)
+            file.write(line + "\n")
+            count += 1
+    os.replace(tmp_path, filepath)
+    return count
+
+
+def find_existing_file(candidates):
+    """Retourne le premier chemin existant parmi les candidats, sinon le dernier candidat."""
+    for filepath in candidates:
+        if os.path.exists(filepath):
+            return filepath
+    return candidates[-1]
+
+
+# Fichiers bruts produits par le scraper, du plus récent format au plus ancien
+RAW_RESTAURANTS_FILES = [
+    "data/raw/top_restaurants.jsonl.gz",
+    "data/raw/top_restaurants.jsonl",
+    "data/raw/top_restaurants.json",
+]
+
+# Données nettoyées par clean_data.py (JSONL), et ancien fichier JSON indenté
+PROCESSED_RESTAURANTS_FILE = "data/processed/top_restaurants_processed.jsonl"
+PROCESSED_RESTAURANTS_FILES = [
+    PROCESSED_RESTAURANTS_FILE,
+    "data/processed/top_restaurants_processed.json",
+]
+
+
+
+FRENCH_MONTHS = {
+    "janvier": 1, "février": 2, "fevrier": 2, "mars": 3, "avril": 4, "mai": 5, "juin": 6,
+    "juillet": 7, "août": 8, "aout": 8, "septembre": 9, "octobre": 10, "novembre": 11,
+    "décembre": 12, "decembre": 12,
+    # Abréviations utilisées par TripAdvisor ("12 déc. 2023")
+    "janv": 1, "févr": 2, "fevr": 2, "fév": 2, "fev": 2, "avr": 4, "juil": 7,
+    "sept": 9, "oct": 10, "nov": 11, "déc": 12, "dec": 12,
+}
+
+FRENCH_DATE_PATTERN = re.compile(r"(\d{1,2})(?:er)?\s+([a-zéû]+)\.?\s+(\d{4})", re.IGNORECASE)
+FRENCH_MONTH_YEAR_PATTERN = re.compile(r"\b([a-zéû]+)\.?\s+(\d{4})", re.IGNORECASE)
+
+SEASONS = {12: "Hiver", 1: "Hiver", 2: "Hiver", 3: "Printemps", 4: "Printemps", 5: "Printemps",
+           6: "Été", 7: "Été", 8: "Été", 9: "Automne", 10: "Automne", 11: "Automne"}
+
+
+def parse_french_date(text):
+    """
+    Convertit une date d'avis en français (ex : "Rédigé le 12 décembre 2023", "déc. 2023") en objet date.
+    Une date sans jour est ramenée au premier jour du mois.
+    :param text: Texte contenant la date.
+    :return: Un objet datetime.date, ou None si la date n'est pas reconnue.
+    """
+    if not text:
+        return None
+    match = FRENCH_DATE_PATTERN.search(text)
+    if match:
+        day, month_name, year = match.groups()
+    else:
+        match = FRENCH_MONTH_YEAR_PATTERN.search(text)
+        if not match:
+            return None
+        day = 1
+        month_name, year = match.groups()
+    month = FRENCH_MONTHS.get(month_name.lower())
+    if month is None:
+        return None
+    try:
+        return date(int(year), month, int(day))
+    except ValueError:
+        return None
+
+
+@functools.lru_cache(maxsize=8192)
+def parse_review_date(text):
+    """
+    Convertit la date d'un avis : analyse rapide des formats TripAdvisor, puis dateparser en dernier recours
+    (formats inhabituels). Les résultats sont mémorisés, les mêmes dates revenant dans de nombreux avis.
+    :param text: Date de l'avis (texte).
+    :return: Un objet datetime.date, ou None si la date n'est pas reconnue.
+    """
+    parsed = parse_french_date(text)
+    if parsed is not None or not text or not text.strip():
+        return parsed
+    try:
+        import dateparser
+    except ImportError:
+        return None
+    parsed = dateparser.parse(text, languages=['fr'])
+    return parsed.date() if parsed else None
+
+
+def review_date_columns(text):
+    """
+    Colonnes de date d'un avis calculées à l'ingestion : date ISO, année, mois et saison.
+    :param text: Date de l'avis (texte).
+    :return: Dictionnaire {"review_date_iso", "review_year", "review_month", "review_season"} (valeurs nulles si inconnue).
+    """
+    parsed = parse_review_date(text)
+    if parsed is None:
+        return {"review_date_iso": None, "review_year": None, "review_month": None, "review_season": None}
+    return {
+        "review_date_iso": parsed.isoformat(),
+        "review_year": parsed.year,
+        "review_month": parsed.month,
+        "review_season": SEASONS[parsed.month],
+    }
+
+
+def normalize_query(text):
+    """
+    Normalise une adresse ou un nom pour servir de clé de cache : minuscules, sans accents,
+    ponctuation et espaces multiples remplacés par un seul espace.
+    :param text: Adresse ou nom brut.
+    :return: Texte normalisé (vide si le texte est vide).
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    return re.sub(r"[\W_]+", " ", text).strip()
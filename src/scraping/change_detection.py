@@ -0,0 +1,54 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Décisions possibles pour un restaurant de la liste
+NEW = "new"  # Absent de l'entrepôt : scraping complet
+UNCHANGED = "unchanged"  # Même nombre d'avis et même note : rien à récupérer
+INCREMENTAL = "incremental"  # Quelques nouveaux avis : seuls les avis absents de l'entrepôt sont récupérés
+FULL = "full"  # Changement important : scraping complet
+
+
+def classify_change(card, snapshot, max_incremental_delta=50):
+    """
+    Compare une carte de la liste des restaurants avec l'état enregistré dans l'entrepôt.
+    :param card: Carte {"url", "reviews_count", "rating"} de la liste.
+    :param snapshot: État {"reviews_count", "rating"} du dernier crawl, ou None si le restaurant est inconnu.
+    :param max_incremental_delta: Nombre maximal de nouveaux avis pour un scraping incrémental.
+    :return: NEW, UNCHANGED, INCREMENTAL ou FULL.
+    """
+    if snapshot is None or snapshot["reviews_count"] is None:
+        return NEW
+
+    delta = card["reviews_count"] - snapshot["reviews_count"]
+    # Une note absente de la carte ne compte pas comme un changement
+    rating_changed = card.get("rating") is not None and card["rating"] != snapshot["rating"]
+
+    if delta == 0:
+        return FULL if rating_changed else UNCHANGED
+    if 0 < delta <= max_incremental_delta:
+        # Une variation de la note accompagne normalement les nouveaux avis
+        return INCREMENTAL
+    # Avis supprimés ou forte hausse : l'état enregistré n'est plus fiable
+    return FULL
+
+
+def plan_refresh(cards, snapshots, max_incremental_delta=50, counts=None):
+    """
+    Filtre les cartes de la liste pour un rafraîchissement : les restaurants inchangés sont ignorés
+    et les autres sont renvoyés avec leur décision, au fil de la découverte.
+    :param cards: Cartes de la liste (liste ou générateur, voir iter_restaurant_cards).
+    :param snapshots: États du dernier crawl (voir load_restaurant_snapshots).
+    :param max_incremental_delta: Nombre maximal de nouveaux avis pour un scraping incrémental.
+    :param counts: Dictionnaire complété avec le nombre de restaurants par décision (facultatif).
+    :return: Générateur de tuples (url, décision), sans les restaurants inchangés.
+    """
+    counts = counts if counts is not None else {}
+    for card in cards:
+        decision = classify_change(card, snapshots.get(card["url"]), max_incremental_delta)
+        counts[decision] = counts.get(decision, 0) + 1
+        if decision == UNCHANGED:
+            logger.info("Restaurant inchangé, ignoré : %s", card['url'])
+            continue
+        logger.info("Restaurant à rafraîchir (%s) : %s", decision, card['url'])
+        yield card["url"], decision
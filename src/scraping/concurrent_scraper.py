@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import queue
+import threading
+
+from scraping.scraper_utils import host_limiter, scrape_restaurant
+from database.warehouse_queries import load_known_reviews
+
+logger = logging.getLogger(__name__)
+
+# Marqueur envoyé quand toutes les URLs ont été soumises, avec leur nombre
+_SUBMITTED = object()
+
+
+def _scrape_one(url, db_path=None, since=None, page_workers=1, incremental=None):
+    """
+    Scrape un restaurant, en mode incrémental si une base de données est fournie.
+    :param url: URL du restaurant.
+    :param db_path: Chemin de l'entrepôt où chercher les avis déjà stockés.
+    :param since: Date limite des avis à récupérer.
+    :param page_workers: Nombre de pages d'avis téléchargées en parallèle pour ce restaurant.
+    :param incremental: URLs à scraper en mode incrémental (par défaut, toutes si db_path est fourni).
+    :return: Le dictionnaire renvoyé par scrape_restaurant.
+    """
+    use_db = db_path and (incremental is None or url in incremental)
+    known_reviews = load_known_reviews(db_path, url) if use_db else None
+    return scrape_restaurant(url, known_reviews=known_reviews, since=since, page_workers=page_workers)
+
+
+def iter_scraped_restaurants(urls, max_workers=4, per_host_limit=2, db_path=None, since=None,
+                             page_workers=1, incremental=None):
+    """
+    Scrape plusieurs restaurants en parallèle avec un pool de workers borné et renvoie chaque
+    restaurant dès qu'il est terminé, pour pouvoir l'écrire sans attendre la fin du crawl.
+    Chaque worker suit la pagination des avis de son restaurant, ce qui permet de récupérer
+    des pages de plusieurs restaurants en même temps.
+    :param urls: URLs des restaurants à scraper : une liste ou un générateur (voir iter_restaurant_list).
+    :param max_workers: Nombre maximal de restaurants traités simultanément (limite globale).
+    :param per_host_limit: Nombre maximal de requêtes simultanées vers un même hôte (politesse).
+    :param db_path: Entrepôt SQLite pour un scraping incrémental des avis (facultatif).
+    :param since: Date limite (datetime.date) des avis à récupérer (facultative).
+    :param page_workers: Pages d'avis téléchargées en parallèle par restaurant (URLs prédites).
+    :param incremental: Ensemble des URLs à scraper en mode incrémental, qui peut être complété pendant
+                        le crawl (par défaut, toutes si db_path est fourni).
+    :return: Générateur de tuples (url, données), les données valant None en cas d'échec.
+    """
+    host_limiter.set_limit(per_host_limit)
+    completed = queue.Queue()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+        def submit_urls():
+            # Les URLs sont soumises dès qu'elles arrivent (la découverte peut être encore en cours)
+            submitted = 0
+            try:
+                for url in urls:
+                    future = executor.submit(_scrape_one, url, db_path, since, page_workers, incremental)
+                    future.add_done_callback(lambda f, url=url: completed.put((url, f)))
+                    submitted += 1
+            except Exception as e:
+                logger.error("Erreur lors de la lecture des URLs à scraper : %s", e)
+            finally:
+                completed.put((_SUBMITTED, submitted))
+
+        threading.Thread(target=submit_urls, daemon=True).start()
+
+        submitted = None
+        done = 0
+        while submitted is None or done < submitted:
+            url, future = completed.get()
+            if url is _SUBMITTED:
+                submitted = future
+                continue
+            done += 1
+            try:
+                data = future.result()
+            except Exception as e:
+                logger.error("Erreur lors du scraping de %s : %s", url, e)
+                data = None
+            logger.info("Restaurant %s/%s terminé : %s", done, submitted or '?', url)
+            yield url, data
+
+
+def scrape_restaurants_concurrently(urls, **kwargs):
+    """
+    Scrape plusieurs restaurants en parallèle (voir iter_scraped_restaurants).
+    :param urls: Liste des URLs des restaurants à scraper.
+    :return: Liste des dictionnaires renvoyés par scrape_restaurant, dans l'ordre des URLs.
+    """
+    results = dict(iter_scraped_restaurants(urls, **kwargs))
+    return [results[url] for url in urls if results.get(url)]
@@ -0,0 +1,131 @@
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Configuration du cache HTML (désactivé par défaut, activé par --cache ou --replay)
+CACHE_CONFIG = {
+    "enabled": False,
+    "replay": False,  # Mode hors ligne : ne sert que depuis le cache, aucun appel réseau
+    "directory": "data/cache/html",
+    "ttl": 7 * 24 * 3600,  # Durée de validité d'une page en secondes
+}
+
+_stats = {"hits": 0, "misses": 0, "writes": 0}
+_stats_lock = threading.Lock()
+
+
+class CachedResponse:
+    """
+    Réponse HTTP minimale servie depuis le cache, compatible avec l'usage fait de requests.Response
+    dans les fonctions de récupération (status_code, text, content).
+    """
+
+    def __init__(self, url, text, status_code=200):
+        self.url = url
+        self.text = text
+        self.content = text.encode("utf-8") if text is not None else b""
+        self.status_code = status_code
+        self.from_cache = True
+
+
+def configure_cache(enabled=None, replay=None, directory=None, ttl=None):
+    """
+    Modifie la configuration du cache HTML.
+    :param enabled: Active la lecture et l'écriture du cache.
+    :param replay: Mode rejeu : les pages absentes du cache ne sont pas téléchargées.
+    :param directory: Dossier de stockage des pages compressées.
+    :param ttl: Durée de validité d'une page en secondes (ignorée en mode rejeu).
+    """
+    if enabled is not None:
+        CACHE_CONFIG["enabled"] = enabled
+    if replay is not None:
+        CACHE_CONFIG["replay"] = replay
+        if replay:
+            CACHE_CONFIG["enabled"] = True
+    if directory is not None:
+        CACHE_CONFIG["directory"] = directory
+    if ttl is not None:
+        CACHE_CONFIG["ttl"] = ttl
+
+
+def cache_key(url):
+    """
+    Forme canonique d'une URL pour le cache : schéma et hôte en minuscules, paramètres de la requête
+    triés, fragment supprimé. Deux URLs de la même page partagent ainsi la même entrée.
+    :param url: L'URL de la page.
+    :return: L'URL canonique.
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ""))
+
+
+def cache_path(url):
+    """
+    Calcule le chemin du fichier de cache d'une URL (clé : empreinte SHA-256 de l'URL canonique).
+    :param url: L'URL de la page.
+    :return: Chemin du fichier compressé.
+    """
+    key = hashlib.sha256(cache_key(url).encode("utf-8")).hexdigest()
+    return Path(CACHE_CONFIG["directory"]) / key[:2] / f"{key}.html.gz"
+
+
+def _count(stat):
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def get_cached_page(url):
+    """
+    Lit une page depuis le cache si elle existe et n'est pas expirée.
+    :param url: L'URL de la page.
+    :return: Le HTML de la page, sinon None.
+    """
+    path = cache_path(url)
+    try:
+        age = time.time() - path.stat().st_mtime
+        if not CACHE_CONFIG["replay"] and age > CACHE_CONFIG["ttl"]:
+            _count("misses")
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            html = f.read()
+    except (OSError, EOFError):
+        _count("misses")
+        return None
+    _count("hits")
+    return html
+
+
+def store_page(url, html):
+    """
+    Enregistre une page dans le cache, compressée en gzip. L'écriture passe par un fichier
+    temporaire pour que des workers concurrents ne lisent jamais une page à moitié écrite.
+    :param url: L'URL de la page.
+    :param html: Le HTML de la page.
+    """
+    path = cache_path(url)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+            f.write(html)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _count("writes")
+
+
+def cache_stats():
+    """
+    Retourne les compteurs du cache (pages servies, manquantes et écrites).
+    :return: Dictionnaire des compteurs.
+    """
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scraping.html_cache import CACHE_CONFIG, CachedResponse, get_cached_page, store_page
+from scraping.rate_control import rate_controller
+from scraping.metrics import metrics
+
+# Négociation de la compression : brotli n'est proposé que si le décodeur est installé
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# Configuration par défaut du pool de connexions
+SESSION_CONFIG = {
+    "pool_size": 10,  # Connexions conservées par hôte
+    "keep_alive": True,  # Réutilisation des connexions TCP/TLS entre les requêtes
+    "timeout": (5, 10),  # Budget par requête : (connexion, lecture) en secondes
+}
+
+_session = None
+_session_lock = threading.Lock()
+_request_count = 0
+
+
+def _reset_after_fork():
+    """
+    Un processus enfant créé par fork ne doit pas réutiliser les sockets du pool de son parent :
+    les réponses des deux processus se mélangeraient sur la même connexion.
+    """
+    global _session, _session_lock, _request_count
+    _session = None
+    _session_lock = threading.Lock()
+    _request_count = 0
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def configure_session(pool_size=None, keep_alive=None, timeout=None):
+    """
+    Modifie la configuration de la session partagée. La session est recréée à la prochaine requête.
+    :param pool_size: Nombre de connexions conservées par hôte.
+    :param keep_alive: Active ou non la réutilisation des connexions.
+    :param timeout: Budget par requête, en secondes ou sous la forme (connexion, lecture).
+    """
+    global _session
+    with _session_lock:
+        if pool_size is not None:
+            SESSION_CONFIG["pool_size"] = pool_size
+        if keep_alive is not None:
+            SESSION_CONFIG["keep_alive"] = keep_alive
+        if timeout is not None:
+            SESSION_CONFIG["timeout"] = timeout
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_session():
+    """
+    Retourne la session HTTP partagée par toutes les fonctions de récupération, en la créant si besoin.
+    :return: Un objet requests.Session avec un pool de connexions.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=SESSION_CONFIG["pool_size"],
+                pool_maxsize=SESSION_CONFIG["pool_size"],
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "Accept-Encoding": ACCEPT_ENCODING,
+                "Connection": "keep-alive" if SESSION_CONFIG["keep_alive"] else "close",
+            })
+            _session = session
+        return _session
+
+
+def wire_size(response):
+    """
+    Taille de la réponse telle que transférée sur le réseau, avant décompression gzip/br : l'en-tête
+    Content-Length s'il est présent, sinon les octets lus sur la connexion.
+    :param response: Réponse requests, au contenu déjà lu.
+    :return: Nombre d'octets téléchargés.
+    """
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit():
+        return int(length)
+    raw = getattr(response, "raw", None)
+    if raw is not None and hasattr(raw, "tell"):
+        return raw.tell()
+    return len(response.content)
+
+
+def retry_after_seconds(response):
+    """
+    Délai demandé par le serveur dans l'en-tête Retry-After (en secondes ou sous forme de date HTTP).
+    :param response: Réponse requests.
+    :return: Délai en secondes, ou None si l'en-tête est absent ou illisible.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_date.tzinfo is None:
+        retry_date = retry_date.replace(tzinfo=timezone.utc)
+    return max((retry_date - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def http_get(url, headers=None, timeout=None):
+    """
+    Effectue une requête GET via la session partagée, en passant d'abord par le cache HTML s'il est actif.
+    Chaque requête réseau attend son créneau auprès du régulateur de débit et lui signale son résultat
+    (avec le délai de l'en-tête Retry-After d'un blocage ou d'une erreur serveur).
+    :param url: L'URL à récupérer.
+    :param headers: En-têtes HTTP supplémentaires.
+    :param timeout: Budget de la requête (par défaut celui de la configuration).
+    :return: L'objet requests.Response, ou un CachedResponse si la page vient du cache.
+    """
+    global _request_count
+    if CACHE_CONFIG["enabled"]:
+        html = get_cached_page(url)
+        if html is not None:
+            metrics.inc("scraper_cache_hits_total")
+            return CachedResponse(url, html)
+        if CACHE_CONFIG["replay"]:
+            # Page absente du cache en mode rejeu : aucune requête réseau
+            return CachedResponse(url, None, status_code=504)
+
+    session = get_session()
+    metrics.inc("scraper_rate_wait_seconds_total", rate_controller.acquire())
+    with _session_lock:
+        _request_count += 1
+    start = time.perf_counter()
+    try:
+        response = session.get(url, headers=headers, timeout=timeout or SESSION_CONFIG["timeout"])
+    except requests.exceptions.RequestException:
+        metrics.observe("scraper_request_seconds", time.perf_counter() - start, outcome="error")
+        metrics.inc("scraper_network_errors_total")
+        rate_controller.record_error()
+        raise
+    metrics.observe("scraper_request_seconds", time.perf_counter() - start, outcome="response")
+    metrics.inc("scraper_http_responses_total", status=str(response.status_code))
+    metrics.inc("scraper_bytes_downloaded_total", wire_size(response))
+
+    if response.status_code in (403, 429):
+        rate_controller.record_block(retry_after_seconds(response))
+    elif response.status_code >= 500:
+        rate_controller.record_error(retry_after_seconds(response))
+    else:
+        rate_controller.record_success()
+
+    if CACHE_CONFIG["enabled"] and response.status_code == 200:
+        store_page(url, response.text)
+    return response
+
+
+def connection_stats():
+    """
+    Calcule la réutilisation des connexions de la session partagée.
+    :return: Dictionnaire avec le nombre de requêtes, de connexions ouvertes et le taux de réutilisation.
+    """
+    connections = 0
+    with _session_lock:
+        requests_sent = _request_count
+        if _session is not None:
+            for adapter in set(_session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is not None:
+                        connections += pool.num_connections
+
+    reused = max(requests_sent - connections, 0)
+    return {
+        "requests": requests_sent,
+        "connections": connections,
+        "reused": reused,
+        "reuse_ratio": reused / requests_sent if requests_sent else 0.0,
+    }
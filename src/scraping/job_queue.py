@@ -0,0 +1,313 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from scraping.scraper_utils import fetch_html, review_page_url
+from scraping.parsers import parse_restaurant_html, parse_reviews_html
+
+logger = logging.getLogger(__name__)
+
+# Nombre d'avis par page d'avis TripAdvisor
+REVIEWS_PER_PAGE = 15
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id_job INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,  -- "restaurant" ou "review_page"
+    url TEXT NOT NULL,
+    restaurant_url TEXT NOT NULL,
+    position INTEGER NOT NULL DEFAULT 0,  -- Offset de la page d'avis
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending, leased, done, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    available_at REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    exported INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL,
+    UNIQUE(kind, url)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_restaurant ON jobs(restaurant_url, kind);
+'''
+
+
+class JobQueue:
+    """
+    File de tâches de scraping durable, stockée dans un fichier SQLite partagé par les workers d'une
+    même machine. Le mode WAL repose sur une mémoire partagée entre processus (fichier -shm) et sur des
+    verrous que NFS et SMB ne garantissent pas : le fichier doit être sur un disque local, et les
+    workers de plusieurs machines ne doivent pas ouvrir la même file.
+    Chaque tâche est réservée par un worker pour une durée limitée (bail) : si le worker s'arrête,
+    le bail expire et la tâche est reprise par un autre worker. Les échecs sont retentés avec un
+    délai croissant, jusqu'à max_attempts tentatives.
+    """
+
+    def __init__(self, db_path, lease_seconds=300, retry_delay=30):
+        """
+        :param db_path: Chemin du fichier SQLite de la file, sur un disque local de la machine des workers.
+        :param lease_seconds: Durée du bail d'une tâche réservée, en secondes.
+        :param retry_delay: Délai avant la première nouvelle tentative d'une tâche échouée (doublé à chaque échec).
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        """
+        Connexion propre au thread courant (sqlite3 n'autorise pas le partage entre threads). Le mode WAL
+        laisse les workers lire pendant qu'un autre écrit, mais n'est sûr qu'entre processus d'un même hôte.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, kind, url, restaurant_url=None, position=0, max_attempts=3):
+        """
+        Ajoute une tâche si elle n'est pas déjà dans la file.
+        :param kind: "restaurant" ou "review_page".
+        :param url: URL de la page à scraper.
+        :param restaurant_url: URL du restaurant auquel appartient la page (par défaut, url).
+        :param position: Offset de la page d'avis, pour réassembler les avis dans l'ordre.
+        :param max_attempts: Nombre maximal de tentatives.
+        :return: True si la tâche a été ajoutée.
+        """
+        cursor = self._connect().execute('''
+        INSERT OR IGNORE INTO jobs (kind, url, restaurant_url, position, max_attempts, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', (kind, url, restaurant_url or url, position, max_attempts, time.time()))
+        return cursor.rowcount > 0
+
+    def enqueue_restaurants(self, urls, max_attempts=3):
+        """
+        Ajoute des restaurants à scraper.
+        :param urls: URLs des restaurants (liste ou générateur).
+        :return: Nombre de restaurants ajoutés (les doublons sont ignorés).
+        """
+        return sum(self.enqueue("restaurant", url, max_attempts=max_attempts) for url in urls)
+
+    def claim(self, worker_id):
+        """
+        Réserve la prochaine tâche disponible : en attente, ou réservée par un worker dont le bail a expiré.
+        Les pages d'avis passent avant les restaurants pour terminer les restaurants déjà commencés.
+        :param worker_id: Identifiant du worker.
+        :return: Dictionnaire de la tâche, ou None si aucune tâche n'est disponible.
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Bail expiré après la dernière tentative : la tâche est abandonnée
+            conn.execute('''
+            UPDATE jobs SET status = 'failed', error = 'bail expiré', lease_owner = NULL, updated_at = ?
+            WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts
+            ''', (now, now))
+            row = conn.execute('''
+            SELECT id_job, kind, url, restaurant_url, position, attempts FROM jobs
+            WHERE (status = 'pending' AND available_at <= ?) OR (status = 'leased' AND lease_expires < ?)
+            ORDER BY kind = 'restaurant', available_at, id_job
+            LIMIT 1
+            ''', (now, now)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute('''
+            UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1,
+                            updated_at = ?
+            WHERE id_job = ?
+            ''', (worker_id, now + self.lease_seconds, now, row[0]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        job_id, kind, url, restaurant_url, position, attempts = row
+        return {"id": job_id, "kind": kind, "url": url, "restaurant_url": restaurant_url,
+                "position": position, "attempt": attempts + 1}
+
+    def complete(self, job, worker_id, result):
+        """
+        Marque une tâche comme terminée et enregistre son résultat.
+        :param job: Tâche renvoyée par claim.
+        :param worker_id: Identifiant du worker qui détient le bail.
+        :param result: Résultat sérialisable en JSON.
+        :return: False si le bail a été perdu entre-temps (la tâche a été reprise par un autre worker).
+        """
+        cursor = self._connect().execute('''
+        UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_owner = NULL, updated_at = ?
+        WHERE id_job = ? AND status = 'leased' AND lease_owner = ?
+        ''', (json.dumps(result, ensure_ascii=False), time.time(), job["id"], worker_id))
+        return cursor.rowcount > 0
+
+    def fail(self, job, worker_id, error):
+        """
+        Enregistre l'échec d'une tâche : elle est remise en attente avec un délai croissant,
+        ou abandonnée après sa dernière tentative.
+        :param job: Tâche renvoyée par claim.
+        :param worker_id: Identifiant du worker qui détient le bail.
+        :param error: Message d'erreur.
+        """
+        now = time.time()
+        self._connect().execute('''
+        UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END,
+                        available_at = ?, error = ?, lease_owner = NULL, updated_at = ?
+        WHERE id_job = ? AND status = 'leased' AND lease_owner = ?
+        ''', (now + self.retry_delay * 2 ** (job["attempt"] - 1), str(error), now, job["id"], worker_id))
+
+    def stats(self):
+        """
+        Compte les tâches par type et par statut.
+        :return: Dictionnaire {(type, statut): nombre}.
+        """
+        rows = self._connect().execute("SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status")
+        return {(kind, status): count for kind, status, count in rows}
+
+    def has_unfinished(self):
+        """Indique s'il reste des tâches en attente ou réservées."""
+        row = self._connect().execute(
+            "SELECT 1 FROM jobs WHERE status IN ('pending', 'leased') LIMIT 1"
+        ).fetchone()
+        return row is not None
+
+    def iter_completed_restaurants(self):
+        """
+        Réassemble les restaurants terminés et pas encore exportés : en-tête, avis de la première page
+        puis avis des pages suivantes dans l'ordre des offsets. Un restaurant est terminé quand sa tâche
+        et toutes ses pages d'avis sont terminées ou abandonnées.
+        :return: Générateur de tuples (url, données).
+        """
+        conn = self._connect()
+        urls = [url for (url,) in conn.execute('''
+        SELECT r.url FROM jobs r
+        WHERE r.kind = 'restaurant' AND r.status = 'done' AND r.exported = 0
+        AND NOT EXISTS (
+            SELECT 1 FROM jobs p
+            WHERE p.kind = 'review_page' AND p.restaurant_url = r.url AND p.status IN ('pending', 'leased')
+        )
+        ORDER BY r.id_job
+        ''')]
+        for url in urls:
+            (result,) = conn.execute(
+                "SELECT result FROM jobs WHERE kind = 'restaurant' AND url = ?", (url,)
+            ).fetchone()
+            restaurant = json.loads(result)
+            reviews = restaurant["reviews"]
+            pages = conn.execute('''
+            SELECT status, result FROM jobs WHERE kind = 'review_page' AND restaurant_url = ? ORDER BY position
+            ''', (url,)).fetchall()
+            # Une page prédite et la même page atteinte par un lien peuvent se recouvrir : dédoublonnage
+            seen = {(review["author"], review["review_text"]) for review in reviews}
+            for status, page_result in pages:
+                if status != "done":
+                    continue
+                for review in json.loads(page_result)["reviews"]:
+                    key = (review["author"], review["review_text"])
+                    if key not in seen:
+                        seen.add(key)
+                        reviews.append(review)
+            failed = sum(1 for status, _ in pages if status == "failed")
+            if failed:
+                logger.warning("%s pages d'avis abandonnées pour %s.", failed, url)
+            yield url, {**restaurant["header"], "reviews": reviews, "url": url}
+
+    def mark_exported(self, url):
+        """Note qu'un restaurant a été exporté, pour ne pas l'exporter deux fois."""
+        self._connect().execute(
+            "UPDATE jobs SET exported = 1 WHERE kind = 'restaurant' AND url = ?", (url,)
+        )
+
+
+def process_job(job_queue, job):
+    """
+    Exécute une tâche. La page principale d'un restaurant ajoute à la file les pages d'avis prédites
+    à partir du nombre d'avis (motif '-orNN-', comme scrape_reviews_fanout) ; chaque page d'avis ajoute
+    aussi le lien 'Page suivante' qu'elle contient, ce qui couvre une pagination différente de la prédiction.
+    :param job_queue: La file de tâches.
+    :param job: Tâche renvoyée par claim.
+    :return: Résultat de la tâche.
+    :raises RuntimeError: Si la page n'a pas pu être récupérée ou est incomplète.
+    """
+    html = fetch_html(job["url"])
+    if html is None:
+        raise RuntimeError(f"page introuvable : {job['url']}")
+
+    reviews, next_url = parse_reviews_html(html)
+    page_size = len(reviews) or REVIEWS_PER_PAGE
+
+    if job["kind"] == "restaurant":
+        header = parse_restaurant_html(html)
+        if header is None:
+            raise RuntimeError(f"données incomplètes : {job['url']}")
+        predicted = [review_page_url(job["url"], offset)
+                     for offset in range(page_size, header["reviews_count"] or 0, page_size)]
+        if next_url and predicted and predicted[0] == next_url:
+            for index, url in enumerate(predicted, start=1):
+                job_queue.enqueue("review_page", url, job["url"], position=index * page_size)
+        elif next_url:
+            job_queue.enqueue("review_page", next_url, job["url"], position=page_size)
+        return {"header": header, "reviews": reviews}
+
+    if next_url and reviews:
+        # Déjà dans la file si la prédiction était juste : l'ajout est alors ignoré
+        job_queue.enqueue("review_page", next_url, job["restaurant_url"], position=job["position"] + page_size)
+    return {"reviews": reviews}
+
+
+def run_worker(db_path, threads=1, poll_interval=5.0, lease_seconds=300, worker_id=None):
+    """
+    Worker de scraping : réserve et exécute des tâches jusqu'à ce que la file soit vide.
+    Plusieurs workers (processus d'une même machine) peuvent partager la même file.
+    :param db_path: Chemin du fichier SQLite de la file.
+    :param threads: Nombre de tâches exécutées en parallèle par ce worker.
+    :param poll_interval: Attente en secondes quand toutes les tâches restantes sont réservées par d'autres.
+    :param lease_seconds: Durée du bail d'une tâche réservée.
+    :param worker_id: Identifiant du worker (par défaut, hôte, processus et suffixe aléatoire).
+    :return: Nombre de tâches terminées par ce worker.
+    """
+    job_queue = JobQueue(db_path, lease_seconds=lease_seconds)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    completed = [0]
+    lock = threading.Lock()
+
+    def work(thread_id):
+        owner = f"{worker_id}-{thread_id}"
+        while True:
+            job = job_queue.claim(owner)
+            if job is None:
+                if not job_queue.has_unfinished():
+                    return
+                time.sleep(poll_interval)
+                continue
+            try:
+                result = process_job(job_queue, job)
+            except Exception as e:
+                logger.warning("Échec de la tâche %s %s (tentative %s) : %s", job['kind'], job['url'], job['attempt'], e)
+                job_queue.fail(job, owner, e)
+                continue
+            if job_queue.complete(job, owner, result):
+                with lock:
+                    completed[0] += 1
+            else:
+                logger.warning("Bail perdu pour %s, résultat ignoré.", job['url'])
+
+    workers = [threading.Thread(target=work, args=(i,), daemon=True) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    logger.info("Worker %s terminé : %s tâches.", worker_id, completed[0])
+    return completed[0]
@@ -0,0 +1,257 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import functools
+import os
+import threading
+import time
+
+# Bornes des histogrammes, en secondes : requêtes réseau et analyse d'une page
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PARSE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+# Description des métriques, reprise dans l'export Prometheus
+METRICS = {
+    "scraper_request_seconds": ("histogram", "Durée des requêtes HTTP vers TripAdvisor.", LATENCY_BUCKETS),
+    "scraper_parse_seconds": ("histogram", "Durée d'analyse d'une page HTML.", PARSE_BUCKETS),
+    "scraper_http_responses_total": ("counter", "Réponses HTTP par code de statut.", None),
+    "scraper_network_errors_total": ("counter", "Requêtes échouées sans réponse (erreur réseau, délai dépassé).", None),
+    "scraper_cache_hits_total": ("counter", "Pages servies par le cache HTML.", None),
+    "scraper_bytes_downloaded_total": ("counter", "Octets de HTML téléchargés (taille transférée, avant décompression).", None),
+    "scraper_retries_total": ("counter", "Nouvelles tentatives de téléchargement, par motif.", None),
+    "scraper_rate_wait_seconds_total": ("counter", "Attente imposée par le régulateur de débit.", None),
+    "scraper_host_wait_seconds_total": ("counter", "Attente d'un créneau de la limite de requêtes par hôte.", None),
+    "scraper_reviews_total": ("counter", "Avis extraits des pages analysées.", None),
+}
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """
+    Compteurs et histogrammes du scraper, partagés par tous les threads du processus.
+    Les valeurs sont exportées au format texte de Prometheus et résumées en fin d'exécution.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}  # {(nom, labels): valeur}
+        self._histograms = {}  # {(nom, labels): [compteurs par borne, somme, nombre]}
+        self.started = time.monotonic()
+        self.export_path = None
+
+    def inc(self, name, value=1, **labels):
+        """
+        Incrémente un compteur.
+        :param name: Nom de la métrique (voir METRICS).
+        :param value: Valeur à ajouter.
+        :param labels: Labels de la série (par exemple status="200").
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """
+        Ajoute une observation à un histogramme.
+        :param name: Nom de la métrique (voir METRICS).
+        :param value: Valeur observée, en secondes.
+        :param labels: Labels de la série (par exemple page="reviews").
+        """
+        buckets = METRICS[name][2]
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(buckets), 0.0, 0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def timed(self, name, **labels):
+        """
+        Décorateur qui enregistre la durée de chaque appel de la fonction dans un histogramme.
+        :param name: Nom de l'histogramme.
+        :param labels: Labels de la série.
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start, **labels)
+            return wrapper
+        return decorator
+
+    def counter_total(self, name, **labels):
+        """Somme d'un compteur sur les séries dont les labels correspondent."""
+        with self._lock:
+            return sum(value for (metric, key), value in self._counters.items()
+                       if metric == name and set(labels.items()) <= set(key))
+
+    def histogram_stats(self, name):
+        """
+        Agrège toutes les séries d'un histogramme.
+        :return: Dictionnaire avec le nombre d'observations, la somme, la moyenne et les quantiles 50 et 95
+                 (estimés par la borne supérieure de l'intervalle qui les contient).
+        """
+        buckets = METRICS[name][2]
+        cumulative = [0] * len(buckets)
+        total, count = 0.0, 0
+        with self._lock:
+            for (metric, _), (counts, series_sum, series_count) in self._histograms.items():
+                if metric == name:
+                    cumulative = [a + b for a, b in zip(cumulative, counts)]
+                    total += series_sum
+                    count += series_count
+
+        def quantile(q):
+            for bound, value in zip(buckets, cumulative):
+                if value >= q * count:
+                    return bound
+            return float("inf")
+
+        return {
+            "count": count,
+            "sum": total,
+            "mean": total / count if count else 0.0,
+            "p50": quantile(0.5) if count else 0.0,
+            "p95": quantile(0.95) if count else 0.0,
+        }
+
+    def render_prometheus(self):
+        """
+        Exporte toutes les métriques au format texte de Prometheus.
+        :return: Le texte de l'export.
+        """
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(counts), total, count) for key, (counts, total, count) in self._histograms.items()}
+
+        for name, (kind, description, buckets) in METRICS.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (metric, key), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(key)} {value}")
+            else:
+                for (metric, key), (counts, total, count) in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, value in zip(buckets, counts):
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', bound)])} {value}")
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {total}")
+                    lines.append(f"{name}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """
+        Écrit l'export Prometheus dans un fichier (collecteur textfile de node_exporter), de façon atomique.
+        :param path: Chemin du fichier .prom.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def start_file_export(self, path, interval=15.0):
+        """
+        Réécrit le fichier d'export Prometheus à intervalle régulier pendant l'exécution (voir flush).
+        :param path: Chemin du fichier .prom.
+        :param interval: Intervalle entre deux écritures, en secondes.
+        """
+        self.export_path = path
+
+        def export_loop():
+            while True:
+                time.sleep(interval)
+                self.flush()
+
+        threading.Thread(target=export_loop, daemon=True).start()
+
+    def flush(self):
+        """Écrit le fichier d'export Prometheus s'il a été configuré."""
+        if self.export_path:
+            self.write_prometheus(self.export_path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        Expose les métriques sur http://host:port/metrics dans un thread, le temps de l'exécution.
+        :param port: Port d'écoute.
+        :param host: Adresse d'écoute (locale par défaut).
+        :return: Le serveur HTTP démarré.
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def summary(self):
+        """
+        Résume l'exécution : volume, latences, temps d'attente et d'analyse, pour savoir si le crawl est
+        limité par le réseau, par l'analyse HTML ou par la politesse (débit et limite par hôte).
+        :return: Dictionnaire du résumé.
+        """
+        elapsed = time.monotonic() - self.started
+        requests = self.histogram_stats("scraper_request_seconds")
+        parse = self.histogram_stats("scraper_parse_seconds")
+        reviews = self.counter_total("scraper_reviews_total")
+        waits = {
+            "réseau": requests["sum"],
+            "analyse": parse["sum"],
+            "politesse": (self.counter_total("scraper_rate_wait_seconds_total")
+                          + self.counter_total("scraper_host_wait_seconds_total")),
+        }
+        return {
+            "elapsed_seconds": elapsed,
+            "requests": requests["count"],
+            "request_p50": requests["p50"],
+            "request_p95": requests["p95"],
+            "errors": self.counter_total("scraper_network_errors_total"),
+            "blocked": (self.counter_total("scraper_http_responses_total", status="403")
+                        + self.counter_total("scraper_http_responses_total", status="429")),
+            "retries": self.counter_total("scraper_retries_total"),
+            "cache_hits": self.counter_total("scraper_cache_hits_total"),
+            "megabytes": self.counter_total("scraper_bytes_downloaded_total") / 1e6,
+            "parse_ms": parse["mean"] * 1000,
+            "pages_parsed": parse["count"],
+            "reviews": reviews,
+            "reviews_per_second": reviews / elapsed if elapsed else 0.0,
+            "time_by_stage": waits,
+            "bound_by": max(waits, key=waits.get) if any(waits.values()) else None,
+        }
+
+
+# Registre unique utilisé par toutes les fonctions de scraping du processus
+metrics = MetricsRegistry()
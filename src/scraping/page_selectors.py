@@ -0,0 +1,71 @@
+from lxml import etree
+
+
+def has_class(token):
+    """
+    Condition XPath équivalente à un sélecteur de classe CSS (.token).
+    :param token: Nom d'une classe.
+    :return: Expression XPath.
+    """
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {token} ')"
+
+
+def has_classes(*tokens):
+    """
+    Condition XPath équivalente à un sélecteur CSS à plusieurs classes (.a.b.c), quel que soit leur ordre.
+    """
+    return " and ".join(has_class(token) for token in tokens)
+
+
+def class_is(value):
+    """
+    Condition XPath équivalente à BeautifulSoup find(..., class_="a b c") : l'attribut class,
+    espaces normalisés, doit être exactement la chaîne donnée.
+    """
+    return f"normalize-space(@class) = '{value}'"
+
+
+# Registre central des sélecteurs des pages TripAdvisor. Les valeurs reprennent les classes utilisées
+# par les fonctions BeautifulSoup de scraper_utils, qui servent de référence pour la parité.
+SELECTORS = {
+    # Pages d'avis
+    "review_cards": f"//div[{has_class('_c')} and @data-automation='reviewCard']",
+    "review_author": f".//a[{class_is('BMQDV _F Gv wSSLS SwZTJ FGwzt ukgoS')}]",
+    "review_contributions": f".//span[{has_class('b')}]",
+    "review_rating_title": f"(.//svg[{has_class('UctUV')}])[1]//title",
+    "review_title": f".//div[{class_is('biGQs _P fiohW qWPrE ncFvv fOtGX')}]",
+    "review_text": f".//span[{has_class('JguWG')}]",
+    "manager_response": f".//div[{class_is('csNQI PJ')}]",
+    "manager_response_text": f".//span[{has_class('JguWG')}]",
+    "review_date_block": f".//div[{has_class('neAPm')}]",
+    "review_date": f".//div[{class_is('biGQs _P pZUbB ncFvv osNWb')}]",
+    "next_page": "//a[@aria-label='Page suivante']",
+
+    # Page d'un restaurant
+    "restaurant_name": f"//h1[{has_classes('biGQs', '_P', 'hzzSG', 'rRtyp')}]",
+    "restaurant_address": "//span[@data-automation='restaurantsMapLinkOnName']",
+    "restaurant_reviews_count": f"//span[{has_class('OFtgC')}]",
+    "restaurant_rating_svg": f"//svg[{has_class('UctUV')} and @aria-labelledby]",
+    "title": ".//title",
+    "restaurant_ranking": f"//span[{has_class('ffHqI')}]",
+    "rating_sections": f"//div[{has_classes('YwaWb', 'u', 'f')}]",
+    "rating_section_title": f".//span[{has_classes('biGQs', '_P', 'pZUbB', 'biKBZ', 'hmDzD')}]",
+    "rating_section_value": f".//div[{has_class('JSTna')}]//title",
+    "modal_sections": f"//div[{has_class('Wf')}]",
+    "modal_section_title": ".//div",
+    "modal_section_value": "following-sibling::div[1]",
+
+    # Liste des restaurants
+    "listing_cards": f"//div[{class_is('tbrcR _T DxHsn TwZIp rrkMt nSZNd DALUy Re')}]",
+    "listing_reviews_count": (
+        f".//span[{has_classes('biGQs', '_P', 'pZUbB', 'osNWb')}]/span[{has_class('yyzcQ')}]"
+    ),
+    "listing_link": f".//a[{class_is('BMQDV _F Gv wSSLS SwZTJ FGwzt ukgoS')}]",
+    "listing_rating_title": f"(.//svg[{has_class('UctUV')}])[1]//title",
+}
+
+# Sélecteurs compilés une seule fois au chargement du module
+COMPILED = {name: etree.XPath(expression) for name, expression in SELECTORS.items()}
+
+# Texte d'un élément (concaténation de ses nœuds texte, comme .text de BeautifulSoup)
+TEXT = etree.XPath("string()")
@@ -0,0 +1,284 @@
+import argparse
+import logging
+import re
+import sys
+
+from lxml import html as lxml_html
+
+from scraping.page_selectors import COMPILED, TEXT
+from scraping.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+TRIPADVISOR_URL = "https://www.tripadvisor.fr"
+
+RATING_PATTERN = re.compile(r"([\d,\.]+) sur 5")
+RANKING_PATTERN = re.compile(r"Nº\s*(\d+)")
+TOTAL_PATTERN = re.compile(r"sur\s*([\d\u202f,]+)")
+
+_PARSER = lxml_html.HTMLParser(encoding="utf-8")
+
+
+def configure_base_url(url):
+    """
+    Modifie la base des URLs absolues construites à partir des liens des pages (par exemple un serveur local de test).
+    :param url: Schéma et hôte, sans '/' final.
+    """
+    global TRIPADVISOR_URL
+    TRIPADVISOR_URL = url.rstrip("/")
+
+
+def parse_document(html):
+    """
+    Construit l'arbre lxml d'une page HTML (beaucoup plus rapide qu'un arbre BeautifulSoup).
+    :param html: Le HTML de la page.
+    :return: L'élément racine du document.
+    """
+    return lxml_html.document_fromstring(html.encode("utf-8"), parser=_PARSER)
+
+
+def _first(name, node):
+    """Retourne le premier élément trouvé par le sélecteur du registre, sinon None."""
+    found = COMPILED[name](node)
+    return found[0] if found else None
+
+
+def _text(node):
+    """Texte d'un élément sans les espaces de début et de fin."""
+    return TEXT(node).strip()
+
+
+def _parse_review_card(card):
+    """
+    Extrait un avis à partir de sa carte (même logique que scraper_utils.parse_reviews_page).
+    :param card: Élément lxml de la carte d'avis.
+    :return: Dictionnaire de l'avis.
+    """
+    author = _first("review_author", card)
+    author = _text(author) if author is not None else "Auteur inconnu"
+
+    contributions_span = _first("review_contributions", card)
+    contributions = int(_text(contributions_span)) if contributions_span is not None else 0
+
+    rating = None
+    rating_title = _first("review_rating_title", card)
+    if rating_title is not None:
+        rating_match = RATING_PATTERN.search(TEXT(rating_title))
+        rating = float(rating_match.group(1).replace(",", ".")) if rating_match else None
+
+    review_title = _first("review_title", card)
+    review_title = _text(review_title) if review_title is not None else "Titre non spécifié"
+
+    review_text = _first("review_text", card)
+    review_text = _text(review_text) if review_text is not None else "Texte non spécifié"
+
+    manager_response = "Aucune réponse"
+    response_div = _first("manager_response", card)
+    if response_div is not None:
+        response_text_span = _first("manager_response_text", response_div)
+        if response_text_span is not None:
+            manager_response = _text(response_text_span)
+
+    review_date = _first("review_date_block", card)
+    if review_date is not None:
+        date_div = _first("review_date", review_date)
+        if date_div is None:
+            raise AttributeError("date de l'avis introuvable")
+        review_date = _text(date_div)
+    else:
+        review_date = "Date non spécifiée"
+
+    return {
+        "author": author,
+        "contributions": contributions,
+        "rating": rating,
+        "title": review_title,
+        "review_text": review_text,
+        "manager_response": manager_response,
+        "review_date": review_date,
+    }
+
+
+def _next_page_url(root):
+    """URL absolue du lien 'Page suivante', sinon None."""
+    next_button = _first("next_page", root)
+    if next_button is not None and next_button.get("href"):
+        return TRIPADVISOR_URL + next_button.get("href")
+    return None
+
+
+@metrics.timed("scraper_parse_seconds", page="reviews")
+def parse_reviews_html(html):
+    """
+    Extrait les avis d'une page d'avis et le lien vers la page suivante.
+    :param html: Le HTML de la page d'avis.
+    :return: Tuple (liste des avis, URL de la page suivante ou None).
+    """
+    root = parse_document(html)
+    reviews_data = []
+    for card in COMPILED["review_cards"](root):
+        try:
+            reviews_data.append(_parse_review_card(card))
+        except Exception as e:
+            logger.error("Erreur lors du scraping d'un avis : %s", e)
+    metrics.inc("scraper_reviews_total", len(reviews_data))
+    return reviews_data, _next_page_url(root)
+
+
+def parse_modal_details(root):
+    """
+    Extrait les informations du modal de détails (même logique que scraper_utils.scrape_modal_details).
+    :param root: Élément racine lxml de la page du restaurant.
+    :return: Dictionnaire des détails.
+    """
+    modal_data = {}
+    for section in COMPILED["modal_sections"](root):
+        title = _first("modal_section_title", section)
+        if title is not None:
+            value = _first("modal_section_value", section)
+            modal_data[_text(title)] = _text(value) if value is not None else "Non précisé"
+    return modal_data
+
+
+@metrics.timed("scraper_parse_seconds", page="restaurant")
+def parse_restaurant_html(html):
+    """
+    Extrait les informations principales d'un restaurant (même logique que scraper_utils.parse_restaurant_page).
+    :param html: Le HTML de la page du restaurant.
+    :return: Dictionnaire des informations (sans les avis), ou None si des données critiques manquent.
+    """
+    root = parse_document(html)
+
+    name = _first("restaurant_name", root)
+    address = _first("restaurant_address", root)
+    reviews_count_tag = _first("restaurant_reviews_count", root)
+    rating_svg = _first("restaurant_rating_svg", root)
+    rating = None
+    if rating_svg is not None:
+        title = _first("title", rating_svg)
+        if title is not None and "sur 5" in TEXT(title):
+            rating = float(TEXT(title).split(" sur 5")[0].replace(",", "."))
+
+    ranking_section = _first("restaurant_ranking", root)
+
+    name = _text(name) if name is not None else None
+    address = _text(address) if address is not None else None
+
+    if reviews_count_tag is not None:
+        reviews_count = int(TEXT(reviews_count_tag).replace("avis", "").replace("\u202f", "").replace(",", "").strip())
+    else:
+        reviews_count = None
+
+    ranking = None
+    total_restaurants = None
+    if ranking_section is not None:
+        ranking_text = _text(ranking_section)
+        ranking_match = RANKING_PATTERN.search(ranking_text)
+        ranking = int(ranking_match.group(1)) if ranking_match else None
+        total_match = TOTAL_PATTERN.search(ranking_text)
+        if total_match:
+            total_restaurants = total_match.group(1).replace("\u202f", "").replace(",", "")
+            total_restaurants = int(total_restaurants) if total_restaurants.isdigit() else None
+
+    if not (name and address and reviews_count and rating and ranking):
+        return None
+
+    specific_ratings = {}
+    for section in COMPILED["rating_sections"](root):
+        title = _first("rating_section_title", section)
+        svg_title = _first("rating_section_value", section)
+        if title is not None and svg_title is not None:
+            rating_match = RATING_PATTERN.search(TEXT(svg_title))
+            specific_ratings[_text(title)] = float(rating_match.group(1).replace(",", ".")) if rating_match else None
+
+    return {
+        "name": name,
+        "address": address,
+        "reviews_count": reviews_count,
+        "rating": rating,
+        "ranking": ranking,
+        "total_restaurants": total_restaurants,
+        **specific_ratings,
+        **parse_modal_details(root),
+    }
+
+
+@metrics.timed("scraper_parse_seconds", page="listing")
+def parse_listing_html(html):
+    """
+    Extrait les cartes d'une page de la liste des restaurants (même logique que scraper_utils.parse_listing_page).
+    :param html: Le HTML de la page de liste.
+    :return: Tuple (liste de dictionnaires {"url", "reviews_count", "rating"}, URL de la page suivante ou None).
+    """
+    root = parse_document(html)
+    cards = []
+    for card in COMPILED["listing_cards"](root):
+        reviews_span = _first("listing_reviews_count", card)
+        reviews_count = 0
+        if reviews_span is not None:
+            try:
+                reviews_count = int(TEXT(reviews_span).replace("\u202f", "").replace(",", ""))
+            except ValueError:
+                reviews_count = 0
+
+        rating = None
+        rating_title = _first("listing_rating_title", card)
+        if rating_title is not None:
+            rating_match = RATING_PATTERN.search(TEXT(rating_title))
+            rating = float(rating_match.group(1).replace(",", ".")) if rating_match else None
+
+        link = _first("listing_link", card)
+        url = TRIPADVISOR_URL + link.get("href") if link is not None and link.get("href") else None
+        cards.append({"url": url, "reviews_count": reviews_count, "rating": rating})
+    return cards, _next_page_url(root)
+
+
+def check_parity(html):
+    """
+    Compare les résultats des parseurs lxml et des fonctions BeautifulSoup de référence sur une page.
+    :param html: Le HTML d'une page enregistrée (avis, restaurant ou liste).
+    :return: Liste des noms des extractions qui diffèrent (vide si parité).
+    """
+    from bs4 import BeautifulSoup
+    from scraping import scraper_utils
+
+    soup = BeautifulSoup(html, "lxml")
+    differences = []
+    if parse_reviews_html(html) != (scraper_utils.parse_reviews_page(soup), scraper_utils.find_next_page_url(soup)):
+        differences.append("avis")
+    if parse_restaurant_html(html) != scraper_utils.parse_restaurant_page(soup):
+        differences.append("restaurant")
+    if parse_listing_html(html) != scraper_utils.parse_listing_page(soup):
+        differences.append("liste")
+    return differences
+
+
+def main(paths):
+    """
+    Vérifie la parité des parseurs sur des pages enregistrées (fichiers .html ou .html.gz du cache).
+    :param paths: Fichiers ou dossiers à vérifier (par défaut, le cache HTML).
+    :return: Code de sortie (0 si toutes les pages sont identiques).
+    """
+    from pathlib import Path
+    from processing.processing_utils import open_text
+    from scraping.html_cache import CACHE_CONFIG
+
+    files = []
+    for path in map(Path, paths or [CACHE_CONFIG["directory"]]):
+        files.extend(sorted(path.rglob("*.html*")) if path.is_dir() else [path])
+
+    failures = 0
+    for file in files:
+        with open_text(file) as f:
+            differences = check_parity(f.read())
+        if differences:
+            failures += 1
+            print(f"{file} : différences ({', '.join(differences)})")
+    print(f"{len(files)} pages vérifiées, {failures} en écart.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vérifie la parité des parseurs lxml avec BeautifulSoup.")
+    parser.add_argument("paths", nargs="*", help="Fichiers HTML ou dossiers (par défaut : data/cache/html).")
+    sys.exit(main(parser.parse_args().paths))
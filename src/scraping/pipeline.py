@@ -0,0 +1,247 @@
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import os
+import queue
+import threading
+import time
+
+from scraping.scraper_utils import fetch_html, filter_new_reviews, host_limiter
+from scraping.parsers import parse_restaurant_html, parse_reviews_html
+from scraping.html_cache import CACHE_CONFIG
+from scraping.metrics import metrics
+from database.warehouse_queries import load_known_reviews
+
+logger = logging.getLogger(__name__)
+
+# Signal de fin envoyé dans les files d'attente
+_STOP = None
+
+# Signal envoyé au coordinateur quand une nouvelle URL de restaurant est disponible
+_WAKE = (None, None)
+
+
+class PageJob:
+    """
+    Page à récupérer : la page principale d'un restaurant ou une de ses pages d'avis.
+    """
+
+    def __init__(self, restaurant_url, url, kind, attempt=1):
+        self.restaurant_url = restaurant_url
+        self.url = url
+        self.kind = kind  # "restaurant" ou "reviews"
+        self.attempt = attempt
+
+
+def parse_page(kind, html):
+    """
+    Analyse une page dans un processus du pool de parseurs.
+    :param kind: "restaurant" pour la page principale, "reviews" pour une page d'avis.
+    :param html: Le HTML de la page.
+    :return: Tuple (résultat, durée d'analyse en secondes). Le résultat vaut (en-tête, (avis, page suivante))
+             pour un restaurant, (avis, page suivante) sinon. Les métriques du processus d'analyse n'étant
+             pas visibles du processus principal, la durée et les avis y sont comptés au retour.
+    """
+    start = time.perf_counter()
+    if kind == "restaurant":
+        result = parse_restaurant_html(html), parse_reviews_html(html)
+    else:
+        result = parse_reviews_html(html)
+    return result, time.perf_counter() - start
+
+
+def _fetch_worker(job_queue, raw_queue):
+    """
+    Étape d'entrée/sortie : télécharge les pages et les pousse dans la file bornée des pages brutes.
+    Quand cette file est pleine, le worker attend : les parseurs imposent leur rythme (backpressure).
+    """
+    while True:
+        job = job_queue.get()
+        if job is _STOP:
+            break
+        try:
+            html = fetch_html(job.url)
+        except Exception as e:
+            # La page est transmise comme un échec : le coordinateur ne doit pas l'attendre indéfiniment
+            logger.error("Erreur lors du téléchargement de %s : %s", job.url, e)
+            html = None
+        raw_queue.put((job, html))
+
+
+def _parse_dispatcher(raw_queue, results_queue, executor, max_in_flight):
+    """
+    Étape d'analyse : envoie les pages brutes au pool de processus, avec un nombre borné
+    d'analyses en cours, et transmet les résultats au coordinateur.
+    """
+    in_flight = threading.BoundedSemaphore(max_in_flight)
+
+    def on_done(job, future):
+        in_flight.release()
+        try:
+            result, elapsed = future.result()
+            page_reviews = result[1][0] if job.kind == "restaurant" else result[0]
+            metrics.observe("scraper_parse_seconds", elapsed, page=job.kind)
+            metrics.inc("scraper_reviews_total", len(page_reviews))
+            results_queue.put((job, result))
+        except Exception as e:
+            logger.error("Erreur lors de l'analyse de %s : %s", job.url, e)
+            results_queue.put((job, None))
+
+    while True:
+        item = raw_queue.get()
+        if item is _STOP:
+            break
+        job, html = item
+        if html is None:
+            results_queue.put((job, None))
+            continue
+        in_flight.acquire()
+        future = executor.submit(parse_page, job.kind, html)
+        future.add_done_callback(lambda f, job=job: on_done(job, f))
+
+
+def _writer_worker(write_queue, write):
+    """
+    Étape d'écriture : écrit chaque restaurant terminé dès qu'il est prêt.
+    """
+    while True:
+        item = write_queue.get()
+        if item is _STOP:
+            break
+        url, data = item
+        try:
+            write(url, data)
+        except Exception as e:
+            logger.error("Erreur lors de l'écriture de %s : %s", url, e)
+
+
+def run_pipeline(urls, write, fetch_workers=4, parse_workers=None, queue_size=16, max_active=8,
+                 per_host_limit=2, db_path=None, since=None, max_attempts=3, incremental=None):
+    """
+    Scrape des restaurants avec un pipeline producteur/consommateur : des threads téléchargent les
+    pages, un pool de processus les analyse et un thread écrit les restaurants terminés. Les étapes
+    communiquent par des files bornées, ce qui garde la mémoire constante quel que soit le crawl.
+    Les avis d'un restaurant sont récupérés en suivant les liens 'Page suivante' ; le parallélisme
+    vient des restaurants traités en même temps (au plus max_active).
+    :param urls: URLs des restaurants à scraper : une liste ou un générateur (voir iter_restaurant_list).
+    :param write: Fonction write(url, données) appelée par l'étape d'écriture pour chaque restaurant.
+    :param fetch_workers: Nombre de threads de téléchargement.
+    :param parse_workers: Nombre de processus d'analyse (par défaut, le nombre de cœurs).
+    :param queue_size: Taille maximale des files de pages brutes et de restaurants à écrire.
+    :param max_active: Nombre maximal de restaurants en cours (borne la mémoire des avis accumulés).
+    :param per_host_limit: Nombre maximal de requêtes simultanées vers un même hôte.
+    :param db_path: Entrepôt SQLite pour un scraping incrémental des avis (facultatif).
+    :param since: Date limite (datetime.date) des avis à récupérer (facultative).
+    :param max_attempts: Nombre de tentatives si la page d'un restaurant est incomplète.
+    :param incremental: Ensemble des URLs à scraper en mode incrémental (par défaut, toutes si db_path est fourni).
+    :return: Nombre de restaurants écrits.
+    """
+    host_limiter.set_limit(per_host_limit)
+    parse_workers = parse_workers or os.cpu_count() or 1
+
+    job_queue = queue.Queue()
+    raw_queue = queue.Queue(maxsize=queue_size)
+    results_queue = queue.Queue()
+    write_queue = queue.Queue(maxsize=queue_size)
+
+    url_queue = queue.Queue()
+    urls_done = threading.Event()
+    states = {}  # État des restaurants en cours : en-tête, avis accumulés, avis connus
+    written = 0
+
+    def feed_urls():
+        # Les URLs arrivent au fil de la découverte ; le coordinateur est réveillé à chacune
+        try:
+            for url in urls:
+                url_queue.put(url)
+                results_queue.put(_WAKE)
+        except Exception as e:
+            logger.error("Erreur lors de la lecture des URLs à scraper : %s", e)
+        finally:
+            urls_done.set()
+            results_queue.put(_WAKE)
+
+    def admit_restaurants():
+        while len(states) < max_active:
+            try:
+                url = url_queue.get_nowait()
+            except queue.Empty:
+                break
+            use_db = db_path and (incremental is None or url in incremental)
+            known_reviews = load_known_reviews(db_path, url) if use_db else None
+            states[url] = {"header": None, "reviews": [], "known_reviews": known_reviews}
+            job_queue.put(PageJob(url, url, "restaurant"))
+
+    def finish(url, success):
+        nonlocal written
+        state = states.pop(url)
+        if success:
+            write_queue.put((url, {**state["header"], "reviews": state["reviews"], "url": url}))
+            written += 1
+        logger.info("Restaurant terminé : %s (%s avis)", url, len(state['reviews']))
+
+    with ProcessPoolExecutor(max_workers=parse_workers) as executor:
+        fetchers = [
+            threading.Thread(target=_fetch_worker, args=(job_queue, raw_queue), daemon=True)
+            for _ in range(fetch_workers)
+        ]
+        dispatcher = threading.Thread(
+            target=_parse_dispatcher, args=(raw_queue, results_queue, executor, parse_workers * 2), daemon=True
+        )
+        writer = threading.Thread(target=_writer_worker, args=(write_queue, write), daemon=True)
+        feeder = threading.Thread(target=feed_urls, daemon=True)
+        for thread in fetchers + [dispatcher, writer, feeder]:
+            thread.start()
+
+        # Coordinateur : enchaîne les pages de chaque restaurant à partir des résultats d'analyse
+        while states or not (urls_done.is_set() and url_queue.empty()):
+            job, result = results_queue.get()
+            if job is None:
+                admit_restaurants()
+                continue
+            state = states[job.restaurant_url]
+
+            if result is None:
+                logger.error("Échec de la page %s.", job.url)
+                finish(job.restaurant_url, success=state["header"] is not None)
+                admit_restaurants()
+                continue
+
+            if job.kind == "restaurant":
+                header, (page_reviews, next_url) = result
+                if header is None:
+                    if job.attempt < max_attempts and not CACHE_CONFIG["replay"]:
+                        logger.warning("Données incomplètes pour %s, nouvelle tentative.", job.url)
+                        job_queue.put(PageJob(job.restaurant_url, job.url, "restaurant", job.attempt + 1))
+                    else:
+                        finish(job.restaurant_url, success=False)
+                        admit_restaurants()
+                    continue
+                state["header"] = header
+            else:
+                page_reviews, next_url = result
+
+            # Mode incrémental : arrêt à la première page sans nouvel avis
+            if state["known_reviews"] or since is not None:
+                page_reviews = filter_new_reviews(page_reviews, state["known_reviews"], since)
+                if not page_reviews:
+                    next_url = None
+            state["reviews"].extend(page_reviews)
+
+            if next_url:
+                job_queue.put(PageJob(job.restaurant_url, next_url, "reviews"))
+            else:
+                finish(job.restaurant_url, success=True)
+                admit_restaurants()
+
+        # Arrêt des étapes dans l'ordre du pipeline
+        for _ in fetchers:
+            job_queue.put(_STOP)
+        for thread in fetchers:
+            thread.join()
+        raw_queue.put(_STOP)
+        dispatcher.join()
+        write_queue.put(_STOP)
+        writer.join()
+
+    logger.info("Pipeline terminé : %s restaurants écrits.", written)
+    return written
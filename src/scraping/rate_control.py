@@ -0,0 +1,126 @@
+import random
+import threading
+import time
+
+
+class AdaptiveRateController:
+    """
+    Régulateur de débit AIMD (augmentation additive, diminution multiplicative) partagé par tous
+    les workers du processus. Chaque requête réseau attend son créneau ; le débit augmente un peu
+    à chaque succès et est divisé lors d'un blocage (403/429) ou d'une erreur réseau.
+    """
+
+    def __init__(self, initial_rate=0.25, min_rate=0.05, max_rate=2.0, increase=0.02,
+                 decrease_factor=0.5, cooldown=5.0, jitter=0.2, max_retry_after=600.0):
+        """
+        :param initial_rate: Débit initial en requêtes par seconde.
+        :param min_rate: Débit plancher en requêtes par seconde.
+        :param max_rate: Débit plafond en requêtes par seconde.
+        :param increase: Augmentation du débit après chaque succès.
+        :param decrease_factor: Facteur appliqué au débit après un blocage ou une erreur.
+        :param cooldown: Délai minimal en secondes entre deux diminutions, pour qu'une rafale
+                         de 403 simultanés ne compte que pour un seul signal.
+        :param jitter: Part aléatoire ajoutée à l'intervalle entre deux requêtes.
+        :param max_retry_after: Pause maximale en secondes imposée par un en-tête Retry-After.
+        """
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.jitter = jitter
+        self.max_retry_after = max_retry_after
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._last_decrease = 0.0
+        self._counts = {"requests": 0, "successes": 0, "blocks": 0, "errors": 0}
+        self._waited = 0.0
+
+    def configure(self, initial_rate=None, min_rate=None, max_rate=None):
+        """
+        Modifie les bornes et le débit courant du régulateur.
+        :param initial_rate: Nouveau débit courant en requêtes par seconde.
+        :param min_rate: Nouveau débit plancher.
+        :param max_rate: Nouveau débit plafond.
+        """
+        with self._lock:
+            if min_rate is not None:
+                self.min_rate = min_rate
+            if max_rate is not None:
+                self.max_rate = max_rate
+            if initial_rate is not None:
+                self.rate = initial_rate
+            self.rate = min(max(self.rate, self.min_rate), self.max_rate)
+
+    def acquire(self):
+        """
+        Attend le prochain créneau d'envoi. Les créneaux sont espacés de 1 / débit secondes
+        pour l'ensemble des threads du processus.
+        :return: Durée d'attente en secondes.
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            interval = 1.0 / self.rate
+            self._next_slot = slot + interval * (1 + random.uniform(0, self.jitter))
+            self._counts["requests"] += 1
+            wait = slot - now
+            self._waited += wait
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def record_success(self):
+        """Augmente le débit après une requête réussie (augmentation additive)."""
+        with self._lock:
+            self._counts["successes"] += 1
+            self.rate = min(self.rate + self.increase, self.max_rate)
+
+    def record_block(self, retry_after=None):
+        """
+        Diminue le débit après un 403 ou un 429 (diminution multiplicative).
+        :param retry_after: Délai en secondes demandé par le serveur (en-tête Retry-After), facultatif.
+        """
+        with self._lock:
+            self._counts["blocks"] += 1
+            self._decrease(retry_after)
+
+    def record_error(self, retry_after=None):
+        """
+        Diminue le débit après une erreur réseau ou une erreur serveur.
+        :param retry_after: Délai en secondes demandé par le serveur (en-tête Retry-After), facultatif.
+        """
+        with self._lock:
+            self._counts["errors"] += 1
+            self._decrease(retry_after)
+
+    def _decrease(self, retry_after=None):
+        now = time.monotonic()
+        if retry_after is not None:
+            # Aucune requête avant la date demandée par le serveur, même pendant le délai entre deux diminutions
+            self._next_slot = max(self._next_slot, now + min(max(retry_after, 0.0), self.max_retry_after))
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.rate = max(self.rate * self.decrease_factor, self.min_rate)
+        # Le prochain créneau est repoussé au nouvel intervalle : pause après un blocage
+        self._next_slot = max(self._next_slot, now + 1.0 / self.rate)
+
+    def stats(self):
+        """
+        Retourne l'état du régulateur pour ajuster le débit du crawl.
+        :return: Dictionnaire avec le débit courant, les compteurs et le taux de blocage.
+        """
+        with self._lock:
+            answered = self._counts["successes"] + self._counts["blocks"]
+            return {
+                "rate": self.rate,
+                **self._counts,
+                "block_ratio": self._counts["blocks"] / answered if answered else 0.0,
+                "waited_seconds": self._waited,
+            }
+
+
+# Régulateur unique utilisé par toutes les requêtes réseau du processus
+rate_controller = AdaptiveRateController()
@@ -2,11 +2,13 @@ import requests
 from bs4 import BeautifulSoup
 import logging
 import random
-import time
-from geopy.geocoders import Nominatim
 import json
 import re
 
+from scraping.http_client import http_get
+from common.logging_setup import configure_logging
+from processing.geocoding import get_geocoder
+
 # Configuration des en-têtes HTTP pour l'accès aux pages
 HEADERS = {
     "User-Agent": random.choice([
@@ -19,43 +21,35 @@ HEADERS = {
 }
 
 # Configuration du logger pour suivre les événements dans le processus de scraping
-logging.basicConfig(
-    level=logging.INFO,  # Niveau minimal de log (INFO pour une vue plus générale)
-    format="%(asctime)s - %(levelname)s - %(message)s"  # Format des messages log
-)
-geolocator = Nominatim(user_agent="restaurant_locator")  # Utilisation de geopy pour la géolocalisation
+configure_logging()
 
 
-def fetch_page(url, max_retries=5, base_delay=5, max_delay=60):
+def fetch_page(url, max_retries=5):
     """
-    Récupère une page web avec gestion des erreurs HTTP et des pauses adaptatives.
+    Récupère une page web avec gestion des erreurs HTTP. Les pauses entre les tentatives sont
+    imposées par le régulateur de débit partagé (voir scraping.rate_control).
     :param url: L'URL de la page à récupérer.
     :param max_retries: Le nombre maximal de tentatives en cas d'échec.
-    :param base_delay: Le délai de base entre les tentatives en secondes.
-    :param max_delay: Le délai maximum entre les tentatives en secondes.
     :return: L'objet BeautifulSoup contenant le HTML de la page si succès, sinon None.
     """
     for attempt in range(max_retries):
         try:
-            logging.info(f"Tentative {attempt + 1}/{max_retries} pour accéder à {url}")
-            response = requests.get(url, headers=HEADERS, timeout=10)
+            logging.debug("Tentative %s/%s pour accéder à %s", attempt + 1, max_retries, url)
+            response = http_get(url, headers=HEADERS)
 
             if response.status_code == 200:
                 logging.info("Page chargée avec succès.")
                 return BeautifulSoup(response.text, 'lxml')  # Parse la page HTML
 
-            elif response.status_code == 403:  # Si le serveur bloque la requête
-                delay = min(base_delay * (2 ** attempt), max_delay) + random.uniform(0, 3)
-                logging.warning(f"403 détecté. Pause de {delay:.2f} secondes avant nouvelle tentative.")
-                time.sleep(delay)
+            elif response.status_code in (403, 429):  # Si le serveur bloque la requête
+                logging.warning("%s détecté. Nouvelle tentative à débit réduit.", response.status_code)
             else:
-                logging.error(f"Erreur HTTP {response.status_code}. Tentative {attempt + 1} échouée.")
+                logging.error("Erreur HTTP %s. Tentative %s échouée.", response.status_code, attempt + 1)
                 break  # Si erreur HTTP autre que 403, arrête le scraping
 
         except requests.exceptions.RequestException as e:
-            logging.error(f"Erreur réseau : {e}. Tentative {attempt + 1} échouée.")
-            time.sleep(base_delay)  # Attente avant de réessayer
-    logging.critical(f"Échec après {max_retries} tentatives pour accéder à {url}")
+            logging.error("Erreur réseau : %s. Tentative %s échouée.", e, attempt + 1)
+    logging.critical("Échec après %s tentatives pour accéder à %s", max_retries, url)
     return None
 
 
@@ -86,27 +80,19 @@ def scrape_restaurants(soup, max_results=10):
             if name and url:
                 restaurants.append({"name": name, "url": url})  # Ajoute le restaurant à la liste
         except Exception as e:
-            logging.warning(f"Erreur lors du traitement du restaurant {index} : {e}")
+            logging.warning("Erreur lors du traitement du restaurant %s : %s", index, e)
 
     return restaurants
 
 
 def get_coordinates(restaurant_name, location="Lyon"):
     """
-    Récupère les coordonnées GPS d'un restaurant à partir de son nom.
+    Récupère les coordonnées GPS d'un restaurant à partir de son nom (via le cache de géocodage partagé).
     :param restaurant_name: Nom du restaurant à géolocaliser.
     :param location: Localisation par défaut (Lyon).
     :return: Un dictionnaire contenant la latitude et la longitude.
     """
-    try:
-        location = geolocator.geocode(restaurant_name, timeout=10)  # Recherche des coordonnées du restaurant
-        if location:
-            return {"latitude": location.latitude, "longitude": location.longitude}
-        else:
-            return {"latitude": None, "longitude": None}
-    except Exception as e:
-        logging.error(f"Erreur lors de la géolocalisation : {e}")
-        return {"latitude": None, "longitude": None}
+    return get_geocoder().lookup(restaurant_name, "name")
 
 
 def save_restaurant_data(file_path="data/raw/list_restaurants_found.json"):
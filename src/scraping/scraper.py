@@ -1,8 +1,39 @@
 from pathlib import Path
+import argparse
 import json
-import time
-import random
-from scraping.scraper_utils import scrape_restaurant_list, scrape_restaurant
+import os
+from datetime import date
+from scraping.scraper_utils import host_limiter, iter_restaurant_cards, iter_restaurant_list, scrape_restaurant_list
+from scraping.change_detection import INCREMENTAL, plan_refresh
+from scraping.concurrent_scraper import iter_scraped_restaurants
+from scraping.pipeline import run_pipeline
+from scraping.job_queue import JobQueue, run_worker
+from scraping.http_client import configure_session, connection_stats
+from scraping.html_cache import configure_cache, cache_stats
+from scraping.rate_control import rate_controller
+from scraping.metrics import metrics
+from common.logging_setup import configure_logging
+from processing.processing_utils import append_jsonl
+from database.warehouse_queries import load_restaurant_snapshots
+
+# Racine du projet, à partir de laquelle sont résolus les chemins des fichiers de données
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+# URL de la première page des restaurants à scraper
+LISTING_URL = "https://www.tripadvisor.fr/Restaurants-g187265-oa0-Lyon_Rhone_Auvergne_Rhone_Alpes.html"
+
+# Chemins des fichiers de sauvegarde des URLs, du checkpoint et de la file de tâches partagée
+URLS_FILE = "data/raw/top_restaurants_urls.json"
+CHECKPOINT_FILE = "data/raw/top_restaurants.checkpoint"
+QUEUE_FILE = "data/jobs/scraping_queue.db"
+
+# Un rafraîchissement ajoute ses restaurants au fichier des données brutes, mais a son propre checkpoint
+REFRESH_CHECKPOINT_FILE = "data/raw/top_restaurants_refresh.checkpoint"
+
+
+def data_file_for(compress):
+    """Fichier des données brutes des restaurants, compressé ou non."""
+    return "data/raw/top_restaurants.jsonl.gz" if compress else "data/raw/top_restaurants.jsonl"
 
 def save_urls_to_json(urls, filename):
     """
@@ -43,43 +74,318 @@ def save_to_json(data, filename):
     print(f"Données sauvegardées dans {filepath}")
 
 
-def main():
+def load_checkpoint(filename):
     """
-    Fonction principale du script de scraping qui récupère la liste des restaurants et leurs détails,
-    puis les sauvegarde dans des fichiers JSON.
+    Charge les URLs des restaurants déjà scrapés lors d'une exécution précédente.
+    :param filename: Nom du fichier de checkpoint (une URL par ligne).
+    :return: Ensemble des URLs déjà traitées.
     """
-    # URL de la première page des restaurants à scraper
-    base_url = "https://www.tripadvisor.fr/Restaurants-g187265-oa0-Lyon_Rhone_Auvergne_Rhone_Alpes.html"
+    filepath = PROJECT_ROOT / filename
+    if not filepath.exists():
+        return set()
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return {line.strip() for line in f if line.strip()}
 
-    # Chemins des fichiers de sauvegarde des URLs et des données des restaurants
-    urls_file = "data/raw/top_restaurants_urls.json"
-    data_file = "data/raw/top_restaurants.json"
 
-    # Scraping des URLs des restaurants
-    print("Début du scraping des URLs des restaurants...")
-    restaurant_urls = scrape_restaurant_list(base_url)
+def mark_done(url, filename):
+    """
+    Ajoute une URL au checkpoint, une fois le restaurant correspondant écrit sur le disque.
+    :param url: URL du restaurant terminé.
+    :param filename: Nom du fichier de checkpoint.
+    """
+    with open(PROJECT_ROOT / filename, 'a', encoding='utf-8') as f:
+        f.write(url + "\n")
+        f.flush()
+        os.fsync(f.fileno())
 
-    # Scraping des informations détaillées de chaque restaurant
-    print("Début du scraping des informations des restaurants...")
-    all_restaurants_data = []
-    
-    for i, restaurant_url in enumerate(restaurant_urls):
-        print(f"Scraping restaurant {i + 1}/{len(restaurant_urls)}: {restaurant_url}")
-        
-        # Scraping des données du restaurant à partir de son URL
-        data = scrape_restaurant(restaurant_url)
-        
-        # Si des données ont été récupérées, on les ajoute à la liste
-        if data:
-            all_restaurants_data.append(data)
-        
-        # Pause pour éviter d'être bloqué par le serveur
-        time.sleep(random.uniform(3, 7)) 
-
-    # Sauvegarde des données des restaurants dans un fichier JSON
-    if (save_to_json(all_restaurants_data, data_file)):
+
+def main(max_workers=4, per_host_limit=2, pool_size=10, db_path=None, since=None, page_workers=1,
+         compress=False, resume=False, pipeline=False, parse_workers=None, discover=False, max_restaurants=15,
+         min_reviews=900, max_pages=None, refresh=False, max_incremental_delta=50):
+    """
+    Fonction principale du script de scraping qui récupère la liste des restaurants et leurs détails.
+    Chaque restaurant est ajouté au fichier JSONL dès qu'il est scrapé et son URL est notée dans un
+    checkpoint : avec resume, une exécution interrompue reprend là où elle s'était arrêtée. Un restaurant
+    scrapé en mode incrémental est marqué 'incremental' : le nettoyage ajoute ses avis à ceux de sa version
+    précédente.
+    :param max_workers: Nombre de restaurants scrapés simultanément.
+    :param per_host_limit: Nombre maximal de requêtes simultanées vers TripAdvisor.
+    :param pool_size: Taille du pool de connexions HTTP partagé.
+    :param db_path: Entrepôt SQLite : seuls les avis absents de cette base sont récupérés.
+    :param since: Date limite (datetime.date) des avis à récupérer.
+    :param page_workers: Pages d'avis téléchargées en parallèle pour chaque restaurant.
+    :param compress: Écrit les données au format JSONL compressé (gzip).
+    :param resume: Reprend l'exécution précédente : les restaurants du checkpoint sont ignorés. Sinon, le
+                   checkpoint est effacé, ainsi que les données brutes pour un crawl complet (un scraping
+                   incrémental ou un rafraîchissement complète toujours les données du dernier crawl).
+    :param pipeline: Utilise le pipeline téléchargement / analyse multi-processus / écriture.
+    :param parse_workers: Nombre de processus d'analyse du pipeline (par défaut, le nombre de cœurs).
+    :param discover: Parcourt les pages de la liste en parallèle et scrape chaque restaurant dès sa découverte.
+    :param max_restaurants: Nombre maximum de restaurants à scraper (None : aucune limite).
+    :param min_reviews: Nombre minimum d'avis requis pour inclure un restaurant.
+    :param max_pages: Nombre maximum de pages de liste parcourues en mode découverte.
+    :param refresh: Compare la liste avec l'entrepôt db_path : les restaurants inchangés sont ignorés,
+                    ceux avec peu de nouveaux avis sont scrapés en mode incrémental, les autres en entier.
+    :param max_incremental_delta: Nombre maximal de nouveaux avis pour un scraping incrémental.
+    """
+    if refresh and not db_path:
+        raise ValueError("Le rafraîchissement nécessite l'entrepôt de référence (db_path).")
+
+    # Un pool plus petit que le nombre de workers forcerait l'ouverture de nouvelles connexions
+    configure_session(pool_size=max(pool_size, max_workers * page_workers))
+
+    base_url = LISTING_URL
+    urls_file = URLS_FILE
+    data_file = data_file_for(compress)
+    checkpoint_file = REFRESH_CHECKPOINT_FILE if refresh else CHECKPOINT_FILE
+
+    data_path = PROJECT_ROOT / data_file
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    if not resume:
+        # Les avis scrapés en mode incrémental complètent les données du dernier crawl : elles sont conservées
+        for filename in (checkpoint_file,) if db_path else (data_file, checkpoint_file):
+            (PROJECT_ROOT / filename).unlink(missing_ok=True)
+
+    done_urls = load_checkpoint(checkpoint_file)
+    restaurant_urls = []
+    incremental = None
+    decisions = {}
+
+    if refresh:
+        # Seuls les restaurants dont le nombre d'avis ou la note a changé depuis le dernier crawl sont scrapés
+        print("Rafraîchissement : comparaison de la liste avec l'entrepôt...")
+        snapshots = load_restaurant_snapshots(db_path)
+        incremental = set()
+
+        def remaining_urls_stream():
+            cards = iter_restaurant_cards(base_url, min_reviews=min_reviews, max_restaurants=max_restaurants,
+                                          max_pages=max_pages, max_workers=max_workers)
+            for url, decision in plan_refresh(cards, snapshots, max_incremental_delta, counts=decisions):
+                restaurant_urls.append(url)
+                if decision == INCREMENTAL:
+                    # Ajouté avant la soumission du restaurant au scraper
+                    incremental.add(url)
+                if url not in done_urls:
+                    yield url
+
+        remaining_urls = remaining_urls_stream()
+    elif discover:
+        # Découverte et scraping se chevauchent : chaque URL trouvée part directement au scraper
+        print("Découverte des restaurants et scraping au fil de l'eau...")
+
+        def remaining_urls_stream():
+            for url in iter_restaurant_list(base_url, min_reviews=min_reviews, max_restaurants=max_restaurants,
+                                            max_pages=max_pages, max_workers=max_workers):
+                restaurant_urls.append(url)
+                if url not in done_urls:
+                    yield url
+
+        remaining_urls = remaining_urls_stream()
+    else:
+        # Scraping des URLs des restaurants
+        print("Début du scraping des URLs des restaurants...")
+        restaurant_urls = scrape_restaurant_list(base_url, max_restaurants=max_restaurants or float("inf"),
+                                                 min_reviews=min_reviews)
+        save_urls_to_json(restaurant_urls, urls_file)
+
+        remaining_urls = [url for url in restaurant_urls if url not in done_urls]
+        if len(remaining_urls) < len(restaurant_urls):
+            print(f"Reprise : {len(restaurant_urls) - len(remaining_urls)} restaurants déjà scrapés ignorés.")
+
+    def save_restaurant(url, data):
+        if db_path and (incremental is None or url in incremental):
+            # Seuls les avis absents de l'entrepôt ont été récupérés
+            data = {**data, "incremental": True}
+        # Écriture immédiate : un arrêt du crawl ne perd que les restaurants en cours
+        append_jsonl(data, data_path)
+        mark_done(url, checkpoint_file)
+
+    # Scraping des informations détaillées des restaurants, plusieurs à la fois
+    print(f"Début du scraping des informations des restaurants ({max_workers} en parallèle)...")
+    saved = 0
+    if pipeline:
+        saved = run_pipeline(
+            remaining_urls, save_restaurant, fetch_workers=max_workers, parse_workers=parse_workers,
+            max_active=max_workers * 2, per_host_limit=per_host_limit, db_path=db_path, since=since,
+            incremental=incremental,
+        )
+    else:
+        for url, data in iter_scraped_restaurants(
+            remaining_urls, max_workers=max_workers, per_host_limit=per_host_limit,
+            db_path=db_path, since=since, page_workers=page_workers, incremental=incremental,
+        ):
+            if data:
+                save_restaurant(url, data)
+                saved += 1
+
+    if discover and not refresh:
         save_urls_to_json(restaurant_urls, urls_file)
+    if refresh:
+        print(f"Rafraîchissement : {decisions.get('unchanged', 0)} inchangés, {decisions.get('incremental', 0)} "
+              f"incrémentaux, {decisions.get('full', 0)} complets, {decisions.get('new', 0)} nouveaux.")
+    print(f"Données de {saved} restaurants sauvegardées dans {data_path}")
+    print_run_stats()
+
+
+def print_run_stats():
+    """
+    Affiche la réutilisation des connexions, le débit final, l'activité du cache HTML et le résumé
+    des métriques, puis écrit l'export Prometheus s'il est configuré.
+    """
+    stats = connection_stats()
+    print(f"Connexions HTTP : {stats['requests']} requêtes, {stats['connections']} connexions ouvertes, "
+          f"{stats['reuse_ratio']:.0%} de réutilisation.")
+    rate = rate_controller.stats()
+    print(f"Débit final : {rate['rate']:.2f} requêtes/s, {rate['blocks']} blocages "
+          f"({rate['block_ratio']:.1%}), {rate['errors']} erreurs réseau.")
+    cache = cache_stats()
+    if cache["hits"] or cache["writes"]:
+        print(f"Cache HTML : {cache['hits']} pages servies, {cache['misses']} absentes, {cache['writes']} enregistrées.")
+
+    summary = metrics.summary()
+    print(f"Requêtes : {summary['requests']} en {summary['elapsed_seconds']:.0f} s, latence p50 "
+          f"{summary['request_p50']} s / p95 {summary['request_p95']} s, {summary['megabytes']:.1f} Mo, "
+          f"{summary['retries']} nouvelles tentatives, {summary['errors']} erreurs réseau.")
+    print(f"Analyse : {summary['pages_parsed']} pages, {summary['parse_ms']:.1f} ms par page, "
+          f"{summary['reviews']} avis ({summary['reviews_per_second']:.1f} avis/s).")
+    stages = ", ".join(f"{stage} {seconds:.1f} s" for stage, seconds in summary["time_by_stage"].items())
+    print(f"Temps cumulé : {stages} ; facteur limitant : {summary['bound_by'] or 'aucun'}.")
+    metrics.flush()
+
+
+def print_queue_stats(job_queue):
+    """Affiche le nombre de tâches de la file par type et par statut."""
+    for (kind, status), count in sorted(job_queue.stats().items()):
+        print(f"File de tâches : {kind} {status} : {count}")
+
+
+def enqueue_main(queue_file=QUEUE_FILE, discover=False, max_restaurants=15, min_reviews=900, max_pages=None,
+                 max_workers=4):
+    """
+    Ajoute les restaurants de la liste à la file de tâches partagée, pour des workers lancés ensuite
+    sur la même machine (la file SQLite ne doit pas être partagée par plusieurs machines).
+    :param queue_file: Fichier SQLite de la file, relatif à la racine du projet.
+    :param discover: Parcourt les pages de la liste en parallèle (voir iter_restaurant_list).
+    :param max_restaurants: Nombre maximum de restaurants (None : aucune limite).
+    :param min_reviews: Nombre minimum d'avis requis pour inclure un restaurant.
+    :param max_pages: Nombre maximum de pages de liste parcourues en mode découverte.
+    :param max_workers: Nombre de pages de liste téléchargées en parallèle en mode découverte.
+    """
+    queue_path = PROJECT_ROOT / queue_file
+    queue_path.parent.mkdir(parents=True, exist_ok=True)
+    job_queue = JobQueue(queue_path)
+
+    if discover:
+        urls = iter_restaurant_list(LISTING_URL, min_reviews=min_reviews, max_restaurants=max_restaurants,
+                                    max_pages=max_pages, max_workers=max_workers)
+    else:
+        urls = scrape_restaurant_list(LISTING_URL, max_restaurants=max_restaurants or float("inf"),
+                                      min_reviews=min_reviews)
+    added = job_queue.enqueue_restaurants(urls)
+    print(f"{added} restaurants ajoutés à la file {queue_path}")
+    print_queue_stats(job_queue)
+
+
+def worker_main(queue_file=QUEUE_FILE, threads=4, per_host_limit=2, pool_size=10):
+    """
+    Exécute les tâches de la file partagée jusqu'à ce qu'elle soit vide. Plusieurs workers peuvent
+    tourner en même temps dans d'autres processus de la même machine (voir JobQueue).
+    :param queue_file: Fichier SQLite de la file, relatif à la racine du projet.
+    :param threads: Nombre de tâches exécutées en parallèle par ce worker.
+    :param per_host_limit: Nombre maximal de requêtes simultanées vers TripAdvisor.
+    :param pool_size: Taille du pool de connexions HTTP partagé.
+    """
+    configure_session(pool_size=max(pool_size, threads))
+    host_limiter.set_limit(per_host_limit)
+    done = run_worker(PROJECT_ROOT / queue_file, threads=threads)
+    print(f"{done} tâches terminées par ce worker.")
+    print_run_stats()
+
+
+def export_main(queue_file=QUEUE_FILE, compress=False):
+    """
+    Écrit les restaurants terminés de la file dans le fichier JSONL des données brutes, avec le même
+    checkpoint que le scraping direct. Peut être relancé pendant le crawl : seuls les nouveaux
+    restaurants terminés sont ajoutés.
+    :param queue_file: Fichier SQLite de la file, relatif à la racine du projet.
+    :param compress: Écrit les données au format JSONL compressé (gzip).
+    """
+    job_queue = JobQueue(PROJECT_ROOT / queue_file)
+    data_path = PROJECT_ROOT / data_file_for(compress)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+
+    exported = 0
+    for url, data in job_queue.iter_completed_restaurants():
+        append_jsonl(data, data_path)
+        mark_done(url, CHECKPOINT_FILE)
+        job_queue.mark_exported(url)
+        exported += 1
+    print(f"Données de {exported} restaurants exportées dans {data_path}")
+    print_queue_stats(job_queue)
+
 
 if __name__ == "__main__":
-    # Exécute la fonction principale si ce script est appelé directement
-    main()
+    parser = argparse.ArgumentParser(description="Scraping des restaurants lyonnais sur TripAdvisor.")
+    parser.add_argument("command", nargs="?", default="crawl", choices=["crawl", "enqueue", "worker", "export"],
+                        help="crawl : scraping direct (par défaut) ; enqueue, worker, export : file de tâches partagée.")
+    parser.add_argument("--queue", default=QUEUE_FILE, help="Fichier SQLite de la file de tâches partagée (disque local, une seule machine).")
+    parser.add_argument("--workers", type=int, default=4, help="Nombre de restaurants scrapés en parallèle.")
+    parser.add_argument("--per-host", type=int, default=2, help="Requêtes simultanées maximales par hôte.")
+    parser.add_argument("--pool-size", type=int, default=10, help="Taille du pool de connexions HTTP.")
+    parser.add_argument("--rate", type=float, default=0.25, help="Débit initial en requêtes par seconde.")
+    parser.add_argument("--min-rate", type=float, default=0.05, help="Débit plancher en requêtes par seconde.")
+    parser.add_argument("--max-rate", type=float, default=2.0, help="Débit plafond en requêtes par seconde.")
+    parser.add_argument("--cache", action="store_true", help="Conserve les pages HTML téléchargées dans data/cache/html.")
+    parser.add_argument("--cache-ttl", type=float, default=168, help="Durée de validité du cache en heures.")
+    parser.add_argument("--replay", action="store_true", help="Rejoue les pages du cache sans aucun appel réseau.")
+    parser.add_argument("--page-workers", type=int, default=1,
+                        help="Pages d'avis téléchargées en parallèle par restaurant (URLs prédites).")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Sépare téléchargement et analyse (pool de processus pour l'analyse HTML).")
+    parser.add_argument("--parse-workers", type=int, help="Nombre de processus d'analyse du pipeline.")
+    parser.add_argument("--discover", action="store_true",
+                        help="Parcourt les pages de la liste en parallèle et scrape les restaurants dès leur découverte.")
+    parser.add_argument("--max-restaurants", type=int,
+                        help="Nombre maximum de restaurants (par défaut : 15, sans limite avec --discover ou --refresh).")
+    parser.add_argument("--min-reviews", type=int, default=900, help="Nombre minimum d'avis d'un restaurant.")
+    parser.add_argument("--max-pages", type=int, help="Nombre maximum de pages de liste parcourues avec --discover.")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Ne scrape que les restaurants modifiés depuis le dernier crawl (avec --incremental-db).")
+    parser.add_argument("--max-incremental-delta", type=int, default=50,
+                        help="Nouveaux avis au-delà desquels un restaurant est entièrement rescrapé (--refresh).")
+    parser.add_argument("--metrics-file", help="Fichier d'export Prometheus (format texte), réécrit pendant le crawl.")
+    parser.add_argument("--metrics-port", type=int, help="Expose les métriques sur http://127.0.0.1:PORT/metrics.")
+    parser.add_argument("--log-level", help="Niveau de log (DEBUG, INFO, WARNING...), par défaut LOG_LEVEL ou INFO.")
+    parser.add_argument("--debug-payloads", action="store_true",
+                        help="Écrit dans les logs les données complètes des restaurants (volumineux).")
+    parser.add_argument("--gzip", action="store_true", help="Écrit les données au format JSONL compressé.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reprend le scraping interrompu là où il s'était arrêté (checkpoint).")
+    parser.add_argument("--incremental-db", help="Entrepôt SQLite : ne récupère que les avis absents de la base.")
+    parser.add_argument("--since", type=date.fromisoformat, help="Ignore les avis antérieurs à cette date (AAAA-MM-JJ).")
+    args = parser.parse_args()
+
+    configure_logging(level=args.log_level, debug_payloads=args.debug_payloads or None)
+    rate_controller.configure(initial_rate=args.rate, min_rate=args.min_rate, max_rate=args.max_rate)
+    configure_cache(enabled=args.cache or args.replay, replay=args.replay, ttl=args.cache_ttl * 3600)
+    if args.metrics_file:
+        metrics.start_file_export(args.metrics_file)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+    max_restaurants = args.max_restaurants if args.max_restaurants or args.discover or args.refresh else 15
+    if args.command == "enqueue":
+        enqueue_main(args.queue, discover=args.discover, max_restaurants=max_restaurants,
+                     min_reviews=args.min_reviews, max_pages=args.max_pages, max_workers=args.workers)
+    elif args.command == "worker":
+        worker_main(args.queue, threads=args.workers, per_host_limit=args.per_host, pool_size=args.pool_size)
+    elif args.command == "export":
+        export_main(args.queue, compress=args.gzip)
+    else:
+        # Exécute la fonction principale si ce script est appelé directement
+        main(max_workers=args.workers, per_host_limit=args.per_host, pool_size=args.pool_size,
+             db_path=args.incremental_db, since=args.since, page_workers=args.page_workers,
+             compress=args.gzip, resume=args.resume, pipeline=args.pipeline, parse_workers=args.parse_workers,
+             discover=args.discover, min_reviews=args.min_reviews, max_pages=args.max_pages,
+             max_restaurants=max_restaurants, refresh=args.refresh,
+             max_incremental_delta=args.max_incremental_delta)
@@ -2,69 +2,122 @@ import requests
 from bs4 import BeautifulSoup
 import random
 import re
+import threading
 import time
 import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from urllib.parse import urlparse
 
+from scraping.http_client import http_get
+from scraping.html_cache import CACHE_CONFIG
+from scraping.metrics import metrics
+from common.logging_setup import configure_logging
+from scraping.parsers import parse_listing_html, parse_restaurant_html, parse_reviews_html
+from processing.processing_utils import parse_french_date
+from processing.fingerprint import review_fingerprint
+
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/109.0",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+]
 
 HEADERS = {
-    "User-Agent": random.choice([
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/109.0",
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-    ]),
+    "User-Agent": random.choice(USER_AGENTS),
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
     "Accept-Language": "en-US,en;q=0.5",
 }
 
-# Configurer le logger
-logging.basicConfig(
-    level=logging.DEBUG,  # Niveau minimal de log (DEBUG, INFO, WARNING, ERROR, CRITICAL)
-    format="%(asctime)s - %(levelname)s - %(message)s",  # Format des logs
-    handlers=[
-        logging.FileHandler("scraper.log", mode="a", encoding="utf-8"),  # Enregistrer les logs dans un fichier
-        logging.StreamHandler()  # Afficher les logs dans la console
-    ]
-)
+# Journalisation partagée, écrite par un thread d'arrière-plan (voir common.logging_setup)
+configure_logging(log_file="scraper.log")
 
 # Créez un objet logger
 logger = logging.getLogger(__name__)
 
 
-def fetch_with_dynamic_wait(url, max_retries=5, base_delay=2, max_delay=60):
+class HostLimiter:
     """
-    Récupère une page web avec gestion des erreurs HTTP et des pauses adaptatives.
+    Limite le nombre de requêtes simultanées envoyées vers un même hôte.
+    Utilisé par le moteur concurrent pour rester poli envers TripAdvisor.
+    """
+
+    def __init__(self, limit=2):
+        self.limit = limit
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def set_limit(self, limit):
+        """
+        Modifie la limite de requêtes simultanées par hôte.
+        :param limit: Nombre maximal de requêtes simultanées vers un hôte.
+        """
+        with self._lock:
+            self.limit = limit
+            self._semaphores.clear()
+
+    @contextmanager
+    def slot(self, url):
+        """
+        Réserve un créneau pour l'hôte de l'URL le temps d'une requête.
+        :param url: URL de la requête.
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.limit))
+        start = time.perf_counter()
+        with semaphore:
+            metrics.inc("scraper_host_wait_seconds_total", time.perf_counter() - start)
+            yield
+
+
+host_limiter = HostLimiter()
+
+
+def fetch_html(url, max_retries=5):
+    """
+    Récupère le HTML brut d'une page web avec gestion des erreurs HTTP. Les pauses entre les
+    tentatives sont imposées par le régulateur de débit partagé (voir scraping.rate_control),
+    qui ralentit après chaque blocage.
+    :param url: L'URL de la page à récupérer.
+    :param max_retries: Le nombre maximal de tentatives en cas d'échec.
+    :return: Le HTML de la page si succès, sinon None.
     """
     for attempt in range(max_retries):
         try:
-            HEADERS["User-Agent"] = random.choice([
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/109.0",
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36",
-                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            ])
-            logger.info(f"Tentative {attempt + 1}/{max_retries} pour {url}...")
-            response = requests.get(url, headers=HEADERS, timeout=10)
+            headers = dict(HEADERS, **{"User-Agent": random.choice(USER_AGENTS)})
+            logger.debug("Tentative %s/%s pour %s...", attempt + 1, max_retries, url)
+            with host_limiter.slot(url):
+                response = http_get(url, headers=headers)
 
             if response.status_code == 200:
-                logger.info(f"Succès pour {url}")
-                return BeautifulSoup(response.text, 'lxml')
+                logger.debug("Succès pour %s", url)
+                return response.text
 
-            elif response.status_code == 403:
-                delay = min(base_delay * (2 ** attempt), max_delay) + random.uniform(0, 3)
-                logger.warning(f"403 détecté. Pause de {delay:.2f} secondes.")
-                time.sleep(delay)
+            elif response.status_code in (403, 429):
+                logger.warning("%s détecté. Nouvelle tentative à débit réduit.", response.status_code)
+                metrics.inc("scraper_retries_total", reason=str(response.status_code))
             else:
-                logger.error(f"Erreur HTTP {response.status_code}. Arrêt.")
-                break
+                logger.error("Erreur HTTP %s. Arrêt.", response.status_code)
+                return None
 
         except requests.exceptions.RequestException as e:
-            delay = min(base_delay * (2 ** attempt), max_delay) + random.uniform(0, 3)
-            logger.error(f"Erreur réseau : {e}. Pause de {delay:.2f} secondes.")
-            time.sleep(delay)
+            logger.error("Erreur réseau : %s. Nouvelle tentative à débit réduit.", e)
+            metrics.inc("scraper_retries_total", reason="network")
 
-    logger.critical(f"Échec après {max_retries} tentatives pour {url}")
+    logger.critical("Échec après %s tentatives pour %s", max_retries, url)
     return None
 
 
+def fetch_with_dynamic_wait(url, max_retries=5):
+    """
+    Récupère une page web avec gestion des erreurs HTTP et des pauses adaptatives.
+    :return: L'objet BeautifulSoup de la page si succès, sinon None.
+    """
+    html = fetch_html(url, max_retries=max_retries)
+    return BeautifulSoup(html, 'lxml') if html is not None else None
+
 
 def extract_manager_response(review):
     """
@@ -102,200 +155,402 @@ def scrape_modal_details(soup):
 
     return modal_data
 
-def scrape_reviews(base_url):
+def parse_reviews_page(soup):
+    """
+    Extrait les avis d'une page d'avis déjà récupérée.
+    Version BeautifulSoup de référence, la version rapide se trouve dans scraping.parsers.
+    :param soup: L'objet BeautifulSoup de la page d'avis.
+    :return: Liste des avis de la page.
+    """
+    reviews_data = []
+    reviews = soup.find_all('div', class_='_c', attrs={'data-automation': 'reviewCard'})
+    for review in reviews:
+        try:
+            author = review.find('a', class_='BMQDV _F Gv wSSLS SwZTJ FGwzt ukgoS')
+            author = author.text.strip() if author else "Auteur inconnu"
+
+            contributions_span = review.find("span", class_="b")
+            contributions = int(contributions_span.text.strip()) if contributions_span else 0
+
+            rating_svg = review.find('svg', class_='UctUV')
+            rating = None
+            if rating_svg:
+                rating_title = rating_svg.find('title')
+                if rating_title:
+                    rating_match = re.search(r"([\d,\.]+) sur 5", rating_title.text)
+                    rating = float(rating_match.group(1).replace(",", ".")) if rating_match else None
+
+            review_title = review.find('div', class_='biGQs _P fiohW qWPrE ncFvv fOtGX')
+            review_title = review_title.text.strip() if review_title else "Titre non spécifié"
+
+            review_text = review.find('span', class_='JguWG')
+            review_text = review_text.text.strip() if review_text else "Texte non spécifié"
+
+            manager_response = extract_manager_response(review)
+
+            review_date = review.find('div', class_='neAPm')
+            review_date = review_date.find('div', class_='biGQs _P pZUbB ncFvv osNWb').text.strip() if review_date else "Date non spécifiée"
+
+            reviews_data.append({
+                "author": author,
+                "contributions": contributions,
+                "rating": rating,
+                "title": review_title,
+                "review_text": review_text,
+                "manager_response": manager_response,
+                "review_date": review_date,
+            })
+        except Exception as e:
+            logger.error("Erreur lors du scraping d'un avis : %s", e)
+    return reviews_data
+
+
+def find_next_page_url(soup):
+    """
+    Trouve l'URL de la page suivante à partir du lien 'Page suivante'.
+    :param soup: L'objet BeautifulSoup de la page courante.
+    :return: L'URL absolue de la page suivante, sinon None.
+    """
+    next_button = soup.find('a', {'aria-label': 'Page suivante'})
+    if next_button and next_button.get('href'):
+        return "https://www.tripadvisor.fr" + next_button['href']
+    return None
+
+
+def fetch_review_page(url):
+    """
+    Récupère et analyse une page d'avis.
+    :param url: URL de la page d'avis.
+    :return: Tuple (avis de la page, URL de la page suivante), ou None si la page est inaccessible.
+    """
+    html = fetch_html(url)
+    if html is None:
+        return None
+    return parse_reviews_html(html)
+
+
+def review_page_url(base_url, offset):
+    """
+    Construit l'URL de la page d'avis commençant à l'offset donné (motif '-Reviews-orNN-' de TripAdvisor).
+    :param base_url: URL de la page du restaurant.
+    :param offset: Index du premier avis de la page.
+    :return: URL de la page d'avis.
+    """
+    if offset == 0:
+        return re.sub(r"-Reviews-or\d+-", "-Reviews-", base_url, count=1)
+    return re.sub(r"-Reviews-(or\d+-)?", f"-Reviews-or{offset}-", base_url, count=1)
+
+
+def review_page_offset(url):
+    """
+    Offset d'une page d'avis d'après son URL (inverse de review_page_url).
+    :param url: URL de la page d'avis.
+    :return: Index du premier avis de la page (0 pour la première page).
+    """
+    match = re.search(r"-Reviews-or(\d+)-", url)
+    return int(match.group(1)) if match else 0
+
+
+def dedupe_reviews(reviews):
+    """
+    Supprime les avis récupérés plusieurs fois (même auteur, même date, même titre), par exemple quand
+    la pagination change pendant le scraping. La première occurrence est conservée.
+    :param reviews: Liste des avis.
+    :return: Liste des avis sans doublons, dans l'ordre d'origine.
+    """
+    seen = set()
+    unique = []
+    for review in reviews:
+        key = (review.get("author"), review.get("review_date"), review.get("title"))
+        if key not in seen:
+            seen.add(key)
+            unique.append(review)
+    return unique
+
+
+def filter_new_reviews(reviews, known_reviews=None, since=None):
+    """
+    Garde uniquement les avis absents de l'entrepôt et postérieurs à la date limite.
+    :param reviews: Liste des avis d'une page.
+    :param known_reviews: Ensemble des empreintes des avis déjà stockés.
+    :param since: Date limite (datetime.date) : les avis plus anciens sont ignorés.
+    :return: Liste des nouveaux avis.
+    """
+    new_reviews = []
+    for review in reviews:
+        if known_reviews and review_fingerprint(review["author"], review["review_text"]) in known_reviews:
+            continue
+        if since is not None:
+            review_date = parse_french_date(review["review_date"])
+            if review_date is not None and review_date < since:
+                continue
+        new_reviews.append(review)
+    return new_reviews
+
+
+def scrape_reviews(base_url, known_reviews=None, since=None):
     """
     Scrape tous les avis d'un restaurant avec gestion de la pagination.
+    En mode incrémental (known_reviews ou since renseigné), la pagination s'arrête dès qu'une page
+    ne contient que des avis déjà connus ou plus anciens que la date limite.
     :param base_url: URL de la première page d'avis.
-    :return: Liste des avis.
+    :param known_reviews: Ensemble des empreintes des avis déjà présents dans l'entrepôt.
+    :param since: Date limite (datetime.date) en deçà de laquelle les avis ne sont plus récupérés.
+    :return: Liste des avis (uniquement les nouveaux en mode incrémental).
     """
     reviews_data = []
     current_url = base_url
     page_count = 1
-    max_retries = 5  # Nombre maximum de tentatives pour une page
-    base_delay = 5  # Délai de base en secondes pour la pause entre les tentatives
-    max_delay = 60  # Délai maximum en secondes
+    incremental = bool(known_reviews) or since is not None
 
     while current_url:
-        logger.info(f"Scraping page {page_count}...")
-        retries = 0  # Compteur de tentatives pour la page actuelle
-        
-        while retries < max_retries:
-            try:
-                response = requests.get(current_url, headers=HEADERS, timeout=10)
-                
-                if response.status_code == 200:  # Succès
-                    logger.info(f"Page {page_count} récupérée avec succès.")
-                    soup = BeautifulSoup(response.text, 'lxml')
-
-                    # Scrape des avis sur la page actuelle
-                    reviews = soup.find_all('div', class_='_c', attrs={'data-automation': 'reviewCard'})
-                    for review in reviews:
-                        try:
-                            author = review.find('a', class_='BMQDV _F Gv wSSLS SwZTJ FGwzt ukgoS')
-                            author = author.text.strip() if author else "Auteur inconnu"
-
-                            contributions_span = review.find("span", class_="b")
-                            contributions = int(contributions_span.text.strip()) if contributions_span else 0
-
-                            rating_svg = review.find('svg', class_='UctUV')
-                            rating = None
-                            if rating_svg:
-                                rating_title = rating_svg.find('title')
-                                if rating_title:
-                                    rating_match = re.search(r"([\d,\.]+) sur 5", rating_title.text)
-                                    rating = float(rating_match.group(1).replace(",", ".")) if rating_match else None
-
-                            review_title = review.find('div', class_='biGQs _P fiohW qWPrE ncFvv fOtGX')
-                            review_title = review_title.text.strip() if review_title else "Titre non spécifié"
-
-                            review_text = review.find('span', class_='JguWG')
-                            review_text = review_text.text.strip() if review_text else "Texte non spécifié"
-
-                            manager_response = extract_manager_response(review)
-
-                            review_date = review.find('div', class_='neAPm')
-                            review_date = review_date.find('div', class_='biGQs _P pZUbB ncFvv osNWb').text.strip() if review_date else "Date non spécifiée"
-
-                            reviews_data.append({
-                                "author": author,
-                                "contributions": contributions,
-                                "rating": rating,
-                                "title": review_title,
-                                "review_text": review_text,
-                                "manager_response": manager_response,
-                                "review_date": review_date,
-                            })
-                        except Exception as e:
-                            logger.error(f"Erreur lors du scraping d'un avis : {e}")
-
-                    # Trouver le lien vers la page suivante
-                    next_button = soup.find('a', {'aria-label': 'Page suivante'})
-                    if next_button and next_button.get('href'):
-                        current_url = "https://www.tripadvisor.fr" + next_button['href']
-                        page_count += 1
-                    else:
-                        logger.info("Aucune page suivante trouvée. Fin de la pagination.")
-                        current_url = None
-
-                    # Pause avant de passer à la page suivante
-                    time.sleep(random.uniform(3, 7))
-                    break  
-
-                elif response.status_code == 403:  # Bloqué par le serveur
-                    delay = min(base_delay * (2 ** retries), max_delay) + random.uniform(0, 3)
-                    logger.warning(f"Code 403 détecté. Pause de {delay:.2f} secondes avant nouvelle tentative.")
-                    time.sleep(delay)
-                    retries += 1
-
-                else:   # Autre erreur HTTP
-                    logger.error(f"Erreur HTTP {response.status_code}. Arrêt du scraping pour cette page.")
-                    retries += 1
-                    break
+        logger.debug("Scraping page %s...", page_count)
+        page = fetch_review_page(current_url)
+        if page is None:
+            logger.error("Échec du scraping de la page %s.", page_count)
+            break
 
-            except requests.exceptions.RequestException as e:
-                delay = min(base_delay * (2 ** retries), max_delay) + random.uniform(0, 3)
-                logger.warning(f"Erreur réseau : {e}. Pause de {delay:.2f} secondes avant nouvelle tentative.")
-                time.sleep(delay)
-                retries += 1
+        logger.debug("Page %s récupérée avec succès.", page_count)
+        page_reviews, next_url = page
+        if incremental:
+            new_reviews = filter_new_reviews(page_reviews, known_reviews, since)
+            reviews_data.extend(new_reviews)
+            if not new_reviews:
+                logger.info("Page %s sans nouvel avis. Fin du scraping incrémental.", page_count)
+                break
+        else:
+            reviews_data.extend(page_reviews)
 
-        # Si les tentatives échouent après max_retries
-        if retries >= max_retries:
-            logger.error(f"Échec du scraping de la page {page_count} après {max_retries} tentatives.")
-            break
+        # Passer à la page suivante
+        current_url = next_url
+        if current_url:
+            page_count += 1
+        else:
+            logger.info("Aucune page suivante trouvée. Fin de la pagination.")
 
-    logger.info(f"Scraping terminé : {len(reviews_data)} avis extraits.")
+    logger.info("Scraping terminé : %s avis extraits.", len(reviews_data))
     return reviews_data
 
 
-def scrape_restaurant(url):
+def scrape_reviews_fanout(base_url, reviews_count, max_workers=4):
     """
-    Scrape les informations détaillées d'un restaurant sur TripAdvisor.
-    :param url: L'URL de la page du restaurant sur TripAdvisor.
-    :return: Un dictionnaire contenant les informations extraites.
+    Scrape les avis d'un restaurant en téléchargeant les pages en parallèle. Les URLs de toutes
+    les pages sont prédites à partir du nombre d'avis et de l'offset '-orNN-', puis chaque page
+    est vérifiée : dès que le lien 'Page suivante' ne correspond plus à la prédiction, la suite
+    est récupérée en suivant les liens comme dans scrape_reviews. Une page dont le lien révèle un
+    autre offset que celui demandé (offset hors limites redirigé vers la première page...) est
+    écartée, et les avis récupérés deux fois sont supprimés.
+    :param base_url: URL de la première page d'avis.
+    :param reviews_count: Nombre d'avis annoncé dans l'en-tête du restaurant.
+    :param max_workers: Nombre de pages téléchargées simultanément.
+    :return: Liste des avis, dans l'ordre de la pagination.
     """
-    
+    first_page = fetch_review_page(base_url)
+    if first_page is None:
+        logger.error("Échec du scraping de la première page d'avis.")
+        return []
+
+    reviews_data, next_url = first_page
+    page_size = len(reviews_data)
+    if not next_url or not page_size:
+        return reviews_data
+
+    # Prédiction des URLs de toutes les pages suivantes
+    urls = [review_page_url(base_url, offset) for offset in range(page_size, reviews_count or 0, page_size)]
+    if not urls or urls[0] != next_url:
+        logger.info("Les URLs prédites ne correspondent pas à la pagination, suivi des liens.")
+        return reviews_data + scrape_reviews(next_url)
+
+    logger.info("Téléchargement de %s pages d'avis avec %s workers...", len(urls), max_workers)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = [executor.submit(fetch_review_page, page_url) for page_url in urls]
     try:
-        soup = fetch_with_dynamic_wait(url)
-        if not soup:
-            logger.error(f"Impossible de récupérer les données pour {url}")
-            return None
+        for index, future in enumerate(futures):
+            page = future.result()
+            if page is None or not page[0]:
+                # Page inaccessible ou vide : reprise séquentielle à partir de cette page
+                logger.warning("Page prédite %s invalide, suivi des liens.", urls[index])
+                reviews_data.extend(scrape_reviews(urls[index]))
+                break
 
-        # Extraction des données principales
+            page_reviews, next_url = page
+            expected_next = urls[index + 1] if index + 1 < len(urls) else None
+            if next_url != expected_next:
+                offset = review_page_offset(urls[index])
+                if next_url and review_page_offset(next_url) - page_size != offset:
+                    # Ce n'est pas la page demandée : ses avis et ses liens mèneraient à des doublons
+                    logger.warning("La page %s n'est pas à l'offset %s, arrêt de la pagination.", urls[index], offset)
+                    break
+                reviews_data.extend(page_reviews)
+                if next_url:
+                    # Pagination plus longue que la prédiction (nouveaux avis pendant le scraping)
+                    logger.info("La pagination diverge de la prédiction, suivi des liens.")
+                    reviews_data.extend(scrape_reviews(next_url))
+                break
+            reviews_data.extend(page_reviews)
+    finally:
+        # Les pages prédites restantes sont inutiles après une divergence
+        executor.shutdown(wait=True, cancel_futures=True)
 
-        name = soup.select_one('h1.biGQs._P.hzzSG.rRtyp')
-        address = soup.select_one('span[data-automation="restaurantsMapLinkOnName"]')
-        reviews_count_tag  = soup.select_one('span.OFtgC')
-        rating_svg = soup.select_one('svg.UctUV[aria-labelledby]')
-        rating = None
-        if rating_svg:
-            title = rating_svg.find('title')
+    reviews_data = dedupe_reviews(reviews_data)
+    logger.info("Scraping terminé : %s avis extraits.", len(reviews_data))
+    return reviews_data
+
+
+def parse_restaurant_page(soup):
+    """
+    Extrait les informations principales d'un restaurant depuis sa page.
+    Version BeautifulSoup de référence, la version rapide se trouve dans scraping.parsers.
+    :param soup: L'objet BeautifulSoup de la page du restaurant.
+    :return: Un dictionnaire des informations (sans les avis), ou None si des données critiques manquent.
+    """
+    name = soup.select_one('h1.biGQs._P.hzzSG.rRtyp')
+    address = soup.select_one('span[data-automation="restaurantsMapLinkOnName"]')
+    reviews_count_tag = soup.select_one('span.OFtgC')
+    rating_svg = soup.select_one('svg.UctUV[aria-labelledby]')
+    rating = None
+    if rating_svg:
+        title = rating_svg.find('title')
         if title and "sur 5" in title.text:
             rating = float(title.text.split(" sur 5")[0].replace(",", "."))
 
-        ranking_section = soup.select_one('span.ffHqI')
-
-        name = name.text.strip() if name else None
-        address = address.text.strip() if address else None
-
-        if reviews_count_tag:
-            reviews_count = int(reviews_count_tag.text.replace("avis", "").replace("\u202f", "").replace(",", "").strip())
-
-        else :
-            reviews_count = None
-        if ranking_section:
-            ranking_text = ranking_section.text.strip()
-            # Classement (extrait uniquement le numéro après "Nº")
-            ranking_match = re.search(r"Nº\s*(\d+)", ranking_text)
-            ranking = int(ranking_match.group(1)) if ranking_match else None
-            # Total de restaurants (extrait le numéro après "sur")
-            total_match = re.search(r"sur\s*([\d\u202f,]+)", ranking_text)
-            if total_match:
-                total_restaurants = total_match.group(1).replace("\u202f", "").replace(",", "")
-                total_restaurants = int(total_restaurants) if total_restaurants.isdigit() else None
-            else:
-                total_restaurants = None
+    ranking_section = soup.select_one('span.ffHqI')
+
+    name = name.text.strip() if name else None
+    address = address.text.strip() if address else None
+
+    if reviews_count_tag:
+        reviews_count = int(reviews_count_tag.text.replace("avis", "").replace("\u202f", "").replace(",", "").strip())
+    else:
+        reviews_count = None
+
+    if ranking_section:
+        ranking_text = ranking_section.text.strip()
+        # Classement (extrait uniquement le numéro après "Nº")
+        ranking_match = re.search(r"Nº\s*(\d+)", ranking_text)
+        ranking = int(ranking_match.group(1)) if ranking_match else None
+        # Total de restaurants (extrait le numéro après "sur")
+        total_match = re.search(r"sur\s*([\d\u202f,]+)", ranking_text)
+        if total_match:
+            total_restaurants = total_match.group(1).replace("\u202f", "").replace(",", "")
+            total_restaurants = int(total_restaurants) if total_restaurants.isdigit() else None
         else:
-            ranking = None
             total_restaurants = None
-         # Vérification des données critiques et nouvelle tentative si nécessaire
-        if not (name and address and reviews_count and rating and ranking):
+    else:
+        ranking = None
+        total_restaurants = None
+
+    # Vérification des données critiques
+    if not (name and address and reviews_count and rating and ranking):
+        return None
+
+    specific_ratings = {}
+    rating_sections = soup.select('div.YwaWb.u.f')
+    for section in rating_sections:
+        title = section.select_one('span.biGQs._P.pZUbB.biKBZ.hmDzD')
+        svg_title = section.select_one('div.JSTna title')
+        if title and svg_title:
+            category = title.text.strip()
+            rating_match = re.search(r"([\d,\.]+) sur 5", svg_title.text)
+            specific_rating = float(rating_match.group(1).replace(",", ".")) if rating_match else None
+            specific_ratings[category] = specific_rating
+
+    # Scrape du modal des détails
+    modal_data = scrape_modal_details(soup)
+
+    return {
+        "name": name,
+        "address": address,
+        "reviews_count": reviews_count,
+        "rating": rating,
+        "ranking": ranking,
+        "total_restaurants": total_restaurants,
+        **specific_ratings,  # Ajout dynamique des notes spécifiques
+        **modal_data,  # Ajout des détails dynamiques
+    }
+
+
+def scrape_restaurant(url, max_attempts=3, known_reviews=None, since=None, page_workers=1):
+    """
+    Scrape les informations détaillées d'un restaurant sur TripAdvisor.
+    :param url: L'URL de la page du restaurant sur TripAdvisor.
+    :param max_attempts: Nombre de tentatives si la page renvoyée est incomplète.
+    :param known_reviews: Avis déjà stockés, pour un scraping incrémental (voir scrape_reviews).
+    :param since: Date limite des avis à récupérer (voir scrape_reviews).
+    :param page_workers: Nombre de pages d'avis téléchargées en parallèle (voir scrape_reviews_fanout).
+    :return: Un dictionnaire contenant les informations extraites.
+    """
+    
+    try:
+        html = fetch_html(url)
+        if html is None:
+            logger.error("Impossible de récupérer les données pour %s", url)
+            return None
+
+        # Extraction des données principales
+        restaurant = parse_restaurant_html(html)
+        # Vérification des données critiques et nouvelle tentative si nécessaire
+        if restaurant is None:
+            # En rejeu, la page du cache ne changera pas : inutile de réessayer
+            if max_attempts <= 1 or CACHE_CONFIG["replay"]:
+                logger.error("Données incomplètes pour %s, abandon.", url)
+                return None
             logger.warning("Données incomplètes, nouvelle tentative après pause.")
             time.sleep(random.uniform(5, 10))
-            return scrape_restaurant(url) 
-
-        specific_ratings = {}
-        rating_sections = soup.select('div.YwaWb.u.f')
-        for section in rating_sections:
-            title = section.select_one('span.biGQs._P.pZUbB.biKBZ.hmDzD')
-            svg_title = section.select_one('div.JSTna title')
-            if title and svg_title:
-                category = title.text.strip()
-                rating_match = re.search(r"([\d,\.]+) sur 5", svg_title.text)
-                specific_rating = float(rating_match.group(1).replace(",", ".")) if rating_match else None
-                specific_ratings[category] = specific_rating
-        
-        # Scrape du modal des détails
-        modal_data = scrape_modal_details(soup)
+            return scrape_restaurant(url, max_attempts - 1, known_reviews, since, page_workers)
+
         # Scrape des avis
-        reviews_data = scrape_reviews(url)
+        # Le mode incrémental s'arrête au premier avis connu : il reste séquentiel
+        if page_workers > 1 and not known_reviews and since is None:
+            reviews_data = scrape_reviews_fanout(url, restaurant["reviews_count"], max_workers=page_workers)
+        else:
+            reviews_data = scrape_reviews(url, known_reviews=known_reviews, since=since)
 
         return {
-            "name": name,
-            "address": address,
-            "reviews_count": reviews_count,
-            "rating": rating,
-            "ranking": ranking,
-            "total_restaurants": total_restaurants,
-            **specific_ratings,  # Ajout dynamique des notes spécifiques
-            **modal_data,  # Ajout des détails dynamiques
-             "reviews": reviews_data,  # Ajout des avis
-             "url": url,
+            **restaurant,
+            "reviews": reviews_data,  # Ajout des avis
+            "url": url,
         }
     except requests.exceptions.RequestException as e:
-        logger.error(f"Erreur de connexion : {e}")
+        logger.error("Erreur de connexion : %s", e)
         return None
 
 
+def parse_listing_page(soup):
+    """
+    Extrait les cartes d'une page de la liste des restaurants.
+    Version BeautifulSoup de référence, la version rapide se trouve dans scraping.parsers.
+    :param soup: L'objet BeautifulSoup de la page de liste.
+    :return: Tuple (liste de dictionnaires {"url", "reviews_count", "rating"}, URL de la page suivante ou None).
+    """
+    cards = []
+    restaurant_cards = soup.find_all('div', class_='tbrcR _T DxHsn TwZIp rrkMt nSZNd DALUy Re')
+
+    for card in restaurant_cards:
+        # Récupérer le nombre d'avis
+        reviews_span = card.select_one('span.biGQs._P.pZUbB.osNWb > span.yyzcQ')
+        if reviews_span:
+            try:
+                reviews_count = int(reviews_span.text.replace("\u202f", "").replace(",", ""))
+            except ValueError:
+                reviews_count = 0
+        else:
+            reviews_count = 0
+
+        # Récupérer la note moyenne affichée sur la carte
+        rating = None
+        rating_svg = card.find('svg', class_='UctUV')
+        if rating_svg and rating_svg.find('title'):
+            rating_match = re.search(r"([\d,\.]+) sur 5", rating_svg.find('title').text)
+            rating = float(rating_match.group(1).replace(",", ".")) if rating_match else None
+
+        link = card.find('a', class_='BMQDV _F Gv wSSLS SwZTJ FGwzt ukgoS')
+        url = "https://www.tripadvisor.fr" + link['href'] if link and link.get('href') else None
+        cards.append({"url": url, "reviews_count": reviews_count, "rating": rating})
+
+    return cards, find_next_page_url(soup)
+
+
 def scrape_restaurant_list(base_url, max_restaurants=15, min_reviews=900):
     """
     Scrape les URLs des restaurants ayant plus de 'min_reviews' avis sur TripAdvisor.
@@ -309,46 +564,144 @@ def scrape_restaurant_list(base_url, max_restaurants=15, min_reviews=900):
     page_count = 0
 
     while current_url and len(restaurant_urls) < max_restaurants:
-        logger.info(f"Scraping restaurant list, page {page_count + 1}...")
-        response = requests.get(current_url, headers=HEADERS, timeout=10)
+        logger.info("Scraping restaurant list, page %s...", page_count + 1)
+        with host_limiter.slot(current_url):
+            response = http_get(current_url, headers=HEADERS)
         if response.status_code != 200:
-            logger.error(f"Erreur HTTP {response.status_code} sur {current_url}. Arrêt du scraping.")
+            logger.error("Erreur HTTP %s sur %s. Arrêt du scraping.", response.status_code, current_url)
             break
 
-        soup = BeautifulSoup(response.text, 'lxml')
-        restaurant_cards = soup.find_all('div', class_='tbrcR _T DxHsn TwZIp rrkMt nSZNd DALUy Re')
-
-        for card in restaurant_cards:
-            # Récupérer le nombre d'avis
-            reviews_span = card.select_one('span.biGQs._P.pZUbB.osNWb > span.yyzcQ')
-            if reviews_span:
-                try:
-                    reviews_count = int(reviews_span.text.replace("\u202f", "").replace(",", ""))
-                except ValueError:
-                    reviews_count = 0
-            else:
-                reviews_count = 0
-
+        cards, next_url = parse_listing_html(response.text)
+        for card in cards:
             # Si le restaurant a assez d'avis, on récupère son URL
-            if reviews_count >= min_reviews:
-                link = card.find('a', class_='BMQDV _F Gv wSSLS SwZTJ FGwzt ukgoS')
-                if link and link.get('href'):
-                    restaurant_url = "https://www.tripadvisor.fr" + link['href']
-                    restaurant_urls.append(restaurant_url)
-                    logger.info(f"Restaurant trouvé : {restaurant_url} avec {reviews_count} avis.")
-                    # Arrêter si on atteint le maximum
-                    if len(restaurant_urls) >= max_restaurants:
-                        break
-
-        # Trouver le lien vers la page suivante
-        next_button = soup.find('a', {'aria-label': 'Page suivante'})
-        if next_button and next_button.get('href'):
-            current_url = "https://www.tripadvisor.fr" + next_button['href']
+            if card["reviews_count"] >= min_reviews and card["url"]:
+                restaurant_urls.append(card["url"])
+                logger.info("Restaurant trouvé : %s avec %s avis.", card['url'], card['reviews_count'])
+                # Arrêter si on atteint le maximum
+                if len(restaurant_urls) >= max_restaurants:
+                    break
+
+        # Passer à la page suivante
+        if next_url:
+            current_url = next_url
             page_count += 1
-            time.sleep(random.uniform(3, 7)) 
         else:
             logger.info("Aucune page suivante trouvée. Fin de la pagination.")
             current_url = None
 
-    logger.info(f"Scraping terminé. {len(restaurant_urls)} restaurants trouvés.")
-    return restaurant_urls
\ No newline at end of file
+    logger.info("Scraping terminé. %s restaurants trouvés.", len(restaurant_urls))
+    return restaurant_urls
+
+
+def listing_page_url(base_url, offset):
+    """
+    Construit l'URL de la page de la liste des restaurants commençant à l'offset donné (motif '-oaNN-').
+    :param base_url: URL d'une page de la liste.
+    :param offset: Index du premier restaurant de la page.
+    :return: URL de la page de liste.
+    """
+    return re.sub(r"-oa\d+-", f"-oa{offset}-", base_url, count=1)
+
+
+def fetch_listing_page(url):
+    """
+    Récupère et analyse une page de la liste des restaurants.
+    :param url: URL de la page de liste.
+    :return: Liste des cartes {"url", "reviews_count"}, ou None si la page n'a pas pu être récupérée.
+    """
+    html = fetch_html(url)
+    if html is None:
+        return None
+    cards, _ = parse_listing_html(html)
+    return cards
+
+
+def iter_restaurant_cards(base_url, min_reviews=900, max_restaurants=None, max_pages=None, max_workers=4,
+                          page_size=30):
+    """
+    Découvre les restaurants de la liste en téléchargeant plusieurs pages à la fois. Les offsets des
+    pages (oa0, oa30, ...) sont calculés à l'avance au lieu de suivre les liens 'Page suivante' ;
+    les requêtes restent soumises au régulateur de débit et à la limite par hôte. Les pages sont lues
+    dans l'ordre des offsets : la fin de la liste est la première page vide ou dont toutes les cartes
+    figurent sur les pages précédentes, quel que soit l'ordre dans lequel les téléchargements se terminent.
+    Les cartes retenues sont renvoyées sans doublon dès que les pages précédentes ont été lues, pour que
+    le scraping des restaurants démarre avant la fin de la découverte.
+    :param base_url: URL de la première page de la liste (motif '-oa0-').
+    :param min_reviews: Nombre minimum d'avis requis pour inclure un restaurant.
+    :param max_restaurants: Nombre maximum de restaurants à renvoyer (par défaut, aucune limite).
+    :param max_pages: Nombre maximum de pages de liste à parcourir (par défaut, jusqu'à la fin de la liste).
+    :param max_workers: Nombre de pages de liste téléchargées en parallèle.
+    :param page_size: Nombre de restaurants par page de liste.
+    :return: Générateur des cartes {"url", "reviews_count", "rating"} des restaurants retenus.
+    """
+    seen = set()
+    listed = set()  # Toutes les URLs des cartes déjà lues, retenues ou non
+    found = 0
+    next_page = 0
+    end_page = max_pages  # Première page au-delà de la fin de la liste, dès qu'elle est connue
+    completed = {}  # {page: cartes (None si introuvable, False si erreur)} des pages arrivées en avance
+    next_to_read = 0  # Les pages sont lues dans l'ordre des offsets, quel que soit l'ordre d'arrivée
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = {}
+
+        def submit_pages():
+            nonlocal next_page
+            while len(in_flight) < max_workers and (end_page is None or next_page < end_page):
+                url = listing_page_url(base_url, next_page * page_size)
+                in_flight[executor.submit(fetch_listing_page, url)] = next_page
+                next_page += 1
+
+        submit_pages()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                page = in_flight.pop(future)
+                try:
+                    completed[page] = future.result()
+                except Exception as e:
+                    logger.error("Erreur lors du scraping de la page de liste %s : %s", page + 1, e)
+                    completed[page] = False
+
+            while next_to_read in completed and (end_page is None or next_to_read < end_page):
+                page, cards = next_to_read, completed.pop(next_to_read)
+                next_to_read += 1
+                if cards is False:
+                    continue
+                page_urls = {card["url"] for card in cards or [] if card["url"]}
+                if not page_urls or page_urls <= listed:
+                    # Page introuvable, vide, ou dont toutes les cartes sont sur les pages précédentes
+                    # (offset hors de la liste redirigé) : la liste s'arrête avant cette page
+                    if cards is None:
+                        logger.warning("Page de liste %s introuvable, considérée comme la fin de la liste.", page + 1)
+                    end_page = page
+                    for pending in in_flight:
+                        pending.cancel()
+                    break
+                listed |= page_urls
+
+                for card in cards:
+                    url = card["url"]
+                    if url and card["reviews_count"] >= min_reviews and url not in seen:
+                        seen.add(url)
+                        found += 1
+                        logger.info("Restaurant trouvé : %s avec %s avis.", url, card['reviews_count'])
+                        yield card
+                        if max_restaurants and found >= max_restaurants:
+                            for pending in in_flight:
+                                pending.cancel()
+                            return
+
+            submit_pages()
+
+    logger.info("Découverte terminée. %s restaurants trouvés sur %s pages.", found, next_page)
+
+
+def iter_restaurant_list(base_url, **kwargs):
+    """
+    Découvre les URLs des restaurants de la liste en parallèle (voir iter_restaurant_cards).
+    :param base_url: URL de la première page de la liste (motif '-oa0-').
+    :return: Générateur des URLs des restaurants retenus.
+    """
+    for card in iter_restaurant_cards(base_url, **kwargs):
+        yield card["url"]
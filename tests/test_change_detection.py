@@ -0,0 +1,30 @@
+import pytest
+
+from scraping.change_detection import FULL, INCREMENTAL, NEW, UNCHANGED, classify_change, plan_refresh
+
+
+def card(reviews_count, rating=4.5):
+    return {"url": "https://example.com/r", "reviews_count": reviews_count, "rating": rating}
+
+
+@pytest.mark.parametrize("listing, snapshot, expected", [
+    (card(100), None, NEW),
+    (card(100), {"reviews_count": None, "rating": 4.5}, NEW),
+    (card(100), {"reviews_count": 100, "rating": 4.5}, UNCHANGED),
+    (card(100, rating=None), {"reviews_count": 100, "rating": 4.5}, UNCHANGED),
+    (card(100, rating=4.0), {"reviews_count": 100, "rating": 4.5}, FULL),
+    (card(110), {"reviews_count": 100, "rating": 4.5}, INCREMENTAL),
+    (card(150), {"reviews_count": 100, "rating": 4.5}, INCREMENTAL),
+    (card(151), {"reviews_count": 100, "rating": 4.5}, FULL),
+    (card(90), {"reviews_count": 100, "rating": 4.5}, FULL),
+])
+def test_classify_change(listing, snapshot, expected):
+    assert classify_change(listing, snapshot) == expected
+
+
+def test_plan_refresh_skips_unchanged_restaurants():
+    cards = [dict(card(100), url="a"), dict(card(105), url="b"), dict(card(1), url="c")]
+    snapshots = {"a": {"reviews_count": 100, "rating": 4.5}, "b": {"reviews_count": 100, "rating": 4.5}}
+    counts = {}
+    assert list(plan_refresh(cards, snapshots, counts=counts)) == [("b", INCREMENTAL), ("c", NEW)]
+    assert counts == {UNCHANGED: 1, INCREMENTAL: 1, NEW: 1}
@@ -0,0 +1,34 @@
+from processing.clean_data import iter_to_process, plan_incremental
+from processing.processing_utils import append_jsonl
+
+FIRST = {"author": "marie", "review_text": "Très bon"}
+SECOND = {"author": "paul", "review_text": "Service lent"}
+
+
+def restaurant(url, reviews, reviews_count, **extra):
+    return {"name": url, "url": url, "reviews_count": str(reviews_count), "reviews": reviews, **extra}
+
+
+def test_refresh_completes_the_previous_version(tmp_path):
+    raw_filepath = tmp_path / "raw.jsonl"
+    append_jsonl(restaurant("a", [FIRST], 1), raw_filepath)
+    append_jsonl(restaurant("b", [FIRST], 1), raw_filepath)
+    previous_hashes, _ = plan_incremental(raw_filepath, {})
+
+    # Rafraîchissement : seul le nouvel avis de « a » a été scrapé
+    append_jsonl(restaurant("a", [SECOND], 2, incremental=True), raw_filepath)
+    hashes, to_process = plan_incremental(raw_filepath, previous_hashes)
+
+    assert hashes["b"] == previous_hashes["b"]
+    assert hashes["a"] != previous_hashes["a"]
+    assert list(iter_to_process(raw_filepath, to_process)) == [restaurant("a", [SECOND, FIRST], 2)]
+
+
+def test_full_rescrape_replaces_the_previous_version(tmp_path):
+    raw_filepath = tmp_path / "raw.jsonl"
+    append_jsonl(restaurant("a", [FIRST], 1), raw_filepath)
+    append_jsonl(restaurant("a", [SECOND], 1), raw_filepath)
+    hashes, to_process = plan_incremental(raw_filepath, {})
+
+    assert list(hashes) == ["a"]
+    assert list(iter_to_process(raw_filepath, to_process)) == [restaurant("a", [SECOND], 1)]
@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+import pytest
+
+from scraping import concurrent_scraper, scraper_utils
+from scraping.concurrent_scraper import iter_scraped_restaurants, scrape_restaurants_concurrently
+
+URLS = [f"https://{host}.example.com/r{i}" for i in range(6) for host in ("a", "b")]
+
+
+class FakeResponse:
+    status_code = 200
+    text = "<html></html>"
+
+
+@pytest.fixture
+def requests_per_host(monkeypatch):
+    """Remplace le téléchargement par une attente, en notant le maximum de requêtes simultanées par hôte."""
+    lock = threading.Lock()
+    active, peak = Counter(), Counter()
+
+    def http_get(url, headers=None):
+        host = urlparse(url).netloc
+        with lock:
+            active[host] += 1
+            peak[host] = max(peak[host], active[host])
+        time.sleep(0.01)
+        with lock:
+            active[host] -= 1
+        return FakeResponse()
+
+    def scrape_restaurant(url, known_reviews=None, since=None, page_workers=1):
+        if url.endswith("r5"):
+            raise ValueError("page inattendue")
+        # Page du restaurant puis une page d'avis, comme le vrai scraper
+        scraper_utils.fetch_html(url)
+        scraper_utils.fetch_html(f"{url}-or15")
+        return {"url": url}
+
+    monkeypatch.setattr(scraper_utils, "http_get", http_get)
+    monkeypatch.setattr(concurrent_scraper, "scrape_restaurant", scrape_restaurant)
+    return peak
+
+
+def test_requests_per_host_stay_within_the_limit(requests_per_host):
+    results = list(iter_scraped_restaurants(iter(URLS), max_workers=8, per_host_limit=2))
+
+    assert set(requests_per_host) == {"a.example.com", "b.example.com"}
+    assert max(requests_per_host.values()) == 2
+    assert sorted(url for url, _ in results) == sorted(URLS)
+    assert {url for url, data in results if data is None} == {URLS[10], URLS[11]}
+
+
+def test_results_are_returned_in_url_order(requests_per_host):
+    assert scrape_restaurants_concurrently(URLS, max_workers=4, per_host_limit=1) == [
+        {"url": url} for url in URLS if not url.endswith("r5")
+    ]
+    assert requests_per_host == {"a.example.com": 1, "b.example.com": 1}
@@ -0,0 +1,93 @@
+import sqlite3
+
+from database.create_warehouse import (DEFERRED_REVIEW_INDEXES, LOAD_PRAGMAS, DimensionCache, bulk_load, create_tables,
+                                       insert_data)
+from processing.fingerprint import simhash
+
+TEXT = ("Accueil chaleureux et cuisine généreuse, le service était un peu lent mais les plats valaient "
+        "l'attente. Nous reviendrons avec plaisir.")
+EDITED = TEXT.replace("un peu lent", "très lent")
+OTHER = "Très déçu par le plat du jour, froid et sans goût. Le serveur n'a pas été aimable."
+
+
+def restaurant(*reviews):
+    return {"name": "R", "street": "1 rue", "city": "Lyon", "url": "u",
+            "reviews": [{"author": author, "review_text": text} for author, text in reviews]}
+
+
+def stored_reviews(cursor):
+    return cursor.execute("SELECT author, review_text FROM reviews ORDER BY id_review").fetchall()
+
+
+def test_edited_rescraped_review_is_not_inserted_again():
+    cursor = sqlite3.connect(":memory:").cursor()
+    create_tables(cursor)
+    insert_data(cursor, [restaurant(("marie", TEXT))])
+
+    # Rescraping : marie a retouché son avis et en a publié un autre
+    insert_data(cursor, [restaurant(("Marie", EDITED), ("marie", OTHER), ("paul", EDITED))])
+
+    assert stored_reviews(cursor) == [("marie", TEXT), ("marie", OTHER), ("paul", EDITED)]
+
+
+def test_migration_backfills_simhash_of_stored_reviews():
+    cursor = sqlite3.connect(":memory:").cursor()
+    create_tables(cursor)
+    insert_data(cursor, [restaurant(("marie", TEXT))])
+    cursor.execute("ALTER TABLE reviews DROP COLUMN simhash")
+
+    create_tables(cursor)
+    assert cursor.execute("SELECT simhash FROM reviews").fetchall() == [(simhash(TEXT),)]
+
+    insert_data(cursor, [restaurant(("marie", EDITED))])
+    assert stored_reviews(cursor) == [("marie", TEXT)]
+
+
+def test_dimension_cache_is_prefilled():
+    connection = sqlite3.connect(":memory:")
+    cursor = connection.cursor()
+    create_tables(cursor)
+    cursor.executemany("INSERT INTO cuisines (name) VALUES (?)", [("Française",), ("Italienne",)])
+    cursor.execute("INSERT INTO meals (name) VALUES ('Dîner')")
+
+    dimensions = DimensionCache(cursor)
+    statements = []
+    connection.set_trace_callback(statements.append)
+    assert dimensions.get_ids(["Italienne", "Française"], "id_cuisine", "cuisines") == [2, 1]
+    assert dimensions.get_ids(["Dîner"], "id_meal", "meals") == [1]
+    assert statements == []
+
+
+def sample_restaurants():
+    return [{"name": f"R{i}", "street": f"{i} rue", "city": "Lyon", "url": f"u{i}",
+             "cuisines": "Française, Italienne" if i % 2 else "Française", "meals": "Dîner",
+             "reviews": [{"author": f"a{j}", "review_text": f"Avis {j} sur R{i} : {TEXT if j % 2 else OTHER}",
+                          "review_date": f"Rédigé le {j + 1} mars 2024"} for j in range(4)]}
+            for i in range(5)] + [{"name": "R0", "street": "0 rue", "city": "Lyon", "url": "u0",
+                                   "reviews": [{"author": "a0", "review_text": f"Avis 0 sur R0 : {OTHER}"}]}]
+
+
+def table_counts(connection):
+    tables = ["restaurants", "reviews", "cuisines", "meals", "restaurant_cuisines", "restaurant_meals"]
+    return {table: connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables}
+
+
+def test_bulk_load_matches_insert_data_and_restores_settings(tmp_path):
+    reference = sqlite3.connect(str(tmp_path / "reference.db"))
+    create_tables(reference.cursor())
+    insert_data(reference.cursor(), sample_restaurants())
+    reference.commit()
+
+    connection = sqlite3.connect(str(tmp_path / "bulk.db"))
+    settings = {name: connection.execute(f"PRAGMA {name}").fetchone()[0] for name in LOAD_PRAGMAS}
+    statements = []
+    connection.set_trace_callback(statements.append)
+    inserted, _ = bulk_load(connection, sample_restaurants(), batch_size=2)
+    connection.set_trace_callback(None)
+
+    assert inserted == 20
+    assert table_counts(connection) == table_counts(reference)
+    assert statements.count("BEGIN") == 3
+    assert {name: connection.execute(f"PRAGMA {name}").fetchone()[0] for name in LOAD_PRAGMAS} == settings
+    indexes = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert set(DEFERRED_REVIEW_INDEXES) <= indexes
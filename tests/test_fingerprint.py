@@ -0,0 +1,35 @@
+from processing.fingerprint import (SIMHASH_MAX_DISTANCE, collapse_duplicate_reviews, hamming_distance,
+                                    review_fingerprint, simhash)
+
+TEXT = ("Accueil chaleureux et cuisine généreuse, le service était un peu lent mais les plats valaient "
+        "l'attente. Nous reviendrons avec plaisir.")
+EDITED = TEXT.replace("un peu lent", "très lent")
+OTHER = "Très déçu par le plat du jour, froid et sans goût. Le serveur n'a pas été aimable."
+
+
+def review(author, text):
+    return {"author": author, "review_text": text}
+
+
+def test_review_fingerprint_ignores_case_and_spacing():
+    assert review_fingerprint("Marie", TEXT) == review_fingerprint("marie ", TEXT.upper().replace(" ", "  "))
+    assert review_fingerprint("Marie", TEXT) != review_fingerprint("Paul", TEXT)
+    assert review_fingerprint("Marie", TEXT) != review_fingerprint("Marie", EDITED)
+    assert -2 ** 63 <= review_fingerprint(None, None) < 2 ** 63
+
+
+def test_simhash_is_close_for_edited_texts():
+    assert hamming_distance(simhash(TEXT), simhash(EDITED)) <= SIMHASH_MAX_DISTANCE
+    assert hamming_distance(simhash(TEXT), simhash(OTHER)) > SIMHASH_MAX_DISTANCE
+
+
+def test_collapse_removes_exact_and_near_duplicates_of_same_author():
+    reviews = [review("marie", EDITED), review("marie", TEXT), review("Marie", EDITED), review("marie", OTHER)]
+    kept = collapse_duplicate_reviews(reviews)
+    assert [r["review_text"] for r in kept] == [EDITED, OTHER]
+    assert all("fingerprint" in r for r in kept)
+
+
+def test_collapse_keeps_same_text_from_different_authors():
+    kept = collapse_duplicate_reviews([review("marie", "Excellent !"), review("paul", "Excellent !")])
+    assert [r["author"] for r in kept] == ["marie", "paul"]
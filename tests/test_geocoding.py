@@ -0,0 +1,55 @@
+import sqlite3
+import threading
+
+import pytest
+
+from processing import geocoding
+from processing.geocoding import Geocoder
+
+LYON = {"latitude": 45.76, "longitude": 4.83}
+
+
+@pytest.fixture
+def geocoder(tmp_path, monkeypatch):
+    monkeypatch.setitem(geocoding.GEOCODING_CONFIG, "remote", True)
+    return Geocoder(cache_file=str(tmp_path / "geocoding.db"), gazetteer_file=str(tmp_path / "absent.csv"))
+
+
+def test_submit_does_not_wait_for_a_remote_lookup_in_progress(geocoder):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_remote_geocode(query):
+        # Comme le vrai appel : _remote_lock est tenu pendant la requête à Nominatim
+        with geocoder._remote_lock:
+            started.set()
+            release.wait(5)
+        return dict(LYON)
+
+    geocoder._remote_geocode = slow_remote_geocode
+    first = geocoder.submit("1 rue A, 69001 Lyon France", "A")
+    assert started.wait(5)
+
+    submitted = threading.Event()
+    threading.Thread(target=lambda: (geocoder.submit("2 rue B, 69002 Lyon France", "B"), submitted.set()),
+                     daemon=True).start()
+    try:
+        assert submitted.wait(1)
+    finally:
+        release.set()
+    assert first.result(5) == LYON
+
+
+def test_cache_failure_resolves_the_batch_and_keeps_the_worker(geocoder):
+    geocoder._remote_geocode = lambda query: dict(LYON)
+    set_many = geocoder.cache.set_many
+    failures = [sqlite3.OperationalError("database is locked")]
+
+    def failing_set_many(results):
+        if failures:
+            raise failures.pop()
+        set_many(results)
+
+    geocoder.cache.set_many = failing_set_many
+    with pytest.raises(sqlite3.OperationalError):
+        geocoder.submit("1 rue A, 69001 Lyon France", "A").result(5)
+    assert geocoder.submit("2 rue B, 69002 Lyon France", "B").result(5) == LYON
@@ -0,0 +1,55 @@
+import os
+import time
+
+import pytest
+
+from scraping import html_cache, http_client
+from scraping.html_cache import cache_path, get_cached_page, store_page
+
+URL = "https://www.tripadvisor.fr/Restaurant_Review-g187265-d1-Reviews-Chez_Paul-Lyon.html"
+HTML = "<html><h1>Chez Paul</h1></html>"
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(html_cache, "CACHE_CONFIG", dict(html_cache.CACHE_CONFIG))
+    monkeypatch.setattr(http_client, "CACHE_CONFIG", html_cache.CACHE_CONFIG)
+    html_cache.configure_cache(enabled=True, replay=False, directory=str(tmp_path), ttl=3600)
+    return html_cache.CACHE_CONFIG
+
+
+def no_network():
+    raise AssertionError("aucune requête réseau attendue")
+
+
+def test_miss_then_hit(cache):
+    assert get_cached_page(URL) is None
+    store_page(URL, HTML)
+    assert get_cached_page(URL) == HTML
+    assert cache_path(URL).name.endswith(".html.gz")
+
+
+def test_expired_page_is_a_miss_except_in_replay(cache):
+    store_page(URL, HTML)
+    old = time.time() - 7200
+    os.utime(cache_path(URL), (old, old))
+    assert get_cached_page(URL) is None
+    html_cache.configure_cache(replay=True)
+    assert get_cached_page(URL) == HTML
+
+
+def test_key_ignores_query_order_and_fragment(cache):
+    store_page("https://Example.com/page?b=2&a=1#avis", HTML)
+    assert get_cached_page("https://example.com/page?a=1&b=2") == HTML
+    assert get_cached_page("https://example.com/page?a=1&b=3") is None
+
+
+def test_replay_serves_hits_and_never_downloads_misses(cache, monkeypatch):
+    monkeypatch.setattr(http_client, "get_session", no_network)
+    html_cache.configure_cache(replay=True)
+    store_page(URL, HTML)
+
+    hit = http_client.http_get(URL)
+    assert (hit.status_code, hit.text, hit.from_cache) == (200, HTML, True)
+    miss = http_client.http_get(URL.replace("d1", "d2"))
+    assert (miss.status_code, miss.text) == (504, None)
@@ -0,0 +1,33 @@
+import gzip
+import io
+
+import requests
+import urllib3
+from requests.structures import CaseInsensitiveDict
+
+from scraping.http_client import wire_size
+
+HTML = ("<html>" + "Accueil chaleureux et cuisine généreuse. " * 500 + "</html>").encode("utf-8")
+
+
+def gzip_response():
+    body = gzip.compress(HTML)
+    raw = urllib3.HTTPResponse(body=io.BytesIO(body), headers={"Content-Encoding": "gzip"},
+                               preload_content=False, decode_content=True)
+    response = requests.Response()
+    response.raw, response.status_code = raw, 200
+    response.headers = CaseInsensitiveDict(raw.headers)
+    return response, len(body)
+
+
+def test_wire_size_counts_compressed_bytes_read():
+    response, compressed = gzip_response()
+    assert response.content == HTML
+    assert wire_size(response) == compressed < len(HTML)
+
+
+def test_wire_size_prefers_content_length():
+    response = requests.Response()
+    response.headers = CaseInsensitiveDict({"Content-Encoding": "gzip", "Content-Length": "123"})
+    response._content = HTML
+    assert wire_size(response) == 123
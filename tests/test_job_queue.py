@@ -0,0 +1,100 @@
+import pytest
+
+from scraping import job_queue as job_queue_module
+from scraping.job_queue import JobQueue
+
+
+class Clock:
+    """Horloge contrôlée par le test, à la place de time.time dans job_queue."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(job_queue_module.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return JobQueue(str(tmp_path / "jobs.db"), lease_seconds=60, retry_delay=10)
+
+
+def test_enqueue_ignores_duplicates(queue):
+    assert queue.enqueue_restaurants(["a", "b", "a"]) == 2
+    assert queue.stats() == {("restaurant", "pending"): 2}
+
+
+def test_claim_prefers_review_pages_and_leases_job(queue):
+    queue.enqueue("restaurant", "r")
+    queue.enqueue("review_page", "r-or15", "r", position=15)
+    job = queue.claim("w1")
+    assert (job["kind"], job["url"], job["attempt"]) == ("review_page", "r-or15", 1)
+    assert queue.claim("w2")["url"] == "r"
+    assert queue.claim("w3") is None
+
+
+def test_complete_requires_lease_owner(queue):
+    queue.enqueue("restaurant", "r")
+    job = queue.claim("w1")
+    assert not queue.complete(job, "w2", {"header": {}, "reviews": []})
+    assert queue.complete(job, "w1", {"header": {}, "reviews": []})
+    assert queue.stats() == {("restaurant", "done"): 1}
+    assert not queue.has_unfinished()
+
+
+def test_expired_lease_is_claimed_by_another_worker(queue, clock):
+    queue.enqueue("restaurant", "r")
+    first = queue.claim("w1")
+    assert queue.claim("w2") is None
+    clock.now += 61
+    second = queue.claim("w2")
+    assert (second["id"], second["attempt"]) == (first["id"], 2)
+    # Le premier worker a perdu son bail : son résultat est ignoré
+    assert not queue.complete(first, "w1", {})
+    assert queue.complete(second, "w2", {})
+
+
+def test_expired_lease_after_last_attempt_fails_job(queue, clock):
+    queue.enqueue("restaurant", "r", max_attempts=1)
+    queue.claim("w1")
+    clock.now += 61
+    assert queue.claim("w2") is None
+    assert queue.stats() == {("restaurant", "failed"): 1}
+
+
+def test_fail_retries_with_backoff(queue, clock):
+    queue.enqueue("restaurant", "r", max_attempts=2)
+    queue.fail(queue.claim("w1"), "w1", "erreur")
+    assert queue.claim("w1") is None
+    clock.now += 10
+    job = queue.claim("w1")
+    assert job["attempt"] == 2
+    queue.fail(job, "w1", "erreur")
+    assert queue.stats() == {("restaurant", "failed"): 1}
+
+
+def test_iter_completed_restaurants_reassembles_pages(queue):
+    queue.enqueue("restaurant", "r")
+    queue.enqueue("review_page", "r-or30", "r", position=30)
+    queue.enqueue("review_page", "r-or15", "r", position=15)
+    review = lambda author: {"author": author, "review_text": "texte"}
+    for _ in range(3):
+        job = queue.claim("w")
+        if job["kind"] == "restaurant":
+            result = {"header": {"name": "R"}, "reviews": [review("a")]}
+        else:
+            result = {"reviews": [review("a"), review(job["url"])]}
+        queue.complete(job, "w", result)
+
+    [(url, restaurant)] = list(queue.iter_completed_restaurants())
+    assert url == "r"
+    assert [r["author"] for r in restaurant["reviews"]] == ["a", "r-or15", "r-or30"]
+    queue.mark_exported(url)
+    assert list(queue.iter_completed_restaurants()) == []
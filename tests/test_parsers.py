@@ -0,0 +1,32 @@
+from pathlib import Path
+
+import pytest
+
+from scraping.parsers import check_parity, parse_listing_html, parse_restaurant_html, parse_reviews_html
+
+FIXTURES = Path(__file__).parent / "fixtures" / "html"
+PAGES = sorted(FIXTURES.glob("*.html"))
+
+
+@pytest.mark.parametrize("page", PAGES, ids=[page.name for page in PAGES])
+def test_lxml_parsers_match_beautifulsoup(page):
+    assert check_parity(page.read_text(encoding="utf-8")) == []
+
+
+def test_fixtures_exercise_each_parser():
+    read = lambda name: (FIXTURES / name).read_text(encoding="utf-8")
+
+    cards, next_url = parse_listing_html(read("listing.html"))
+    assert [card["reviews_count"] for card in cards] == [1254, 87, 0]
+    assert next_url.endswith("-oa30-Lyon_Rhone_Auvergne_Rhone_Alpes.html")
+    assert parse_listing_html(read("listing_last.html"))[1] is None
+
+    restaurant = parse_restaurant_html(read("restaurant.html"))
+    assert (restaurant["name"], restaurant["ranking"], restaurant["total_restaurants"]) == ("Les Terrasses", 12, 3456)
+    reviews, next_url = parse_reviews_html(read("restaurant.html"))
+    assert [review["author"] for review in reviews] == ["Marie L", "Anonyme"]
+    assert "-or15-" in next_url
+
+    reviews, next_url = parse_reviews_html(read("reviews_last.html"))
+    assert [review["author"] for review in reviews] == ["Paul D"]
+    assert next_url is None
@@ -0,0 +1,23 @@
+import queue
+
+from scraping import pipeline
+from scraping.pipeline import PageJob, _STOP, _fetch_worker
+
+
+def test_fetch_error_is_reported_as_a_failed_page(monkeypatch):
+    def fetch_html(url):
+        if url.endswith("cassee"):
+            raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "octet invalide")
+        return "<html></html>"
+
+    monkeypatch.setattr(pipeline, "fetch_html", fetch_html)
+    job_queue, raw_queue = queue.Queue(), queue.Queue()
+    broken = PageJob("r", "https://example.com/cassee", "restaurant")
+    working = PageJob("r", "https://example.com/ok", "reviews")
+    for job in (broken, working, _STOP):
+        job_queue.put(job)
+
+    _fetch_worker(job_queue, raw_queue)
+
+    assert raw_queue.get_nowait() == (broken, None)
+    assert raw_queue.get_nowait() == (working, "<html></html>")
@@ -0,0 +1,21 @@
+from datetime import date
+
+import pytest
+
+from processing.processing_utils import parse_french_date
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Rédigé le 12 décembre 2023", date(2023, 12, 12)),
+    ("Rédigé le 1er janvier 2024", date(2024, 1, 1)),
+    ("3 févr. 2022", date(2022, 2, 3)),
+    ("déc. 2023", date(2023, 12, 1)),
+    ("août 2021", date(2021, 8, 1)),
+])
+def test_parse_french_date(text, expected):
+    assert parse_french_date(text) == expected
+
+
+@pytest.mark.parametrize("text", [None, "", "hier", "31 février 2023", "12 brumaire 2023"])
+def test_parse_french_date_unrecognised(text):
+    assert parse_french_date(text) is None
@@ -0,0 +1,104 @@
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from scraping import http_client, rate_control
+from scraping.rate_control import AdaptiveRateController
+
+
+class Clock:
+    """Horloge contrôlée : sleep avance le temps au lieu d'attendre."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_control, "time", clock)
+    return clock
+
+
+def controller(**kwargs):
+    return AdaptiveRateController(**{"initial_rate": 1.0, "min_rate": 0.25, "max_rate": 2.0, "increase": 0.5,
+                                     "cooldown": 5.0, "jitter": 0.0, **kwargs})
+
+
+def test_acquire_spaces_requests_by_the_current_rate(clock):
+    regulator = controller(initial_rate=2.0)
+    assert [regulator.acquire() for _ in range(3)] == [0.0, 0.5, 0.5]
+    assert clock.now == 1001.0
+
+
+def test_success_increases_rate_additively_up_to_the_ceiling(clock):
+    regulator = controller()
+    regulator.record_success()
+    assert regulator.rate == 1.5
+    regulator.record_success()
+    regulator.record_success()
+    assert regulator.rate == 2.0
+
+
+def test_block_halves_rate_once_per_cooldown_down_to_the_floor(clock):
+    regulator = controller()
+    regulator.record_block()
+    regulator.record_block()  # Même rafale : ignoré
+    assert regulator.rate == 0.5
+    for _ in range(3):
+        clock.sleep(5.0)
+        regulator.record_error()
+    assert regulator.rate == 0.25
+    assert regulator.stats()["blocks"] == 2 and regulator.stats()["errors"] == 3
+
+
+def test_block_pauses_for_the_new_interval(clock):
+    regulator = controller()
+    regulator.acquire()
+    regulator.record_block()
+    assert regulator.acquire() == 2.0
+
+
+def test_retry_after_delays_next_request_even_during_cooldown(clock):
+    regulator = controller(max_retry_after=60.0)
+    regulator.record_block()
+    regulator.record_block(retry_after=30.0)
+    assert regulator.rate == 0.5
+    assert regulator.acquire() == 30.0
+    regulator.record_error(retry_after=3600.0)
+    assert regulator.acquire() == 60.0
+
+
+@pytest.mark.parametrize("status, signal", [(429, "blocks"), (503, "errors")])
+def test_http_get_reports_retry_after_to_the_controller(clock, monkeypatch, status, signal):
+    regulator = controller()
+    response = requests.Response()
+    response.status_code, response._content = status, b""
+    response.headers = CaseInsensitiveDict({"Retry-After": "12"})
+
+    class Session:
+        def get(self, url, headers=None, timeout=None):
+            return response
+
+    monkeypatch.setattr(http_client, "rate_controller", regulator)
+    monkeypatch.setattr(http_client, "get_session", lambda: Session())
+    monkeypatch.setitem(http_client.CACHE_CONFIG, "enabled", False)
+
+    assert http_client.http_get("https://example.com/page") is response
+    assert regulator.stats()[signal] == 1
+    assert regulator.rate == 0.5
+    assert regulator.acquire() == 12.0
+
+
+def test_retry_after_accepts_an_http_date():
+    response = requests.Response()
+    response.headers = CaseInsensitiveDict({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    assert http_client.retry_after_seconds(response) == 0.0
+    response.headers["Retry-After"] = "bientôt"
+    assert http_client.retry_after_seconds(response) is None
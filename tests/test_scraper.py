@@ -0,0 +1,40 @@
+import pytest
+
+from processing.processing_utils import iter_jsonl
+from scraping import scraper
+
+URLS = ["https://example.com/a", "https://example.com/b"]
+
+
+@pytest.fixture
+def crawl(tmp_path, monkeypatch):
+    scraped = []
+
+    def iter_scraped_restaurants(urls, **kwargs):
+        for url in urls:
+            scraped.append(url)
+            yield url, {"name": url, "url": url, "reviews": []}
+
+    monkeypatch.setattr(scraper, "PROJECT_ROOT", tmp_path)
+    monkeypatch.setattr(scraper, "scrape_restaurant_list", lambda *args, **kwargs: list(URLS))
+    monkeypatch.setattr(scraper, "save_urls_to_json", lambda urls, filename: None)
+    monkeypatch.setattr(scraper, "iter_scraped_restaurants", iter_scraped_restaurants)
+    monkeypatch.setattr(scraper, "print_run_stats", lambda: None)
+
+    def run(**kwargs):
+        scraped.clear()
+        scraper.main(**kwargs)
+        return list(scraped), [r["url"] for r in iter_jsonl(tmp_path / scraper.data_file_for(False))]
+
+    return run
+
+
+def test_rerun_scrapes_everything_again(crawl):
+    crawl()
+    assert crawl() == (URLS, URLS)
+
+
+def test_resume_skips_restaurants_of_the_checkpoint(crawl, tmp_path):
+    crawl()
+    (tmp_path / scraper.CHECKPOINT_FILE).write_text(URLS[0] + "\n", encoding="utf-8")
+    assert crawl(resume=True) == ([URLS[1]], URLS + [URLS[1]])
@@ -0,0 +1,86 @@
+import re
+import time
+
+import pytest
+
+from scraping import scraper_utils
+
+BASE_URL = "https://www.tripadvisor.fr/Restaurants-g187265-oa0-Lyon.html"
+
+
+def listing(pages, page_size=2, delays=None):
+    """
+    Remplace fetch_listing_page : 'pages' pages de liste, les offsets au-delà renvoient la première
+    page (redirection de TripAdvisor). 'delays' fixe la durée de téléchargement de certaines pages.
+    """
+    delays = delays or {}
+
+    def fetch(url):
+        page = int(re.search(r"-oa(\d+)-", url).group(1)) // page_size
+        time.sleep(delays.get(page, 0))
+        shown = page if page < pages else 0
+        return [{"url": f"r{shown}-{i}", "reviews_count": 1000, "rating": 4.5} for i in range(page_size)]
+    return fetch
+
+
+@pytest.mark.parametrize("delays", [
+    {},
+    {0: 0.2},  # La page hors liste redirigée arrive avant la vraie première page
+    {1: 0.2, 2: 0.1},
+])
+def test_iter_restaurant_cards_end_does_not_depend_on_completion_order(monkeypatch, delays):
+    monkeypatch.setattr(scraper_utils, "fetch_listing_page", listing(pages=3, delays=delays))
+    cards = scraper_utils.iter_restaurant_cards(BASE_URL, min_reviews=0, max_workers=4, page_size=2)
+    assert [card["url"] for card in cards] == ["r0-0", "r0-1", "r1-0", "r1-1", "r2-0", "r2-1"]
+
+
+def test_iter_restaurant_cards_skips_failed_page(monkeypatch):
+    fetch = listing(pages=3)
+
+    def failing(url):
+        if "-oa2-" in url:
+            raise RuntimeError("erreur réseau")
+        return fetch(url)
+    monkeypatch.setattr(scraper_utils, "fetch_listing_page", failing)
+    cards = scraper_utils.iter_restaurant_cards(BASE_URL, min_reviews=0, max_workers=2, page_size=2)
+    assert [card["url"] for card in cards] == ["r0-0", "r0-1", "r2-0", "r2-1"]
+
+
+RESTAURANT_URL = "https://www.tripadvisor.fr/Restaurant_Review-g187265-d1-Reviews-Chez_Paul-Lyon.html"
+
+
+def review_pages(total, page_size=3, linked=None, fetched=None):
+    """
+    Remplace fetch_review_page : 'total' avis par pages de 'page_size', les offsets au-delà renvoient
+    la première page (redirection de TripAdvisor). Les liens 'Page suivante' mènent jusqu'à 'linked'
+    avis (par défaut 'total'), comme si des avis avaient été supprimés entre deux pages. Les URLs
+    demandées sont notées dans 'fetched'.
+    """
+    def fetch(url):
+        if fetched is not None:
+            fetched.append(url)
+        offset = scraper_utils.review_page_offset(url)
+        offset = offset if offset < total else 0
+        reviews = [{"author": f"a{i}", "review_date": "1 mars 2024", "title": f"t{i}"}
+                   for i in range(offset, min(offset + page_size, total))]
+        next_offset = offset + page_size
+        next_url = scraper_utils.review_page_url(url, next_offset) if next_offset < (linked or total) else None
+        return reviews, next_url
+    return fetch
+
+
+def test_fanout_matches_sequential_scraping(monkeypatch):
+    monkeypatch.setattr(scraper_utils, "fetch_review_page", review_pages(total=10))
+    reviews = scraper_utils.scrape_reviews_fanout(RESTAURANT_URL, reviews_count=10, max_workers=3)
+    assert [review["author"] for review in reviews] == [f"a{i}" for i in range(10)]
+
+
+def test_fanout_drops_redirected_page_without_walking_again(monkeypatch):
+    # 12 avis annoncés, mais il n'en reste que 6 : la page or6 redirige vers la première page
+    fetched = []
+    monkeypatch.setattr(scraper_utils, "fetch_review_page", review_pages(total=6, linked=12, fetched=fetched))
+
+    reviews = scraper_utils.scrape_reviews_fanout(RESTAURANT_URL, reviews_count=12, max_workers=3)
+
+    assert [review["author"] for review in reviews] == [f"a{i}" for i in range(6)]
+    assert len(fetched) == 4  # Première page et pages prédites or3, or6, or9
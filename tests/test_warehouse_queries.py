@@ -0,0 +1,26 @@
+import logging
+import sqlite3
+
+from database.create_warehouse import create_tables, insert_data
+from database.warehouse_queries import load_known_reviews, load_restaurant_snapshots
+from processing.fingerprint import review_fingerprint
+
+
+def test_missing_warehouse_falls_back_with_warning(tmp_path, caplog):
+    db_path = str(tmp_path / "absent.db")
+    with caplog.at_level(logging.WARNING, logger="database.warehouse_queries"):
+        assert load_known_reviews(db_path, "https://example.com/r") == set()
+        assert load_restaurant_snapshots(db_path) == {}
+    assert len(caplog.records) == 2
+
+
+def test_load_known_reviews_returns_fingerprints(tmp_path):
+    db_path = str(tmp_path / "wr.db")
+    conn = sqlite3.connect(db_path)
+    create_tables(conn.cursor())
+    insert_data(conn.cursor(), [{"name": "R", "street": "1 rue", "city": "Lyon", "url": "u",
+                                 "reviews": [{"author": "marie", "review_text": "Très bon"}]}])
+    conn.commit()
+    conn.close()
+    assert load_known_reviews(db_path, "u") == {review_fingerprint("marie", "Très bon")}
+    assert load_restaurant_snapshots(db_path) == {"u": {"reviews_count": None, "rating": None}}